@@ -0,0 +1,29 @@
+"""
+chetools: helper functions that accompany the workshop notebooks.
+
+The notebooks develop each method from scratch for teaching purposes; the
+functions here are the "leave it to the professionals" versions that you
+can import when the problem gets large. Import from the notebook folder:
+
+    from chetools import residual_stats
+"""
+
+from .stats import ResidualStats, residual_stats
+from .roots import (BatchRootResult, ScalarRootResult, bracket_solve, find_all_roots,
+                    halley, householder, newton_batch, safe_newton, time_to_steady_state,
+                    time_to_threshold)
+from .autodiff import (Dual, Jet, derivative, gradient, hessian, jacobian, taylor,
+                       value_and_grad)
+from .trace import TraceRecorder
+from .poly import all_roots, poly_coefficients, poly_roots
+from .chebyshev import ChebProxy, cheb_extrema, cheb_roots
+from .continuation import ContinuationResult, continuation
+from .cache import CachedFunction, memoize
+from .basins import BasinMap, complex_grid, newton_basins, pick_initial_guesses, plot_basins
+from .population import (PopulationObjective, differential_evolution, particle_swarm,
+                         sobol_points)
+from .multistart import MultiStartResult, multistart
+from .minlp import BranchAndBoundResult, branch_and_bound, constraint_violation
+from .warmstart import SolutionStore, problem_key
+from .constraints import ConstraintSet
+from .quadratic import QuadraticModel, affine_model, minimize_quadratic, quadratic_model
@@ -0,0 +1,33 @@
+"""
+Small helper for running independent jobs serially or in a process pool.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+def resolve_workers(workers):
+    """Translate the workers argument used throughout chetools into a count."""
+    if workers is None:
+        return 1
+    if workers == -1:
+        return os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError('workers must be a positive integer, -1, or None')
+    return int(workers)
+
+
+def pmap(func, items, workers = None, chunksize = 1):
+    """
+    Map func over items, in a process pool if workers > 1.
+
+    Results are returned as a list in the same order as items. func (and
+    anything it references) must be picklable when a pool is used, so define
+    it at module level rather than as a lambda.
+    """
+    items = list(items)
+    workers = min(resolve_workers(workers), max(len(items), 1))
+    if workers == 1:
+        return [func(item) for item in items]
+    with ProcessPoolExecutor(max_workers = workers) as pool:
+        return list(pool.map(func, items, chunksize = chunksize))
@@ -0,0 +1,715 @@
+"""
+Forward-mode automatic differentiation with dual numbers.
+
+In Modules 09 through 12 we write derivatives by hand (dy, dg, yp, ypp, the
+2x2 jacobian for q(v), ...) and have to keep them in sync with the functions
+they differentiate. A dual number carries a value *and* its derivatives
+through every arithmetic operation, so if you pass one into a function that
+was written with ordinary operators and numpy functions, the derivatives of
+the result come out exactly (to machine precision) for free.
+
+    >>> dy = derivative(lambda x: 5*x**2 + 8*x - 23)
+    >>> dy(1.0)
+    18.0
+
+The helpers below return callables with the same signatures scipy expects
+for ``fprime``, ``jac`` and ``hess``.
+"""
+
+import numpy as np
+
+
+class Dual:
+    """
+    A truncated Taylor expansion (value, gradient, Hessian) of an array.
+
+    val has some shape S, grad has shape S + (n,) and hess, if present, has
+    shape S + (n, n), where n is the number of independent variables being
+    differentiated against. Arithmetic, abs(), indexing, iteration and the
+    common numpy ufuncs (exp, log, sqrt, sin, cos, maximum, minimum, ...) are
+    supported, so most functions written for floats or arrays work
+    unchanged. You will rarely construct one yourself; use
+    :func:`derivative`, :func:`gradient`, :func:`jacobian` or
+    :func:`hessian` instead.
+    """
+
+    __array_priority__ = 100   #make ndarray (op) Dual defer to Dual
+
+    def __init__(self, val, grad, hess = None):
+        self.val = np.asarray(val, dtype = float)
+        self.grad = np.asarray(grad, dtype = float)
+        self.hess = None if hess is None else np.asarray(hess, dtype = float)
+
+    #---- basic container behavior ------------------------------------------
+    @property
+    def shape(self):
+        return self.val.shape
+
+    @property
+    def ndim(self):
+        return self.val.ndim
+
+    @property
+    def size(self):
+        return self.val.size
+
+    @property
+    def nvars(self):
+        return self.grad.shape[-1]
+
+    def __len__(self):
+        return len(self.val)
+
+    def __getitem__(self, idx):
+        if idx is Ellipsis or (isinstance(idx, tuple) and Ellipsis in idx):
+            raise IndexError('Ellipsis indexing is not supported for Dual')
+        hess = None if self.hess is None else self.hess[idx]
+        return Dual(self.val[idx], self.grad[idx], hess)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __repr__(self):
+        return f'Dual(val={self.val!r}, grad={self.grad!r})'
+
+    def __float__(self):
+        return float(self.val)
+
+    def reshape(self, *shape):
+        if len(shape) == 1 and isinstance(shape[0], tuple):
+            shape = shape[0]
+        n = self.nvars
+        hess = None if self.hess is None else self.hess.reshape(shape + (n, n))
+        return Dual(self.val.reshape(shape), self.grad.reshape(shape + (n,)), hess)
+
+    def sum(self, axis = None, **kwargs):
+        if axis is None:
+            axis = tuple(range(self.ndim))
+        elif np.ndim(axis) == 0:
+            axis = (axis,)
+        axis = tuple(a % self.ndim for a in axis)
+        hess = None if self.hess is None else self.hess.sum(axis = axis)
+        return Dual(self.val.sum(axis = axis), self.grad.sum(axis = axis), hess)
+
+    #---- comparisons act on the value --------------------------------------
+    def __lt__(self, other):
+        return self.val < _value(other)
+
+    def __le__(self, other):
+        return self.val <= _value(other)
+
+    def __gt__(self, other):
+        return self.val > _value(other)
+
+    def __ge__(self, other):
+        return self.val >= _value(other)
+
+    #---- arithmetic --------------------------------------------------------
+    def __neg__(self):
+        hess = None if self.hess is None else -self.hess
+        return Dual(-self.val, -self.grad, hess)
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return _abs(self)
+
+    def __add__(self, other):
+        return _add(self, other)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, Dual):
+            return _add(self, -other)
+        return _add(self, -np.asarray(other, dtype = float))
+
+    def __rsub__(self, other):
+        return _add(-self, other)
+
+    def __mul__(self, other):
+        return _mul(self, other)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        if isinstance(other, Dual):
+            return _mul(self, _reciprocal(other))
+        return _mul(self, 1.0/np.asarray(other, dtype = float))
+
+    def __rtruediv__(self, other):
+        return _mul(_reciprocal(self), other)
+
+    def __pow__(self, other):
+        if isinstance(other, Dual):
+            return _exp(other*_log(self))
+        p = np.asarray(other, dtype = float)
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            f1 = p*self.val**(p - 1)
+            f2 = p*(p - 1)*self.val**(p - 2) if self.hess is not None else None
+            #x**2 and friends are smooth at x = 0 even if x**(p-2) is not
+            f2 = None if f2 is None else np.where(p == 2, 2.0, np.where(p == 1, 0.0, f2))
+            f1 = np.where(p == 1, 1.0, f1)
+        return _chain(self, self.val**p, f1, f2)
+
+    def __rpow__(self, other):
+        c = np.asarray(other, dtype = float)
+        val = c**self.val
+        lnc = np.log(c)
+        return _chain(self, val, lnc*val, lnc**2*val)
+
+    def __matmul__(self, other):
+        if isinstance(other, Dual):
+            return (self*other).sum()
+        B = np.asarray(other, dtype = float)
+        if self.ndim != 1:
+            raise ValueError('matrix products are supported for 1-D Dual arrays only')
+        hess = None if self.hess is None else np.tensordot(B, self.hess, axes = ([0], [0]))
+        return Dual(self.val @ B, np.tensordot(B, self.grad, axes = ([0], [0])), hess)
+
+    def __rmatmul__(self, other):
+        A = np.asarray(other, dtype = float)
+        if self.ndim != 1:
+            raise ValueError('matrix products are supported for 1-D Dual arrays only')
+        hess = None if self.hess is None else np.tensordot(A, self.hess, axes = ([-1], [0]))
+        return Dual(A @ self.val, np.tensordot(A, self.grad, axes = ([-1], [0])), hess)
+
+    #---- numpy ufunc support -----------------------------------------------
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if method != '__call__' or kwargs.get('out') is not None:
+            return NotImplemented
+        if ufunc in _COMPARISONS:
+            return ufunc(*(_value(x) for x in inputs))
+        if ufunc in _BINARY:
+            return _BINARY[ufunc](*inputs)
+        if ufunc in _UNARY:
+            return _UNARY[ufunc](inputs[0])
+        return NotImplemented
+
+
+def _value(x):
+    return x.val if isinstance(x, Dual) else x
+
+
+def _lift(x, like):
+    """Return x as a Dual with zero derivatives, matching like's structure."""
+    if isinstance(x, Dual):
+        return x
+    val = np.asarray(x, dtype = float)
+    n = like.nvars
+    grad = np.zeros(val.shape + (n,))
+    hess = None if like.hess is None else np.zeros(val.shape + (n, n))
+    return Dual(val, grad, hess)
+
+
+def _broadcast(d, shape):
+    n = d.nvars
+    hess = None if d.hess is None else np.broadcast_to(d.hess, shape + (n, n))
+    return Dual(np.broadcast_to(d.val, shape), np.broadcast_to(d.grad, shape + (n,)), hess)
+
+
+def _add(a, b):
+    if not isinstance(a, Dual):
+        a, b = b, a
+    if not isinstance(b, Dual):
+        val = a.val + np.asarray(b, dtype = float)
+        if val.shape != a.shape:
+            a = _broadcast(a, val.shape)
+        return Dual(val, a.grad, a.hess)
+    hess = None if a.hess is None or b.hess is None else a.hess + b.hess
+    return Dual(a.val + b.val, a.grad + b.grad, hess)
+
+
+def _mul(a, b):
+    if not isinstance(a, Dual):
+        a, b = b, a
+    if not isinstance(b, Dual):
+        c = np.asarray(b, dtype = float)
+        hess = None if a.hess is None else c[..., None, None]*a.hess
+        return Dual(a.val*c, c[..., None]*a.grad, hess)
+    val = a.val*b.val
+    grad = a.val[..., None]*b.grad + b.val[..., None]*a.grad
+    hess = None
+    if a.hess is not None and b.hess is not None:
+        cross = a.grad[..., :, None]*b.grad[..., None, :]
+        hess = (a.val[..., None, None]*b.hess + b.val[..., None, None]*a.hess
+                + cross + np.swapaxes(cross, -1, -2))
+    return Dual(val, grad, hess)
+
+
+def _chain(x, f0, f1, f2):
+    """Apply a scalar function with value f0 and derivatives f1, f2 to x."""
+    f1 = np.asarray(f1, dtype = float)
+    grad = f1[..., None]*x.grad
+    hess = None
+    if x.hess is not None:
+        f2 = np.asarray(f2, dtype = float)
+        hess = (f1[..., None, None]*x.hess
+                + f2[..., None, None]*x.grad[..., :, None]*x.grad[..., None, :])
+    return Dual(f0, grad, hess)
+
+
+def _exp(x):
+    e = np.exp(x.val)
+    return _chain(x, e, e, e)
+
+
+def _log(x):
+    return _chain(x, np.log(x.val), 1/x.val, -1/x.val**2)
+
+
+def _reciprocal(x):
+    return _chain(x, 1/x.val, -1/x.val**2, 2/x.val**3)
+
+
+def _sqrt(x):
+    s = np.sqrt(x.val)
+    return _chain(x, s, 0.5/s, -0.25/(s*x.val))
+
+
+def _sin(x):
+    s, c = np.sin(x.val), np.cos(x.val)
+    return _chain(x, s, c, -s)
+
+
+def _cos(x):
+    s, c = np.sin(x.val), np.cos(x.val)
+    return _chain(x, c, -s, -c)
+
+
+def _tan(x):
+    t = np.tan(x.val)
+    sec2 = 1 + t**2
+    return _chain(x, t, sec2, 2*t*sec2)
+
+
+def _arctan(x):
+    d = 1/(1 + x.val**2)
+    return _chain(x, np.arctan(x.val), d, -2*x.val*d**2)
+
+
+def _arcsin(x):
+    d = 1/np.sqrt(1 - x.val**2)
+    return _chain(x, np.arcsin(x.val), d, x.val*d**3)
+
+
+def _arccos(x):
+    d = 1/np.sqrt(1 - x.val**2)
+    return _chain(x, np.arccos(x.val), -d, -x.val*d**3)
+
+
+def _sinh(x):
+    s, c = np.sinh(x.val), np.cosh(x.val)
+    return _chain(x, s, c, s)
+
+
+def _cosh(x):
+    s, c = np.sinh(x.val), np.cosh(x.val)
+    return _chain(x, c, s, c)
+
+
+def _tanh(x):
+    t = np.tanh(x.val)
+    d = 1 - t**2
+    return _chain(x, t, d, -2*t*d)
+
+
+def _abs(x):
+    s = np.sign(x.val)
+    return _chain(x, np.abs(x.val), s, np.zeros_like(s))
+
+
+def _select(pick):
+    """maximum/minimum-style ufuncs: each element takes the derivatives of the
+    argument it was picked from (those of a at ties)."""
+    def apply(a, b):
+        a = _lift(a, b) if not isinstance(a, Dual) else a
+        b = _lift(b, a) if not isinstance(b, Dual) else b
+        val = pick(a.val, b.val)
+        take = val == a.val
+        grad = np.where(take[..., None], a.grad, b.grad)
+        hess = None
+        if a.hess is not None and b.hess is not None:
+            hess = np.where(take[..., None, None], a.hess, b.hess)
+        return Dual(val, grad, hess)
+    return apply
+
+
+def _binary(op):
+    def apply(a, b):
+        if isinstance(a, Dual):
+            return op(a, b)
+        return op(_lift(a, b), b)
+    return apply
+
+
+_UNARY = {
+    np.negative: lambda x: -x,
+    np.positive: lambda x: x,
+    np.exp: _exp,
+    np.expm1: lambda x: _chain(x, np.expm1(x.val), np.exp(x.val), np.exp(x.val)),
+    np.exp2: lambda x: 2.0**x,
+    np.log: _log,
+    np.log1p: lambda x: _chain(x, np.log1p(x.val), 1/(1 + x.val), -1/(1 + x.val)**2),
+    np.log10: lambda x: _log(x)*(1/np.log(10)),
+    np.log2: lambda x: _log(x)*(1/np.log(2)),
+    np.sqrt: _sqrt,
+    np.square: lambda x: _mul(x, x),
+    np.reciprocal: _reciprocal,
+    np.sin: _sin,
+    np.cos: _cos,
+    np.tan: _tan,
+    np.arcsin: _arcsin,
+    np.arccos: _arccos,
+    np.arctan: _arctan,
+    np.sinh: _sinh,
+    np.cosh: _cosh,
+    np.tanh: _tanh,
+    np.absolute: _abs,
+}
+
+_BINARY = {
+    np.add: _binary(lambda a, b: a + b),
+    np.subtract: _binary(lambda a, b: a - b),
+    np.multiply: _binary(lambda a, b: a*b),
+    np.true_divide: _binary(lambda a, b: a/b),
+    np.power: _binary(lambda a, b: a**b),
+    np.matmul: _binary(lambda a, b: a @ b),
+    np.maximum: _select(np.maximum),
+    np.minimum: _select(np.minimum),
+    np.fmax: _select(np.fmax),
+    np.fmin: _select(np.fmin),
+}
+
+_COMPARISONS = {np.less, np.less_equal, np.greater, np.greater_equal,
+                np.equal, np.not_equal}
+
+
+#---- seeding and collecting ------------------------------------------------
+
+def seed(x, order = 1):
+    """Make x the independent variables of a Dual with the given order (1 or 2)."""
+    x = np.asarray(x, dtype = float)
+    n = x.size
+    grad = np.eye(n).reshape(x.shape + (n,))
+    hess = np.zeros(x.shape + (n, n)) if order >= 2 else None
+    return Dual(x.copy(), grad, hess)
+
+
+def collect(out, like):
+    """
+    Convert whatever a function returned into a single Dual.
+
+    Functions often return a list, tuple or ``np.array([...])`` of results
+    (see F(var) in Module 12); those are stacked element by element. Results
+    that do not depend on the variables become Duals with zero derivatives.
+    """
+    if isinstance(out, Dual):
+        return out
+    if isinstance(out, (list, tuple)) or (isinstance(out, np.ndarray) and out.dtype == object):
+        items = [collect(item, like) for item in out]
+        if len(items) == 0:
+            return _lift(np.empty(0), like)
+        shape = np.broadcast_shapes(*(item.shape for item in items))
+        items = [_broadcast(item, shape) for item in items]
+        hess = None
+        if like.hess is not None:
+            hess = np.stack([item.hess for item in items])
+        return Dual(np.stack([item.val for item in items]),
+                    np.stack([item.grad for item in items]), hess)
+    return _lift(out, like)
+
+
+#---- user-facing derivative builders -----------------------------------------
+
+def derivative(f, order = 1):
+    """
+    Elementwise derivative of a vectorized univariate function.
+
+    Returns a callable ``df(x, *args)`` that evaluates d(order)f/dx(order) at
+    every element of x, the automatic equivalent of writing dy or ddy by hand.
+    Orders above 2 are computed with Taylor jets (:func:`taylor`).
+    Use it for ``fprime``/``fprime2`` in ``opt.newton()`` and
+    :func:`chetools.newton_batch`.
+    """
+    if order < 1 or order != int(order):
+        raise ValueError('order must be a positive integer')
+    if order > 2:
+        def dnf(x, *args):
+            return taylor(f, x, order, args)[..., order][()]
+        return dnf
+
+    def df(x, *args):
+        x = np.asarray(x, dtype = float)
+        hess = np.zeros(x.shape + (1, 1)) if order == 2 else None
+        xd = Dual(x, np.ones(x.shape + (1,)), hess)
+        out = collect(f(xd, *args), xd)
+        res = out.grad[..., 0] if order == 1 else out.hess[..., 0, 0]
+        return res[()]
+
+    return df
+
+
+def gradient(f):
+    """Gradient of a scalar function of a vector, ``grad(x, *args)``; use as jac."""
+    def grad(x, *args):
+        xd = seed(x)
+        return collect(f(xd, *args), xd).grad.reshape(np.shape(x))
+    return grad
+
+
+def value_and_grad(f):
+    """Return a callable giving (f(x), grad f(x)) in one pass; use with jac = True."""
+    def fg(x, *args):
+        xd = seed(x)
+        out = collect(f(xd, *args), xd)
+        return float(out.val), out.grad.reshape(np.shape(x))
+    return fg
+
+
+def jacobian(f):
+    """Jacobian of a vector function, ``jac(x, *args)`` with shape (m, n)."""
+    def jac(x, *args):
+        xd = seed(x)
+        out = collect(f(xd, *args), xd)
+        return out.grad.reshape(out.shape + (xd.size,))
+    return jac
+
+
+def hessian(f):
+    """Hessian of a scalar function of a vector, ``hess(x, *args)``; use as hess."""
+    def hess(x, *args):
+        xd = seed(x, order = 2)
+        out = collect(f(xd, *args), xd)
+        return out.hess.reshape(xd.size, xd.size)
+    return hess
+
+
+#---- univariate Taylor jets (derivatives of any order) ----------------------
+
+class Jet:
+    """
+    Truncated Taylor series of a univariate function, to arbitrary order.
+
+    coef has shape S + (K + 1,), where coef[..., k] = f^(k)(x)/k!. A Dual
+    carries first and second derivatives with respect to many variables; a
+    Jet carries derivatives of any order with respect to a single variable,
+    which is what higher-order root finders (Halley, Householder) need. The
+    same operators and numpy ufuncs are supported as for Dual, except for
+    indexing and matrix products.
+    """
+
+    __array_priority__ = 100
+
+    def __init__(self, coef):
+        self.coef = np.asarray(coef, dtype = float)
+
+    @property
+    def order(self):
+        return self.coef.shape[-1] - 1
+
+    @property
+    def val(self):
+        return self.coef[..., 0]
+
+    def __repr__(self):
+        return f'Jet({self.coef!r})'
+
+    def __float__(self):
+        return float(self.val)
+
+    def __lt__(self, other):
+        return self.val < _jet_value(other)
+
+    def __le__(self, other):
+        return self.val <= _jet_value(other)
+
+    def __gt__(self, other):
+        return self.val > _jet_value(other)
+
+    def __ge__(self, other):
+        return self.val >= _jet_value(other)
+
+    def __neg__(self):
+        return Jet(-self.coef)
+
+    def __pos__(self):
+        return self
+
+    def __add__(self, other):
+        if isinstance(other, Jet):
+            return Jet(self.coef + other.coef)
+        c = np.array(np.broadcast_to(self.coef, np.broadcast_shapes(
+            self.coef.shape, np.shape(other) + (1,))))
+        c[..., 0] += other
+        return Jet(c)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return self + (-other if isinstance(other, Jet) else -np.asarray(other, dtype = float))
+
+    def __rsub__(self, other):
+        return (-self) + other
+
+    def __mul__(self, other):
+        if not isinstance(other, Jet):
+            return Jet(self.coef*np.asarray(other, dtype = float)[..., None])
+        a, b = np.broadcast_arrays(self.coef, other.coef)
+        K = a.shape[-1]
+        out = np.zeros(a.shape)
+        for k in range(K):
+            out[..., k] = np.sum(a[..., :k + 1]*b[..., k::-1], axis = -1)
+        return Jet(out)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        if not isinstance(other, Jet):
+            return Jet(self.coef/np.asarray(other, dtype = float)[..., None])
+        return self*other._reciprocal()
+
+    def __rtruediv__(self, other):
+        return self._reciprocal()*other
+
+    def _reciprocal(self):
+        b = self.coef
+        q = np.zeros(b.shape)
+        q[..., 0] = 1/b[..., 0]
+        for k in range(1, b.shape[-1]):
+            q[..., k] = -np.sum(b[..., 1:k + 1]*q[..., k - 1::-1], axis = -1)/b[..., 0]
+        return Jet(q)
+
+    def __pow__(self, p):
+        if isinstance(p, Jet):
+            return _jet_exp(p*_jet_log(self))
+        p = np.asarray(p, dtype = float)
+        if p.ndim == 0 and p == int(p) and p >= 0:
+            #repeated squaring keeps x**2 etc. exact at x = 0
+            result, base, n = None, self, int(p)
+            while n:
+                if n & 1:
+                    result = base if result is None else result*base
+                n >>= 1
+                if n:
+                    base = base*base
+            return result if result is not None else Jet(np.concatenate(
+                (np.ones(self.coef.shape[:-1] + (1,)), np.zeros(self.coef.shape[:-1] + (self.order,))),
+                axis = -1))
+        a = self.coef
+        y = np.zeros(np.broadcast_shapes(a.shape, p.shape + (1,)))
+        y[..., 0] = a[..., 0]**p
+        for k in range(1, a.shape[-1]):
+            j = np.arange(1, k + 1)
+            y[..., k] = np.sum((p[..., None]*j - (k - j))*a[..., 1:k + 1]*y[..., k - 1::-1],
+                               axis = -1)/(k*a[..., 0])
+        return Jet(y)
+
+    def __rpow__(self, other):
+        return _jet_exp(self*np.log(np.asarray(other, dtype = float)))
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if method != '__call__' or kwargs.get('out') is not None:
+            return NotImplemented
+        if ufunc in _COMPARISONS:
+            return ufunc(*(_jet_value(x) for x in inputs))
+        if ufunc in _JET_BINARY:
+            a, b = inputs
+            return _JET_BINARY[ufunc](a, b)
+        if ufunc in _JET_UNARY:
+            return _JET_UNARY[ufunc](inputs[0])
+        return NotImplemented
+
+
+def _jet_value(x):
+    return x.val if isinstance(x, Jet) else x
+
+
+def _jet_integrate(a, g, f0):
+    """Jet of f(a) given the jet g of f'(a) and the value f0 = f(a0)."""
+    out = np.zeros(np.broadcast_shapes(a.coef.shape, g.coef.shape))
+    out[..., 0] = f0
+    for k in range(1, out.shape[-1]):
+        j = np.arange(1, k + 1)
+        out[..., k] = np.sum(j*a.coef[..., 1:k + 1]*g.coef[..., k - 1::-1], axis = -1)/k
+    return Jet(out)
+
+
+def _jet_exp(a):
+    e = np.zeros(a.coef.shape)
+    e[..., 0] = np.exp(a.coef[..., 0])
+    for k in range(1, e.shape[-1]):
+        j = np.arange(1, k + 1)
+        e[..., k] = np.sum(j*a.coef[..., 1:k + 1]*e[..., k - 1::-1], axis = -1)/k
+    return Jet(e)
+
+
+def _jet_log(a):
+    return _jet_integrate(a, a._reciprocal(), np.log(a.val))
+
+
+def _jet_sincos(a):
+    s = np.zeros(a.coef.shape)
+    c = np.zeros(a.coef.shape)
+    s[..., 0], c[..., 0] = np.sin(a.val), np.cos(a.val)
+    for k in range(1, s.shape[-1]):
+        j = np.arange(1, k + 1)
+        ja = j*a.coef[..., 1:k + 1]
+        s[..., k] = np.sum(ja*c[..., k - 1::-1], axis = -1)/k
+        c[..., k] = -np.sum(ja*s[..., k - 1::-1], axis = -1)/k
+    return Jet(s), Jet(c)
+
+
+_JET_UNARY = {
+    np.negative: lambda x: -x,
+    np.positive: lambda x: x,
+    np.exp: _jet_exp,
+    np.expm1: lambda x: _jet_exp(x) - 1,
+    np.log: _jet_log,
+    np.log1p: lambda x: _jet_log(x + 1),
+    np.log10: lambda x: _jet_log(x)/np.log(10),
+    np.log2: lambda x: _jet_log(x)/np.log(2),
+    np.sqrt: lambda x: x**0.5,
+    np.square: lambda x: x*x,
+    np.reciprocal: lambda x: x._reciprocal(),
+    np.sin: lambda x: _jet_sincos(x)[0],
+    np.cos: lambda x: _jet_sincos(x)[1],
+    np.tan: lambda x: _jet_sincos(x)[0]/_jet_sincos(x)[1],
+    np.arctan: lambda x: _jet_integrate(x, (1 + x*x)._reciprocal(), np.arctan(x.val)),
+    np.arcsin: lambda x: _jet_integrate(x, (1 - x*x)**-0.5, np.arcsin(x.val)),
+    np.arccos: lambda x: _jet_integrate(x, -(1 - x*x)**-0.5, np.arccos(x.val)),
+    np.sinh: lambda x: 0.5*(_jet_exp(x) - _jet_exp(-x)),
+    np.cosh: lambda x: 0.5*(_jet_exp(x) + _jet_exp(-x)),
+    np.tanh: lambda x: (_jet_exp(2*x) - 1)/(_jet_exp(2*x) + 1),
+    np.absolute: lambda x: x*np.sign(x.val),
+}
+
+_JET_BINARY = {
+    np.add: lambda a, b: a + b if isinstance(a, Jet) else b + a,
+    np.subtract: lambda a, b: a - b if isinstance(a, Jet) else (-b) + a,
+    np.multiply: lambda a, b: a*b if isinstance(a, Jet) else b*a,
+    np.true_divide: lambda a, b: a/b if isinstance(a, Jet) else b.__rtruediv__(a),
+    np.power: lambda a, b: a**b if isinstance(a, Jet) else b.__rpow__(a),
+}
+
+
+def taylor(f, x, order, args = ()):
+    """
+    All derivatives f(x), f'(x), ..., f^(order)(x) of a univariate function.
+
+    One pass through f with a :class:`Jet` gives every derivative at once.
+    Returns an array with a trailing axis of length order + 1.
+    """
+    x = np.asarray(x, dtype = float)
+    coef = np.zeros(x.shape + (order + 1,))
+    coef[..., 0] = x
+    if order >= 1:
+        coef[..., 1] = 1.0
+    out = f(Jet(coef), *args)
+    if not isinstance(out, Jet):
+        out = Jet(np.concatenate((np.asarray(out, dtype = float)[..., None]*np.ones(x.shape + (1,)),
+                                  np.zeros(x.shape + (order,))), axis = -1))
+    factorial = np.cumprod(np.concatenate(([1.0], np.arange(1, order + 1))))
+    return out.coef*factorial
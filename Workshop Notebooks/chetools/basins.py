@@ -0,0 +1,207 @@
+"""
+Basins of attraction for Newton's method.
+
+Module 09 shows that the root Newton's method finds depends on the initial
+guess, and Module 10 picks guesses by eye from a graph. A basin map answers
+the question systematically: run Newton from every point on a grid (10^6
+points is routine, because all of them are iterated together as numpy
+arrays), record which root each start converged to and how many iterations
+it took, and color the grid accordingly. The same map tells you which
+initial guesses reliably reach each root.
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+
+from .roots import newton_batch
+
+
+class BasinMap(NamedTuple):
+    """
+    Result of :func:`newton_basins`.
+
+    x0 is the grid of starting points; basin has the same shape and holds the
+    index into roots of the root reached from each start (-1 if Newton did
+    not converge); iterations holds the number of Newton steps taken.
+    """
+    x0: np.ndarray
+    basin: np.ndarray
+    iterations: np.ndarray
+    roots: np.ndarray
+
+
+def complex_grid(re = (-2, 2), im = (-2, 2), n = 1000):
+    """An n x n grid of complex starting points covering re x im."""
+    x = np.linspace(re[0], re[1], n)
+    y = np.linspace(im[0], im[1], n)
+    X, Y = np.meshgrid(x, y)
+    return X + 1j*Y
+
+
+def _complex_newton(f, z, fprime, args, tol, maxiter):
+    z = np.array(z, dtype = complex).ravel()
+    iterations = np.zeros(z.shape, dtype = int)
+    converged = np.zeros(z.shape, dtype = bool)
+    active = np.ones(z.shape, dtype = bool)
+    h = 1e-7
+    for _ in range(maxiter):
+        idx = np.nonzero(active)[0]
+        if idx.size == 0:
+            break
+        zi = z[idx]
+        fz = f(zi, *args)*np.ones_like(zi)
+        with np.errstate(all = 'ignore'):
+            if fprime is None:
+                #central difference; exact enough for an analytic f
+                hz = h*np.maximum(1.0, np.abs(zi))
+                dfz = (f(zi + hz, *args) - f(zi - hz, *args))/(2*hz)
+            else:
+                dfz = fprime(zi, *args)*np.ones_like(zi)
+            step = fz/dfz
+        failed = ~np.isfinite(step)
+        step = np.where(failed | (fz == 0), 0, step)
+        z[idx] = zi - step
+        iterations[idx] += ~failed & (fz != 0)
+        done = (fz == 0) | (~failed & (np.abs(step) <= tol*np.maximum(1.0, np.abs(zi))))
+        converged[idx] = done
+        active[idx] = ~(done | failed)
+    return z, converged, iterations
+
+
+def _cluster(values, tol):
+    """Distinct values (complex or real), merging those closer than tol."""
+    #snap to a grid of spacing tol so the (many) converged starts collapse
+    #onto a few cells, then merge cells that hold the same root
+    cells = np.round(values/tol) if not np.iscomplexobj(values) \
+        else np.round(values.real/tol) + 1j*np.round(values.imag/tol)
+    _, first = np.unique(cells, return_index = True)
+    values = values[first]
+    distinct = []
+    for v in values[np.argsort(np.abs(values) + 1e-3*np.angle(values + 0j))]:
+        if not any(abs(v - d) <= tol*max(1.0, abs(d)) for d in distinct):
+            distinct.append(v)
+            if len(distinct) > 1000:
+                break
+    return np.array(distinct)
+
+
+def newton_basins(f, x0, fprime = 'auto', args = (), roots = None, tol = 1e-10,
+                  maxiter = 60, root_tol = 1e-6):
+    """
+    Run Newton's method from every point in x0 and classify the outcomes.
+
+    Parameters
+    ----------
+    f : callable
+        Vectorized function. For a complex grid it must accept complex
+        arrays (polynomials, np.exp, np.sin, ... all do).
+    x0 : array_like
+        Starting points: a real array (1-D basins on the real line) or a
+        complex array such as :func:`complex_grid` (2-D basins).
+    fprime : callable or 'auto', optional
+        Derivative of f. 'auto' differentiates f with dual numbers for real
+        starts, and with a complex central difference for complex starts.
+    args : tuple, optional
+        Extra arguments for f and fprime.
+    roots : array_like, optional
+        Known roots. If omitted, the distinct converged end points are used.
+    tol, maxiter : optional
+        Newton convergence tolerance (relative step size) and iteration cap.
+    root_tol : float, optional
+        End points within root_tol (relative) of a root are assigned to it.
+
+    Returns
+    -------
+    BasinMap
+    """
+    x0 = np.asarray(x0)
+    shape = x0.shape
+    if np.iscomplexobj(x0):
+        z, converged, iterations = _complex_newton(f, x0, None if fprime == 'auto' else fprime,
+                                                   args, tol, maxiter)
+    else:
+        sol = newton_batch(f, x0.ravel(), fprime = fprime, args = args, tol = tol,
+                           rtol = tol, maxiter = maxiter)
+        z, converged, iterations = sol.root, sol.converged, sol.iterations
+
+    if roots is None:
+        roots = _cluster(z[converged], root_tol) if converged.any() else np.empty(0)
+        roots = np.sort_complex(roots) if np.iscomplexobj(roots) else np.sort(roots)
+    roots = np.asarray(roots)
+
+    basin = np.full(z.shape, -1, dtype = int)
+    if roots.size:
+        dist = np.abs(z[:, None] - roots[None, :])
+        nearest = np.argmin(dist, axis = 1)
+        close = dist[np.arange(z.size), nearest] <= root_tol*np.maximum(1.0, np.abs(roots[nearest]))
+        ok = converged & close
+        basin[ok] = nearest[ok]
+    return BasinMap(x0, basin.reshape(shape), iterations.reshape(shape), roots)
+
+
+def pick_initial_guesses(basins, margin = 2):
+    """
+    For each root, a starting point that reliably converges to it.
+
+    Chooses, among starts whose neighbors within ``margin`` grid points all
+    reach the same root, the one that needed the fewest iterations (so a
+    small perturbation of the guess will not change the answer). Falls back
+    to the fastest start if no such interior point exists. Returns an array
+    with one guess per root (nan if a root was never reached).
+    """
+    basin, its, x0 = basins.basin, basins.iterations, basins.x0
+    stable = basin >= 0
+    for axis in range(basin.ndim):
+        for shift in range(1, margin + 1):
+            for s in (shift, -shift):
+                same = np.roll(basin, s, axis = axis) == basin
+                #np.roll wraps around; treat the edges as unstable
+                edge = [slice(None)]*basin.ndim
+                edge[axis] = slice(0, s) if s > 0 else slice(s, None)
+                same[tuple(edge)] = False
+                stable &= same
+
+    guesses = np.full(basins.roots.size, np.nan, dtype = x0.dtype if np.iscomplexobj(x0) else float)
+    for k in range(basins.roots.size):
+        for mask in (stable & (basin == k), basin == k):
+            if mask.any():
+                cand = np.where(mask, its, np.iinfo(int).max)
+                guesses[k] = x0.flat[np.argmin(cand)]
+                break
+    return guesses
+
+
+def plot_basins(basins, ax = None, cmap = 'tab10', shade = True):
+    """
+    Draw a basin map with matplotlib.
+
+    Complex grids are drawn as an image in the complex plane (darker means
+    more iterations if shade is True); real starts are drawn as colored
+    points along the x-axis with iterations on the y-axis. Returns the axis.
+    """
+    import matplotlib.pyplot as plt
+
+    if ax is None:
+        ax = plt.gca()
+    basin, its, x0 = basins.basin, basins.iterations, basins.x0
+    colors = plt.get_cmap(cmap)
+    if np.iscomplexobj(x0) and x0.ndim == 2:
+        rgb = colors(np.mod(basin, colors.N))[..., :3]
+        rgb[basin < 0] = 0.0
+        if shade:
+            rgb *= (1 - 0.6*its/max(its.max(), 1))[..., None]
+        ax.imshow(rgb, origin = 'lower', aspect = 'auto',
+                  extent = (x0.real.min(), x0.real.max(), x0.imag.min(), x0.imag.max()))
+        r = basins.roots
+        ax.scatter(r.real, r.imag, color = 'white', edgecolor = 'black', marker = 'o', zorder = 3)
+        ax.set_xlabel('Re(x0)')
+        ax.set_ylabel('Im(x0)')
+    else:
+        x0 = np.real(x0).ravel()
+        b = basin.ravel()
+        ax.scatter(x0, its.ravel(), c = colors(np.mod(b, colors.N)), s = 4)
+        ax.scatter(x0[b < 0], its.ravel()[b < 0], color = 'black', s = 4, label = 'no convergence')
+        ax.set_xlabel('initial guess')
+        ax.set_ylabel('Newton iterations')
+    return ax
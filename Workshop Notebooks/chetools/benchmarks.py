@@ -0,0 +1,371 @@
+"""
+Side-by-side comparisons of solvers on the same problem.
+
+In the notebooks we compare methods by reading ``nfev`` and ``nit`` off of
+printed solutions. These helpers run several methods on one problem, count
+every call to the function and its derivatives, and return the results as a
+list of dictionaries (one row per method) that prints as a small table.
+"""
+
+import time
+
+import numpy as np
+import scipy.optimize as opt
+
+from .population import PopulationObjective, sobol_points
+from .roots import householder, safe_newton
+
+
+class CountingFunction:
+    """Wrap a callable and count how many times it is evaluated."""
+
+    def __init__(self, fun):
+        self.fun = fun
+        self.calls = 0
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        return self.fun(*args, **kwargs)
+
+
+def format_table(rows, columns = None, floatfmt = '.6g'):
+    """Format a list of dictionaries as a plain-text table."""
+    if not rows:
+        return ''
+    columns = columns or list(rows[0])
+
+    def fmt(v):
+        if isinstance(v, (float, np.floating)):
+            return format(v, floatfmt)
+        return str(v)
+
+    cells = [[fmt(row.get(c, '')) for c in columns] for row in rows]
+    widths = [max(len(c), *(len(r[j]) for r in cells)) for j, c in enumerate(columns)]
+    lines = ['  '.join(c.ljust(w) for c, w in zip(columns, widths)),
+             '  '.join('-'*w for w in widths)]
+    lines += ['  '.join(v.ljust(w) for v, w in zip(r, widths)) for r in cells]
+    return '\n'.join(lines)
+
+
+def compare_root_solvers(f, x0, bracket, fprime = None, args = (), xtol = 2e-12,
+                         maxiter = 100):
+    """
+    Run several scalar root finders on f and count the work each one does.
+
+    Methods compared: ``opt.newton()`` (Newton-Raphson if fprime is given,
+    otherwise secant) from x0, ``opt.brentq()`` and ``opt.toms748()`` on
+    bracket, and :func:`chetools.safe_newton` from x0 (with automatic
+    bracketing). Failures are reported rather than raised.
+
+    Returns
+    -------
+    list of dict
+        Keys: method, root, converged, iterations, fcalls (evaluations of f
+        plus evaluations of fprime), time (seconds).
+    """
+    rows = []
+
+    def run(name, solve):
+        fc = CountingFunction(f)
+        dfc = CountingFunction(fprime) if fprime is not None else None
+        t0 = time.perf_counter()
+        try:
+            root, converged, iterations = solve(fc, dfc)
+        except (RuntimeError, ValueError, ZeroDivisionError, OverflowError) as err:
+            root, converged, iterations = np.nan, False, repr(err)[:40]
+        elapsed = time.perf_counter() - t0
+        rows.append({'method': name, 'root': float(root), 'converged': bool(converged),
+                     'iterations': iterations,
+                     'fcalls': fc.calls + (dfc.calls if dfc is not None else 0),
+                     'time': elapsed})
+
+    def newton(fc, dfc):
+        root, info = opt.newton(fc, x0, fprime = dfc, args = args, tol = xtol,
+                                maxiter = maxiter, full_output = True, disp = False)
+        return root, info.converged, info.iterations
+
+    def bracketed(method):
+        def solve(fc, dfc):
+            root, info = method(fc, bracket[0], bracket[1], args = args, xtol = xtol,
+                                maxiter = maxiter, full_output = True, disp = False)
+            return root, info.converged, info.iterations
+        return solve
+
+    def safe(fc, dfc):
+        sol = safe_newton(fc, x0, fprime = dfc if dfc is not None else 'auto', args = args,
+                          xtol = xtol, maxiter = maxiter)
+        return sol.root, sol.converged, sol.iterations
+
+    run('newton' if fprime is not None else 'secant', newton)
+    run('brentq', bracketed(opt.brentq))
+    run('toms748', bracketed(opt.toms748))
+    run('safe_newton', safe)
+    return rows
+
+
+def compare_householder(f, x0, args = (), orders = (1, 2, 3), derivatives = 'auto',
+                        xtol = 2e-12, maxiter = 50, repeat = 20):
+    """
+    Iterations and work to reach xtol for Householder methods of several orders.
+
+    Order 1 is Newton, 2 is Halley, 3 is the quartic Householder method
+    (:func:`chetools.householder`). Higher orders take fewer iterations but
+    need more derivatives per iteration, so the useful comparison is the
+    total work: ``values`` counts every function or derivative value used,
+    and time is the best of ``repeat`` runs.
+
+    Parameters
+    ----------
+    derivatives : 'auto' or sequence of callables, optional
+        'auto' (Taylor jets) or hand-coded ``[fprime, fprime2, ...]``; the
+        list must be at least as long as the largest order.
+
+    Returns
+    -------
+    list of dict
+        Keys: method, root, converged, iterations, fcalls, values, time.
+    """
+    names = {1: 'newton', 2: 'halley'}
+    rows = []
+    for order in orders:
+        fc = CountingFunction(f)
+        if derivatives == 'auto':
+            derivs = 'auto'
+        else:
+            derivs = [CountingFunction(d) for d in derivatives[:order]]
+        sol = householder(fc, x0, order, derivs, args, xtol = xtol, maxiter = maxiter)
+        fcalls = fc.calls + (sum(d.calls for d in derivs) if derivs != 'auto' else 0)
+        best = np.inf
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            householder(f, x0, order, derivatives, args, xtol = xtol, maxiter = maxiter)
+            best = min(best, time.perf_counter() - t0)
+        rows.append({'method': names.get(order, f'householder{order}'), 'root': sol.root,
+                     'converged': sol.converged, 'iterations': sol.iterations,
+                     'fcalls': fcalls, 'values': fc.calls*(order + 1), 'time': best})
+    return rows
+
+
+def compare_population(fun, bounds, sizes = (10, 100, 1000, 10000), args = (), repeat = 5,
+                       seed = None):
+    """
+    Time one population evaluation, point by point versus in a single call.
+
+    For each population size, fun is evaluated at that many Sobol points in
+    bounds, once in a Python loop and once as a (d, S) population (see
+    :class:`chetools.PopulationObjective`). Times are the best of repeat runs.
+
+    Returns
+    -------
+    list of dict
+        Keys: points, loop (seconds), population (seconds), speedup.
+    """
+    rows = []
+    for n in sizes:
+        X = sobol_points(bounds, n, seed)
+        times = {}
+        for mode in (False, True):
+            best = np.inf
+            for _ in range(repeat):
+                objective = PopulationObjective(fun, args, vectorized = mode)
+                t0 = time.perf_counter()
+                objective.evaluate(X)
+                best = min(best, time.perf_counter() - t0)
+            times[mode] = best
+        rows.append({'points': n, 'loop': times[False], 'population': times[True],
+                     'speedup': times[False]/times[True]})
+    return rows
+
+
+def compare_batch_fit(law, C, r, p0, loop_limit = 200):
+    """
+    Time :func:`chetools.kinetics.fit_batch` against a Python loop that
+    calls ``opt.least_squares()`` once per dataset.
+
+    C and r are as for fit_batch and p0 is one initial guess used for every
+    fit. The loop is run on at most loop_limit datasets and its time scaled
+    up to the full batch.
+
+    Returns
+    -------
+    list of dict
+        Keys: method, datasets, time (seconds, for all datasets), speedup
+        over the loop, and maxdiff (largest relative difference in the fitted
+        parameters from the loop's, over the datasets both fitted).
+    """
+    from .kinetics import _broadcast_data, _law, fit_batch, kinetic_residuals
+
+    law = _law(law)
+    C, r = _broadcast_data(C, r)
+    B = r.shape[0]
+    m = min(B, loop_limit)
+    t0 = time.perf_counter()
+    reference = np.array([opt.least_squares(kinetic_residuals(law, C[i], r[i]), p0).x
+                          for i in range(m)])
+    loop_time = (time.perf_counter() - t0)*B/m
+    rows = [{'method': 'least_squares loop', 'datasets': B, 'time': loop_time, 'speedup': 1.0,
+             'maxdiff': 0.0}]
+    t0 = time.perf_counter()
+    fit = fit_batch(law, C, r, p0)
+    elapsed = time.perf_counter() - t0
+    diff = np.max(np.abs(fit.params[:m]/reference - 1))
+    rows.append({'method': 'fit_batch', 'datasets': B, 'time': elapsed,
+                 'speedup': loop_time/elapsed, 'maxdiff': diff})
+    return rows
+
+
+def compare_initial_guesses(law, C, r, fixed = ([7, 0.4], [1, 1]), methods = None,
+                            loop_limit = 100):
+    """
+    Iterations needed from fixed initial guesses and from linearized ones.
+
+    Every dataset in (C, r) is fitted with :func:`chetools.kinetics.fit_batch`
+    starting from each guess in fixed, and from
+    :func:`chetools.kinetics.linearized_guess` with each of methods (default:
+    every transform and 'best'). The first loop_limit datasets are also
+    fitted one at a time with ``opt.least_squares()``.
+
+    Returns
+    -------
+    list of dict
+        Keys: start, iterations (mean per dataset), max_iterations,
+        converged (fraction), found_best (fraction of datasets whose SSE is
+        within 1e-6 relative of the smallest found from any start), nfev
+        (mean ``opt.least_squares()`` evaluations per dataset) and time
+        (seconds for fit_batch, including the guess).
+    """
+    from .kinetics import (TRANSFORMS, _broadcast_data, _law, fit_batch, kinetic_residuals,
+                           linearized_guess)
+
+    law = _law(law)
+    C, r = _broadcast_data(C, r)
+    m = min(r.shape[0], loop_limit)
+    starts = [(str(list(p)), lambda p = p: np.asarray(p, dtype = float)) for p in fixed]
+    for method in methods or TRANSFORMS + ('best',):
+        starts.append((method, lambda method = method: linearized_guess(law, C, r, method)))
+
+    rows, sse = [], []
+    for name, start in starts:
+        t0 = time.perf_counter()
+        fit = fit_batch(law, C, r, start())
+        elapsed = time.perf_counter() - t0
+        p0 = np.broadcast_to(start(), (r.shape[0], len(law.params)))
+        nfev = [opt.least_squares(kinetic_residuals(law, C[i], r[i]), p0[i]).nfev
+                for i in range(m)]
+        sse.append(np.where(np.isfinite(fit.sse), fit.sse, np.inf))
+        rows.append({'start': name, 'iterations': fit.iterations.mean(),
+                     'max_iterations': int(fit.iterations.max()),
+                     'converged': fit.converged.mean(), 'nfev': float(np.mean(nfev)),
+                     'time': elapsed})
+    best = np.min(sse, axis = 0)
+    for row, s in zip(rows, sse):
+        row['found_best'] = float(np.mean(s <= best*(1 + 1e-6) + 1e-300))
+    return rows
+
+
+def compare_uncertainty(law, C, r, n_boot = 1000, level = 0.95, workers = None, seed = None):
+    """
+    Confidence intervals from every method in :mod:`chetools.uncertainty`,
+    with what each one cost.
+
+    Returns
+    -------
+    list of dict
+        One row per method and parameter. Keys: method, parameter, value,
+        lower, upper, time (seconds for the whole method), fits and nfev.
+    """
+    from .kinetics import _law
+    from .uncertainty import asymptotic_intervals, bootstrap_intervals, profile_intervals
+
+    law = _law(law)
+    results = [asymptotic_intervals(law, C, r, level = level),
+               profile_intervals(law, C, r, level = level, workers = workers),
+               bootstrap_intervals(law, C, r, n_boot, 'residual', level = level,
+                                   workers = workers, seed = seed),
+               bootstrap_intervals(law, C, r, n_boot, 'case', level = level,
+                                   workers = workers, seed = seed)]
+    rows = []
+    for res in results:
+        for j, name in enumerate(law.params):
+            rows.append({'method': res.method, 'parameter': name, 'value': res.params[j],
+                         'lower': res.lower[j], 'upper': res.upper[j], 'time': res.time,
+                         'fits': res.nfits, 'nfev': res.nfev})
+    return rows
+
+
+def compare_constraints(fun, x0, constraints, vectorized = None, jac = None, bounds = None,
+                        method = 'SLSQP', options = None):
+    """
+    Solve one constrained problem with its constraints passed three ways.
+
+    constraints is a list of the usual dictionaries without 'jac', solved
+    as given (finite-difference constraint gradients) and as
+    ``ConstraintSet.from_dicts(constraints)`` (the same functions with
+    automatic Jacobians, stacked). vectorized, if given, is a
+    :class:`chetools.constraints.ConstraintSet` expressing the same
+    constraints with array operations (e.g. one function returning every
+    x[i]**2 + x[i+1]**2 - 1 at once) and is solved as a third case.
+
+    Returns
+    -------
+    list of dict
+        Keys: method, constraints (number of scalar constraints), success,
+        nit, fun, calls (calls to the constraint functions) and time.
+    """
+    from .constraints import ConstraintSet
+
+    x0 = np.asarray(x0, dtype = float)
+    counted = [{**con, 'fun': CountingFunction(con['fun'])} for con in constraints]
+    stacked = ConstraintSet.from_dicts(counted)
+    cases = [('dicts, finite differences', counted, None),
+             ('ConstraintSet.from_dicts', stacked.as_dicts(x0), None)]
+    if vectorized is not None:
+        cases.append(('vectorized ConstraintSet', vectorized.as_dicts(x0), vectorized))
+    m = len(stacked)
+
+    rows = []
+    for name, cons, cset in cases:
+        for con in counted:
+            con['fun'].calls = 0
+        calls0 = cset.ncalls if cset is not None else 0
+        t0 = time.perf_counter()
+        sol = opt.minimize(fun, x0, jac = jac, bounds = bounds, method = method,
+                           constraints = cons, options = options)
+        elapsed = time.perf_counter() - t0
+        calls = cset.ncalls - calls0 if cset is not None else sum(con['fun'].calls for con in counted)
+        rows.append({'method': name, 'constraints': m, 'success': bool(sol.success),
+                     'nit': sol.nit, 'fun': float(sol.fun), 'calls': calls, 'time': elapsed})
+    return rows
+
+
+def compare_quadratic(fun, x0, args = (), jac = None, methods = ('BFGS', 'L-BFGS-B', 'SLSQP'),
+                      constraints = (), options = None):
+    """
+    Minimize one objective with :func:`chetools.quadratic.minimize_quadratic`
+    and with ``opt.minimize()`` for each of methods.
+
+    Returns
+    -------
+    list of dict
+        Keys: method, structure (the fast-path result's, '' otherwise),
+        success, nit, nfev, fun, dx (largest difference from the fast-path
+        solution) and time.
+    """
+    from .quadratic import minimize_quadratic
+
+    x0 = np.asarray(x0, dtype = float)
+    kwargs = {'constraints': constraints} if constraints else {}
+    t0 = time.perf_counter()
+    ref = minimize_quadratic(fun, x0, args = args, jac = jac, options = options, **kwargs)
+    rows = [{'method': 'minimize_quadratic', 'structure': ref.structure,
+             'success': bool(ref.success), 'nit': ref.nit, 'nfev': ref.nfev,
+             'fun': float(ref.fun), 'dx': 0.0, 'time': time.perf_counter() - t0}]
+    for method in methods:
+        t0 = time.perf_counter()
+        sol = opt.minimize(fun, x0, args = args, jac = jac, method = method, options = options,
+                           **kwargs)
+        elapsed = time.perf_counter() - t0
+        rows.append({'method': method, 'structure': '', 'success': bool(sol.success),
+                     'nit': sol.nit, 'nfev': sol.nfev, 'fun': float(sol.fun),
+                     'dx': float(np.max(np.abs(sol.x - ref.x))), 'time': elapsed})
+    return rows
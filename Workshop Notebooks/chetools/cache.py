@@ -0,0 +1,229 @@
+"""
+Memoization for expensive objective and residual functions.
+
+The Newton loop in Module 09, ``while abs(y(x)) > 1e-8: x = x - y(x)/dy(x)``,
+evaluates y(x) twice at the same x on every pass, and scipy's minimize and
+root routines also revisit points they have already evaluated (line searches,
+finite-difference Jacobians, the final report). That is harmless when y is a
+one-line polynomial, but not when each evaluation is a simulation that takes
+minutes. Decorating the function with :func:`memoize` makes every repeat
+evaluation free.
+
+    @memoize(maxsize = 10000)
+    def y(x):
+        return run_expensive_simulation(x)
+"""
+
+import functools
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def _fingerprint(value, quantize, h):
+    """Feed an exact (or quantized) description of value into hash h."""
+    if isinstance(value, (str, bytes)):
+        h.update(type(value).__name__.encode())
+        h.update(value.encode() if isinstance(value, str) else value)
+        return
+    if isinstance(value, dict):
+        for k in sorted(value):
+            _fingerprint(k, quantize, h)
+            _fingerprint(value[k], quantize, h)
+        return
+    arr = np.asarray(value)
+    if arr.dtype == object:
+        raise TypeError(f'cannot build a cache key from {type(value).__name__}')
+    if quantize is not None and arr.dtype.kind in 'fc':
+        arr = np.round(arr/quantize)
+    arr = np.ascontiguousarray(arr)
+    h.update(arr.dtype.str.encode())
+    h.update(str(arr.shape).encode())
+    h.update(arr.tobytes())
+
+
+class _DiskStore:
+    """Key-value store in a SQLite file that several processes can share."""
+
+    def __init__(self, path, namespace):
+        self.path = os.fspath(path)
+        self.namespace = namespace
+        self._local = threading.local()
+        with self._connect() as con:
+            con.execute('CREATE TABLE IF NOT EXISTS cache '
+                        '(namespace TEXT, key BLOB, value BLOB, PRIMARY KEY (namespace, key))')
+
+    def _connect(self):
+        con = getattr(self._local, 'con', None)
+        if con is None:
+            con = sqlite3.connect(self.path, timeout = 30)
+            self._local.con = con
+        return con
+
+    def get(self, key, default = None):
+        row = self._connect().execute('SELECT value FROM cache WHERE namespace = ? AND key = ?',
+                                      (self.namespace, key)).fetchone()
+        return default if row is None else pickle.loads(row[0])
+
+    def put(self, key, value):
+        with self._connect() as con:
+            con.execute('INSERT OR REPLACE INTO cache VALUES (?, ?, ?)',
+                        (self.namespace, key, pickle.dumps(value, protocol = pickle.HIGHEST_PROTOCOL)))
+
+    def clear(self):
+        with self._connect() as con:
+            con.execute('DELETE FROM cache WHERE namespace = ?', (self.namespace,))
+
+    def __getstate__(self):
+        #connections cannot be pickled; each process opens its own
+        state = self.__dict__.copy()
+        del state['_local']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+
+_MISSING = object()  #None is a perfectly good result to cache
+
+
+def _namespace(fun, name = None):
+    """
+    Disk-cache namespace: the function's name plus a fingerprint of its
+    source and the global data it uses, so that editing a function (say, in
+    a notebook, where every function is __main__.something) does not bring
+    back results computed by the old version.
+    """
+    from .warmstart import _function_fingerprint  #warmstart imports this module
+
+    name = name or f'{getattr(fun, "__module__", "")}.{getattr(fun, "__qualname__", repr(fun))}'
+    h = hashlib.blake2b(digest_size = 10)
+    _function_fingerprint(fun, h, set())
+    return f'{name}:{h.hexdigest()}'
+
+
+class CachedFunction:
+    """
+    A function wrapped with an LRU evaluation cache; see :func:`memoize`.
+
+    Attributes hits, misses, and (if a disk file is used) disk_hits count
+    lookups; ``cache_info()`` reports them together.
+    """
+
+    def __init__(self, fun, maxsize = 1024, quantize = None, path = None, name = None):
+        functools.update_wrapper(self, fun)
+        self.fun = fun
+        self.maxsize = maxsize
+        self.quantize = quantize
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = _DiskStore(path, _namespace(fun, name)) if path is not None else None
+        self.hits = self.misses = self.disk_hits = self.uncached = 0
+
+    def key(self, *args, **kwargs):
+        """The cache key for a call; raises TypeError if it cannot be built."""
+        h = hashlib.blake2b(digest_size = 20)
+        for arg in args:
+            _fingerprint(arg, self.quantize, h)
+        _fingerprint(kwargs, self.quantize, h)
+        return h.digest()
+
+    def __call__(self, *args, **kwargs):
+        try:
+            key = self.key(*args, **kwargs)
+        except TypeError:
+            #e.g., dual numbers from chetools.autodiff; just evaluate
+            self.uncached += 1
+            return self.fun(*args, **kwargs)
+
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return _copy(self._memory[key])
+
+        value = self._disk.get(key, _MISSING) if self._disk is not None else _MISSING
+        if value is not _MISSING:
+            self.disk_hits += 1
+        else:
+            value = self.fun(*args, **kwargs)
+            self.misses += 1
+            if self._disk is not None:
+                self._disk.put(key, value)
+
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            if self.maxsize is not None:
+                while len(self._memory) > self.maxsize:
+                    self._memory.popitem(last = False)
+        return _copy(value)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def cache_info(self):
+        """Dictionary of hit/miss counters and the current cache size."""
+        return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                'uncached': self.uncached, 'size': len(self._memory), 'maxsize': self.maxsize}
+
+    def cache_clear(self, disk = False):
+        """Empty the in-memory cache (and the disk cache too if disk = True)."""
+        with self._lock:
+            self._memory.clear()
+            self.hits = self.misses = self.disk_hits = self.uncached = 0
+        if disk and self._disk is not None:
+            self._disk.clear()
+
+
+def _copy(value):
+    #hand out copies so that callers cannot modify a cached array in place
+    return value.copy() if isinstance(value, np.ndarray) else value
+
+
+def memoize(fun = None, *, maxsize = 1024, quantize = None, path = None, name = None):
+    """
+    Cache a function's results, keyed on the exact bytes of its arguments.
+
+    Can be used as ``@memoize`` or ``@memoize(maxsize = ..., ...)``.
+
+    Parameters
+    ----------
+    maxsize : int or None, optional
+        Number of results kept in memory; the least recently used result is
+        discarded first. None means unbounded.
+    quantize : float, optional
+        If given, floating-point arguments are rounded to multiples of
+        quantize before the key is computed, so points closer together than
+        that are treated as the same point. Leave as None for exact matching.
+    path : str or path-like, optional
+        SQLite file used as a second-level cache that persists between runs
+        and can be shared by several processes.
+    name : str, optional
+        Name under which results are stored in the disk cache. Defaults to
+        the function's module and qualified name; set it explicitly if two
+        different functions share a name or the function is a lambda. A
+        fingerprint of the function's source (and the global data it uses)
+        is added to the name, so results stored by an earlier version of the
+        function are not reused after it is edited.
+
+    Notes
+    -----
+    Arguments that cannot be turned into a numeric array (for example, the
+    dual numbers used by :mod:`chetools.autodiff`) bypass the cache.
+    """
+    def decorate(f):
+        return CachedFunction(f, maxsize = maxsize, quantize = quantize, path = path, name = name)
+    return decorate(fun) if fun is not None else decorate
@@ -0,0 +1,206 @@
+"""
+Global root finding and minimization with Chebyshev proxies.
+
+For a smooth function on an interval, we can build a polynomial "proxy"
+that agrees with it to about machine precision, and then find *all* of the
+proxy's roots at once with linear algebra (the eigenvalues of its colleague
+matrix, the Chebyshev analog of the companion matrix used in
+:mod:`chetools.poly`). This is the idea behind Chebfun. It finds every zero of
+functions like k(x) = x**4 - np.exp(x) + 75.457 (Module 09), and every local
+minimum of oscillatory functions like np.sin(10*np.pi*x)/2/x + (x - 1)**4
+(Module 10), without initial guesses and with a few hundred evaluations.
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+from numpy.polynomial import chebyshev as C
+
+
+def _lobatto(n):
+    """n Chebyshev extreme points on [-1, 1], from +1 down to -1."""
+    return np.cos(np.pi*np.arange(n)/(n - 1))
+
+
+def _coefficients(values):
+    """Chebyshev coefficients of the interpolant through Lobatto values (FFT)."""
+    N = values.size - 1
+    if N == 0:
+        return values.astype(float).copy()
+    extended = np.concatenate((values, values[-2:0:-1]))
+    c = np.fft.rfft(extended).real[:N + 1]/N
+    c[0] /= 2
+    c[N] /= 2
+    return c
+
+
+class Piece(NamedTuple):
+    """One subinterval [a, b] and the Chebyshev coefficients of f on it."""
+    a: float
+    b: float
+    coef: np.ndarray
+
+
+class ChebProxy:
+    """
+    Piecewise Chebyshev interpolant of f on [a, b], resolved to tolerance.
+
+    On each piece, f is sampled on 17, 33, 65, ... Chebyshev points (earlier
+    samples are reused every time the grid is refined) and the coefficients
+    are computed by FFT. A piece is resolved once its trailing coefficients
+    fall below tol relative to the size of f; if that has not happened by
+    max_points, the piece is split in half and each half is resolved
+    separately.
+
+    Parameters
+    ----------
+    f : callable
+        Vectorized function of one variable.
+    a, b : float
+        Interval.
+    tol : float, optional
+        Relative resolution tolerance.
+    max_points : int, optional
+        Largest grid (2**k + 1) tried on a piece before splitting it. It also
+        bounds the size of the eigenvalue problems solved by :meth:`roots`.
+    max_depth : int, optional
+        Maximum number of successive splits.
+    """
+
+    def __init__(self, f, a, b, tol = 1e-13, max_points = 129, max_depth = 20):
+        if not b > a:
+            raise ValueError('b must be greater than a')
+        self.f = f
+        self.a, self.b = float(a), float(b)
+        self.tol = tol
+        self.max_points = max_points
+        self.max_depth = max_depth
+        self.nfev = 0
+        self.resolved = True
+        self.pieces = []
+        self._vscale = 0.0
+        self._build(self.a, self.b, 0)
+
+    def _eval(self, x):
+        self.nfev += x.size
+        return np.asarray(self.f(x), dtype = float)*np.ones_like(x)
+
+    def _build(self, a, b, depth):
+        n = 17
+        t = _lobatto(n)
+        values = self._eval(0.5*(a + b) + 0.5*(b - a)*t)
+        while True:
+            self._vscale = max(self._vscale, np.max(np.abs(values)))
+            coef = _coefficients(values)
+            scale = max(self._vscale, np.finfo(float).tiny)
+            if np.max(np.abs(coef[-3:])) <= self.tol*scale:
+                big = np.nonzero(np.abs(coef) > self.tol*scale)[0]
+                coef = coef[:big[-1] + 1] if big.size else coef[:1]
+                self.pieces.append(Piece(a, b, coef))
+                return
+            if 2*n - 1 > self.max_points:
+                break
+            #refine: the old points are every other point of the new grid
+            n = 2*n - 1
+            t = _lobatto(n)
+            new = np.empty(n)
+            new[0::2] = values
+            new[1::2] = self._eval(0.5*(a + b) + 0.5*(b - a)*t[1::2])
+            values = new
+
+        if depth >= self.max_depth or not np.all(np.isfinite(values)):
+            self.resolved = False
+            self.pieces.append(Piece(a, b, coef))
+            return
+        m = 0.5*(a + b)
+        self._build(a, m, depth + 1)
+        self._build(m, b, depth + 1)
+
+    def __call__(self, x):
+        """Evaluate the proxy (not f) at x."""
+        x = np.asarray(x, dtype = float)
+        out = np.full(x.shape, np.nan)
+        for p in self.pieces:
+            mask = (x >= p.a) & (x <= p.b)
+            out[mask] = C.chebval((2*x[mask] - p.a - p.b)/(p.b - p.a), p.coef)
+        return out[()]
+
+    def deriv(self):
+        """Return the derivative as a new proxy (no new evaluations of f)."""
+        d = object.__new__(ChebProxy)
+        d.__dict__.update(self.__dict__)
+        d.f = None
+        d.pieces = [Piece(p.a, p.b, C.chebder(p.coef)*2/(p.b - p.a) if p.coef.size > 1
+                          else np.zeros(1)) for p in self.pieces]
+        d._vscale = max(max(np.max(np.abs(p.coef)) for p in d.pieces), np.finfo(float).tiny)
+        return d
+
+    def roots(self, polish = 2):
+        """All real roots of the proxy on [a, b], sorted."""
+        found = []
+        for p in self.pieces:
+            c = p.coef
+            if c.size < 2 or np.max(np.abs(c)) == 0:
+                continue
+            r = C.chebroots(c)
+            keep = (np.abs(r.imag) <= 1e-8) & (np.abs(r.real) <= 1 + 1e-10)
+            t = np.clip(r[keep].real, -1, 1)
+            dc = C.chebder(c)
+            for _ in range(polish):
+                fp, dfp = C.chebval(t, c), C.chebval(t, dc)
+                with np.errstate(divide = 'ignore', invalid = 'ignore'):
+                    step = np.where(dfp != 0, fp/dfp, 0.0)
+                t = np.clip(np.where(np.abs(step) < 1e-3, t - step, t), -1, 1)
+            found.append(0.5*(p.a + p.b) + 0.5*(p.b - p.a)*t)
+        r = np.sort(np.concatenate(found)) if found else np.empty(0)
+        if r.size == 0:
+            return r
+        #a root on a shared breakpoint shows up once from each side
+        gap = 1e-10*(self.b - self.a)
+        return r[np.concatenate(([True], np.diff(r) > gap))]
+
+
+def cheb_roots(f, a, b, **kwargs):
+    """
+    Every root of a smooth function f on [a, b].
+
+    Builds a :class:`ChebProxy` (keyword arguments are passed on to it) and
+    returns the real roots of the proxy, sorted.
+    """
+    return ChebProxy(f, a, b, **kwargs).roots()
+
+
+class Extrema(NamedTuple):
+    """Local minima/maxima of f on an interval, plus the global minimum."""
+    xmin: np.ndarray
+    fmin: np.ndarray
+    xmax: np.ndarray
+    fmax: np.ndarray
+    xglobal: float
+    fglobal: float
+    nfev: int
+
+
+def cheb_extrema(f, a, b, **kwargs):
+    """
+    All local minima and maxima of a smooth f on [a, b], found from the roots
+    of the derivative of its Chebyshev proxy.
+
+    The global minimum also considers the endpoints. Function values are
+    evaluated with f itself, so they are exact at the located points.
+    """
+    proxy = ChebProxy(f, a, b, **kwargs)
+    dproxy = proxy.deriv()
+    x = dproxy.roots()
+    x = x[(x > a) & (x < b)]
+    curvature = dproxy.deriv()(x) if x.size else np.empty(0)
+    fx = np.asarray(f(x), dtype = float)*np.ones_like(x) if x.size else np.empty(0)
+    nfev = proxy.nfev + x.size
+    is_min = curvature > 0
+
+    candidates = np.concatenate(([a, b], x[is_min]))
+    fcand = np.concatenate((np.asarray(f(np.array([a, b])), dtype = float)*np.ones(2), fx[is_min]))
+    nfev += 2
+    best = np.argmin(fcand)
+    return Extrema(x[is_min], fx[is_min], x[~is_min], fx[~is_min],
+                   float(candidates[best]), float(fcand[best]), nfev)
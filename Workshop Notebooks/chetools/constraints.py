@@ -0,0 +1,233 @@
+"""
+Constraints with exact Jacobians, stacked into a single vector function.
+
+In Modules 10 and 11 constraints are passed to SLSQP as dictionaries,
+
+    con1 = {'type' : 'ineq' , 'fun' : conf1}
+    con2 = {'type' : 'eq'   , 'fun' : conf2}
+
+with no 'jac', so on every iteration SLSQP estimates each constraint's
+gradient by finite differences: n + 1 calls per constraint for n variables.
+That is nothing for two constraints on two variables, but a problem with a
+few hundred constraints spends almost all of its time there. A
+:class:`ConstraintSet` collects any number of constraint functions (each may
+return a whole vector of constraints), stacks them into one vector function,
+and computes the Jacobian of the whole stack with dual numbers in one pass:
+
+    cons = ConstraintSet()
+    cons.ineq(conf1)
+    cons.eq(conf2)
+    opt.minimize(z, var0, method = 'SLSQP', constraints = cons.as_dicts(var0))
+    opt.minimize(z, var0, method = 'trust-constr', constraints = cons.as_nonlinear(var0))
+
+Functions written with ordinary operators and numpy functions (like conf1
+and conf2) are differentiated automatically; functions that cannot take dual
+numbers fall back to finite differences.
+"""
+
+import numpy as np
+import scipy.optimize as opt
+
+from .autodiff import collect, seed
+
+
+class _Constraint:
+    """One function in a ConstraintSet: lb <= fun(x, *args) <= ub."""
+
+    def __init__(self, fun, lb, ub, jac, args, A = None):
+        self.fun, self.lb, self.ub = fun, lb, ub
+        self.jac, self.args, self.A = jac, args, A
+        self.size = None
+        self.calls = 0
+
+    def value(self, x):
+        if self.A is not None:
+            return self.A @ x
+        self.calls += 1
+        return np.atleast_1d(np.asarray(self.fun(x, *self.args), dtype = float)).ravel()
+
+    def _agrees(self, x, value, J):
+        """Check the first automatic Jacobian against one directional difference."""
+        v = np.random.default_rng(0).normal(size = x.size)
+        h = 1e-7*max(1.0, float(np.max(np.abs(x))))/np.linalg.norm(v)
+        slope = (self.value(x + h*v) - value)/h
+        return np.allclose(J @ v, slope, rtol = 1e-3, atol = 1e-5*(1 + np.max(np.abs(slope))))
+
+    def jacobian(self, x, xd):
+        """(value, Jacobian); xd is x seeded for automatic differentiation."""
+        n = x.size
+        if self.A is not None:
+            return self.A @ x, self.A
+        if callable(self.jac):
+            return self.value(x), np.asarray(self.jac(x, *self.args), dtype = float).reshape(-1, n)
+        if self.jac in ('auto', 'checked'):
+            try:
+                self.calls += 1
+                out = collect(self.fun(xd, *self.args), xd)
+                value = np.asarray(out.val, dtype = float).ravel()
+                J = out.grad.reshape(-1, n)
+                if self.jac == 'checked' or self._agrees(x, value, J):
+                    self.jac = 'checked'
+                    return value, J
+            except (TypeError, ValueError, AttributeError):
+                pass
+            #fun cannot take dual numbers (or silently drops them, e.g. through
+            #math.exp or float()): use finite differences from now on
+            self.jac = '2-point'
+        value = self.value(x)
+        J = opt.approx_fprime(x, self.value, np.sqrt(np.finfo(float).eps)*np.maximum(1, np.abs(x)))
+        return value, np.asarray(J, dtype = float).reshape(-1, n)
+
+
+class ConstraintSet:
+    """
+    A stack of constraints lb <= g(x) <= ub with one Jacobian for all of them.
+
+    Add constraints with :meth:`ineq`, :meth:`eq`, :meth:`add` or
+    :meth:`linear` (each returns the set, so calls can be chained), then pass
+    :meth:`as_dicts` (SLSQP, COBYLA) or :meth:`as_nonlinear` (trust-constr,
+    SLSQP) to ``opt.minimize()``. The most recent point is cached, so the
+    values computed along with a Jacobian are reused when the solver asks
+    for the constraint values at the same x.
+
+    Attributes
+    ----------
+    nfev, njev : int
+        Evaluations of the stacked constraint values and Jacobians.
+    ncalls : int
+        Calls made to the individual constraint functions.
+    """
+
+    def __init__(self):
+        self._items = []
+        self._x = self._value = self._jac = None
+        self.nfev = self.njev = 0
+
+    def add(self, fun, lb = -np.inf, ub = np.inf, jac = 'auto', args = ()):
+        """
+        Add lb <= fun(x, *args) <= ub.
+
+        fun may return a scalar or an array of any number of constraints;
+        lb and ub are scalars or arrays of matching size. jac is 'auto'
+        (automatic differentiation), '2-point' (finite differences) or a
+        callable returning the (m, n) Jacobian.
+        """
+        if not (callable(jac) or jac in ('auto', '2-point')):
+            raise ValueError("jac must be 'auto', '2-point' or a callable")
+        self._items.append(_Constraint(fun, lb, ub, jac, tuple(args)))
+        self._x = None
+        return self
+
+    def ineq(self, fun, jac = 'auto', args = ()):
+        """Add fun(x, *args) >= 0, as {'type': 'ineq'} does."""
+        return self.add(fun, 0.0, np.inf, jac, args)
+
+    def eq(self, fun, jac = 'auto', args = ()):
+        """Add fun(x, *args) == 0, as {'type': 'eq'} does."""
+        return self.add(fun, 0.0, 0.0, jac, args)
+
+    def linear(self, A, lb = -np.inf, ub = np.inf):
+        """Add lb <= A @ x <= ub; the Jacobian is A itself."""
+        A = np.atleast_2d(np.asarray(A, dtype = float))
+        self._items.append(_Constraint(None, lb, ub, None, (), A))
+        self._x = None
+        return self
+
+    @classmethod
+    def from_dicts(cls, constraints):
+        """
+        Build a set from the dictionaries used by ``opt.minimize()``.
+
+        A 'jac' given in a dictionary is used; otherwise the Jacobian is
+        found by automatic differentiation.
+        """
+        if isinstance(constraints, dict):
+            constraints = [constraints]
+        cons = cls()
+        for con in constraints:
+            jac = con.get('jac') or 'auto'
+            if con['type'] == 'eq':
+                cons.eq(con['fun'], jac, con.get('args', ()))
+            elif con['type'] == 'ineq':
+                cons.ineq(con['fun'], jac, con.get('args', ()))
+            else:
+                raise ValueError(f"unknown constraint type {con['type']!r}")
+        return cons
+
+    @property
+    def ncalls(self):
+        return sum(item.calls for item in self._items)
+
+    def __len__(self):
+        if any(item.size is None for item in self._items):
+            raise TypeError('the number of constraints is known after the first evaluation')
+        return sum(item.size for item in self._items)
+
+    def _check_sizes(self, values):
+        for item, v in zip(self._items, values):
+            item.size = v.size
+
+    def fun(self, x):
+        """All constraint values g(x), stacked into one vector."""
+        x = np.asarray(x, dtype = float).ravel()
+        if self._x is None or not np.array_equal(x, self._x):
+            values = [item.value(x) for item in self._items]
+            self._check_sizes(values)
+            self._x, self._value, self._jac = x.copy(), np.concatenate(values), None
+            self.nfev += 1
+        return self._value.copy()
+
+    def jac(self, x):
+        """Jacobian of :meth:`fun`, shape (m, n)."""
+        x = np.asarray(x, dtype = float).ravel()
+        if self._jac is None or not np.array_equal(x, self._x):
+            xd = seed(x)
+            parts = [item.jacobian(x, xd) for item in self._items]
+            self._check_sizes([p[0] for p in parts])
+            self._x = x.copy()
+            self._value = np.concatenate([p[0] for p in parts])
+            self._jac = np.concatenate([p[1] for p in parts])
+            self.njev += 1
+        return self._jac.copy()
+
+    def bounds(self, x0):
+        """Lower and upper bound arrays of the stacked constraints."""
+        self.fun(x0)
+        lb = np.concatenate([np.broadcast_to(np.asarray(item.lb, dtype = float), item.size)
+                             for item in self._items])
+        ub = np.concatenate([np.broadcast_to(np.asarray(item.ub, dtype = float), item.size)
+                             for item in self._items])
+        return lb, ub
+
+    def violation(self, x):
+        """Largest violation of any constraint at x (0 if x is feasible)."""
+        lb, ub = self.bounds(x)
+        g = self.fun(x)
+        return float(np.max(np.maximum(lb - g, g - ub), initial = 0.0))
+
+    def as_nonlinear(self, x0):
+        """One ``opt.NonlinearConstraint`` for the whole stack (sizes found at x0)."""
+        lb, ub = self.bounds(x0)
+        return opt.NonlinearConstraint(self.fun, lb, ub, jac = self.jac)
+
+    def as_dicts(self, x0):
+        """
+        At most two dictionaries, {'type': 'eq'} and {'type': 'ineq'}, each
+        with a 'jac', covering every constraint (sizes found at x0).
+        Two-sided constraints lb <= g <= ub become g - lb >= 0 and ub - g >= 0.
+        """
+        lb, ub = self.bounds(x0)
+        eq = lb == ub
+        low = ~eq & np.isfinite(lb)
+        high = ~eq & np.isfinite(ub)
+        sign = np.concatenate([np.ones(low.sum()), -np.ones(high.sum())])
+        shift = np.concatenate([lb[low], ub[high]])
+        rows = np.concatenate([np.nonzero(low)[0], np.nonzero(high)[0]])
+        out = []
+        if eq.any():
+            out.append({'type': 'eq', 'fun': lambda x: self.fun(x)[eq] - lb[eq],
+                        'jac': lambda x: self.jac(x)[eq]})
+        if rows.size:
+            out.append({'type': 'ineq', 'fun': lambda x: sign*(self.fun(x)[rows] - shift),
+                        'jac': lambda x: sign[:, None]*self.jac(x)[rows]})
+        return out
@@ -0,0 +1,254 @@
+"""
+Continuation: solving a family of equations F(x, p) = 0 as p varies.
+
+If we need the solution of a Module 12-style system for thousands of values
+of a parameter p, solving each one from the same cold initial guess
+(var0 = [10, 10, 10, 10]) wastes almost all of the work: the solution at one
+value of p is an excellent starting point for a nearby value of p. Better
+still, the tangent to the solution curve predicts where the next solution
+is, so Newton only has to make a small correction.
+
+Two drivers are provided:
+
+* natural-parameter continuation steps p on a fixed grid; it is simple, but
+  it fails at a turning point (fold), where the curve x(p) bends back;
+* pseudo-arclength continuation steps along the curve itself, treating p as
+  one more unknown, so it follows the branch around turning points.
+
+Derivatives are computed exactly with :mod:`chetools.autodiff` unless you
+provide them.
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+
+from .autodiff import jacobian as _ad_jacobian
+
+
+class ContinuationResult(NamedTuple):
+    """
+    Points along a solution branch.
+
+    p and x hold the parameter and solution at every accepted point (x has
+    one row per point, or is 1-D for a scalar equation); iterations holds the
+    Newton iterations spent correcting each point, and turning_points the
+    indices where p reversed direction.
+    """
+    p: np.ndarray
+    x: np.ndarray
+    iterations: np.ndarray
+    turning_points: np.ndarray
+    success: bool
+    message: str
+
+
+class _System:
+    """
+    Residual G(y) = F(x, p, *args) and its Jacobian for y = [x, p].
+
+    The arclength driver works in scaled coordinates u = y/scale so that
+    unknowns of very different magnitude contribute comparably to the
+    length of a step; G and J below accept u, not y.
+    """
+
+    def __init__(self, F, scalar, args, jac, scale):
+        self.F, self.scalar, self.args = F, scalar, args
+        self.user_jac = jac
+        self.scale = scale
+        self._ad = _ad_jacobian(self._G)
+
+    def _split(self, y):
+        return (y[0] if self.scalar else y[:-1]), y[-1]
+
+    def _G(self, u):
+        x, p = self._split(u*self.scale)
+        return self.F(x, p, *self.args)
+
+    def G(self, u):
+        return np.atleast_1d(np.asarray(self._G(u), dtype = float)).ravel()
+
+    def J(self, u):
+        if self.user_jac is not None:
+            x, p = self._split(u*self.scale)
+            J = np.asarray(self.user_jac(x, p, *self.args), dtype = float)
+            return J.reshape(-1, u.size)*self.scale
+        return self._ad(u).reshape(-1, u.size)
+
+
+def _newton_fixed_p(system, y, tol, maxiter):
+    """Correct x at fixed p; returns (y, iterations, converged)."""
+    y = y.copy()
+    for it in range(1, maxiter + 1):
+        r = system.G(y)
+        Jx = system.J(y)[:, :-1]
+        try:
+            dx = np.linalg.solve(Jx, -r)
+        except np.linalg.LinAlgError:
+            return y, it, False
+        y[:-1] += dx
+        if np.linalg.norm(dx) <= tol*(1 + np.linalg.norm(y[:-1])):
+            return y, it, bool(np.all(np.isfinite(y)))
+    return y, maxiter, False
+
+
+def _tangent(J, t_old):
+    """Unit tangent to the branch, oriented to agree with t_old."""
+    A = np.vstack((J, t_old))
+    rhs = np.zeros(A.shape[0])
+    rhs[-1] = 1.0
+    t = np.linalg.solve(A, rhs)
+    return t/np.linalg.norm(t)
+
+
+def continuation(F, x0, p0, p1, args = (), jac = None, method = 'arclength',
+                 steps = 50, ds = None, ds_min = None, ds_max = None,
+                 max_steps = 1000, tol = 1e-10, maxiter = 10):
+    """
+    Trace the solutions of F(x, p) = 0 from p = p0 to p = p1.
+
+    Parameters
+    ----------
+    F : callable
+        Residual ``F(x, p, *args)`` returning a scalar (for a scalar x) or a
+        list/array with one entry per unknown.
+    x0 : float or array_like
+        Solution, or a good initial guess for it, at p = p0. It is corrected
+        with Newton's method before continuation starts.
+    p0, p1 : float
+        Start and end values of the parameter.
+    args : tuple, optional
+        Extra arguments passed to F (and jac).
+    jac : callable, optional
+        ``jac(x, p, *args)`` returning the n x (n + 1) matrix [dF/dx, dF/dp].
+        By default it is computed with automatic differentiation.
+    method : {'arclength', 'natural'}, optional
+        Pseudo-arclength continuation (follows turning points) or natural
+        parameter continuation on a uniform grid of ``steps`` intervals.
+    steps : int, optional
+        Number of parameter intervals for 'natural'; for 'arclength' it sets
+        the default initial step, ``ds = 1/steps``.
+    ds, ds_min, ds_max : float, optional
+        Initial, smallest and largest arclength steps. Steps are measured in
+        scaled units (each unknown divided by the magnitude of its starting
+        value, and p by |p1 - p0|). The step grows after easy corrections and
+        is halved whenever a correction fails.
+    max_steps : int, optional
+        Maximum number of arclength steps.
+    tol : float, optional
+        Newton convergence tolerance on the relative size of the update.
+    maxiter : int, optional
+        Maximum Newton iterations per corrector.
+
+    Returns
+    -------
+    ContinuationResult
+    """
+    if method not in ('arclength', 'natural'):
+        raise ValueError("method must be 'arclength' or 'natural'")
+    scalar = np.ndim(x0) == 0
+    y0 = np.append(np.asarray(x0, dtype = float).ravel(), float(p0))
+    if method == 'natural':
+        scale = np.ones(y0.size)
+    else:
+        scale = np.append(np.maximum(np.abs(y0[:-1]), 1.0), abs(p1 - p0) or 1.0)
+    system = _System(F, scalar, args, jac, scale)
+    p1 = p1/scale[-1]
+    y, its, ok = _newton_fixed_p(system, y0/scale, tol, 50)
+    if not ok:
+        return _result([y], [its], [], scalar, False, 'Newton failed at the starting point', scale)
+    if method == 'natural':
+        return _natural(system, y, its, p1, steps, tol, maxiter, scalar)
+
+    #in scaled units, p travels a distance of 1 between p0 and p1
+    ds = 1/steps if ds is None else ds
+    ds_min = ds*1e-6 if ds_min is None else ds_min
+    ds_max = 0.2 if ds_max is None else ds_max
+    direction = np.sign(p1 - y[-1]) or 1.0
+
+    t = np.zeros(y.size)
+    t[-1] = direction
+    t = _tangent(system.J(y), t)
+    points, iterations, turns = [y], [its], []
+    for _ in range(max_steps):
+        while True:
+            y_pred = y + ds*t
+            y_new, its, ok = _arclength_correct(system, y_pred, t, tol, maxiter)
+            failure = 'step size fell below ds_min'
+            if ok and (y_new[-1] - p1)*(y[-1] - p1) > 0:
+                break
+            if ok:
+                #crossed p1: land exactly on it by correcting the interpolated
+                #point at fixed p; if that fails, retry with a shorter step
+                w = (p1 - y[-1])/(y_new[-1] - y[-1])
+                y_end = y + w*(y_new - y)
+                y_end[-1] = p1
+                y_end, its_end, ok = _newton_fixed_p(system, y_end, tol, maxiter)
+                if ok:
+                    t_new = _tangent(system.J(y_new), t)
+                    if np.sign(t_new[-1]) != np.sign(t[-1]) and t[-1] != 0:
+                        turns.append(len(points))
+                    points.append(y_end)
+                    iterations.append(its + its_end)
+                    return _result(points, iterations, turns, scalar, True, 'reached p1',
+                                   system.scale)
+                failure = 'step size fell below ds_min while correcting at p1'
+            ds *= 0.5
+            if ds < ds_min:
+                return _result(points, iterations, turns, scalar, False, failure, system.scale)
+        t_new = _tangent(system.J(y_new), t)
+        if np.sign(t_new[-1]) != np.sign(t[-1]) and t[-1] != 0:
+            turns.append(len(points))
+        points.append(y_new)
+        iterations.append(its)
+        y, t = y_new, t_new
+        if its <= 3:
+            ds = min(1.5*ds, ds_max)
+    return _result(points, iterations, turns, scalar, False, 'max_steps reached before p1',
+                   system.scale)
+
+
+def _arclength_correct(system, y_pred, t, tol, maxiter):
+    """Newton on [F(y) = 0, t·(y - y_pred) = 0]; returns (y, iterations, converged)."""
+    y = y_pred.copy()
+    for it in range(1, maxiter + 1):
+        r = np.append(system.G(y), t @ (y - y_pred))
+        A = np.vstack((system.J(y), t))
+        try:
+            dy = np.linalg.solve(A, -r)
+        except np.linalg.LinAlgError:
+            return y, it, False
+        y += dy
+        if not np.all(np.isfinite(y)):
+            return y, it, False
+        if np.linalg.norm(dy) <= tol*(1 + np.linalg.norm(y)):
+            return y, it, True
+    return y, maxiter, False
+
+
+def _natural(system, y, its, p1, steps, tol, maxiter, scalar):
+    pgrid = np.linspace(y[-1], p1, steps + 1)
+    points, iterations = [y], [its]
+    for p in pgrid[1:]:
+        J = system.J(y)
+        try:
+            dxdp = np.linalg.solve(J[:, :-1], -J[:, -1])
+        except np.linalg.LinAlgError:
+            return _result(points, iterations, [], scalar, False,
+                           f'singular Jacobian near p = {y[-1]:g} (turning point?)', system.scale)
+        y_pred = np.append(y[:-1] + dxdp*(p - y[-1]), p)
+        y_new, its, ok = _newton_fixed_p(system, y_pred, tol, maxiter)
+        if not ok:
+            return _result(points, iterations, [], scalar, False,
+                           f'Newton failed at p = {p:g}; try method = "arclength"', system.scale)
+        points.append(y_new)
+        iterations.append(its)
+        y = y_new
+    return _result(points, iterations, [], scalar, True, 'reached p1', system.scale)
+
+
+def _result(points, iterations, turns, scalar, success, message, scale):
+    Y = np.array(points)*scale
+    x = Y[:, 0] if scalar else Y[:, :-1]
+    return ContinuationResult(Y[:, -1], x, np.array(iterations), np.array(turns, dtype = int),
+                              success, message)
@@ -0,0 +1,549 @@
+"""
+Rate laws for fitting enzyme kinetics, with exact derivatives.
+
+Module 11 fits the Michaelis-Menten model by minimizing
+
+    def obj(par, C, r):
+        Vmax  = par[0]
+        Km    = par[1]
+        model = (Vmax*C)/(Km + C)
+        SSE = sum((r - model)**2)
+        return SSE
+
+Two things make this slower than it needs to be: Python's built-in sum adds
+up the numpy array one element at a time, and since no gradient is given,
+``opt.minimize()`` estimates it by finite differences, evaluating the model
+n + 1 times per gradient. For rational rate laws the derivatives with
+respect to the parameters are easy to write down, and most of the work
+(e.g. Km + C) is shared with the model itself. The builders here compute the
+SSE and its exact gradient (or the residuals and their Jacobian) together
+in one vectorized pass:
+
+    sse = kinetic_sse(michaelis_menten, CS, rate)
+    opt.minimize(sse, [1, 1], jac = True)
+
+    res = kinetic_residuals(michaelis_menten, CS, rate)
+    opt.least_squares(res, res.guess(), jac = res.jac)
+
+    opt.curve_fit(michaelis_menten.f, CS, rate, jac = michaelis_menten.jac)
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+
+
+class RateLaw:
+    """
+    A rate law r = f(C, *params) and its Jacobian with respect to params.
+
+    Parameters
+    ----------
+    name : str
+        Short name.
+    params : tuple of str
+        Parameter names, in order.
+    evaluate : callable
+        ``evaluate(C, *params)`` returning the rate and an array of its
+        derivatives with respect to each parameter, stacked on the last
+        axis. It must broadcast, so that a whole batch of parameter sets
+        (with shape (B, 1)) can be evaluated against C (with shape (B, n))
+        at once.
+    guess : callable, optional
+        ``guess(C, r, method, weighted)`` returning (B, k) initial guesses
+        for (B, n) data from a linearized form of the law (nan where it
+        fails); see :func:`linearized_guess`.
+    """
+
+    def __init__(self, name, params, evaluate, guess = None):
+        self.name = name
+        self.params = tuple(params)
+        self.evaluate = evaluate
+        self.guess = guess
+
+    def __repr__(self):
+        return f"RateLaw('{self.name}', params = {self.params})"
+
+    def f(self, C, *params):
+        """The rate; signature suitable for ``opt.curve_fit()``."""
+        return self.evaluate(np.asarray(C, dtype = float), *params)[0]
+
+    def jac(self, C, *params):
+        """(n, k) derivatives of the rate; ``opt.curve_fit(..., jac = law.jac)``."""
+        return self.evaluate(np.asarray(C, dtype = float), *params)[1]
+
+    def __call__(self, C, *params):
+        return self.f(C, *params)
+
+
+def _michaelis_menten(C, Vmax, Km):
+    D = 1/(Km + C)
+    r = Vmax*C*D
+    return r, np.stack(np.broadcast_arrays(C*D, -r*D), axis = -1)
+
+
+def _hill(C, Vmax, K, n):
+    #r = Vmax*C^n/(K^n + C^n), with C^n and ln(C) taken as 0 at C = 0
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        logC = np.where(C > 0, np.log(np.where(C > 0, C, 1.0)), 0.0)
+        u = np.where(C > 0, np.exp(n*logC), 0.0)
+        w = K**n
+        D = 1/(w + u)
+        s = u*D
+        r = Vmax*s
+        dK = -r*n/K*w*D
+        dn = r*w*D*(logC - np.log(K))
+    return r, np.stack(np.broadcast_arrays(s, dK, dn), axis = -1)
+
+
+def _substrate_inhibition(C, Vmax, Km, Ki):
+    #Haldane: r = Vmax*C/(Km + C + C^2/Ki)
+    D = 1/(Km + C + C**2/Ki)
+    r = Vmax*C*D
+    return r, np.stack(np.broadcast_arrays(C*D, -r*D, r*D*C**2/Ki**2), axis = -1)
+
+
+def _two_site(C, V1, K1, V2, K2):
+    #two independent sites (or enzymes): r = V1*C/(K1 + C) + V2*C/(K2 + C)
+    D1, D2 = 1/(K1 + C), 1/(K2 + C)
+    r1, r2 = V1*C*D1, V2*C*D2
+    return r1 + r2, np.stack(np.broadcast_arrays(C*D1, -r1*D1, C*D2, -r2*D2), axis = -1)
+
+
+michaelis_menten = RateLaw('michaelis-menten', ('Vmax', 'Km'), _michaelis_menten)
+hill = RateLaw('hill', ('Vmax', 'K', 'n'), _hill)
+substrate_inhibition = RateLaw('substrate-inhibition', ('Vmax', 'Km', 'Ki'),
+                               _substrate_inhibition)
+two_site = RateLaw('two-site', ('V1', 'K1', 'V2', 'K2'), _two_site)
+
+#name -> RateLaw
+RATE_LAWS = {law.name: law for law in (michaelis_menten, hill, substrate_inhibition, two_site)}
+
+
+def _law(law):
+    return RATE_LAWS[law] if isinstance(law, str) else law
+
+
+def kinetic_sse(law, C, r):
+    """
+    Objective for ``opt.minimize(..., jac = True)``: the sum of squared
+    residuals of a rate law and its exact gradient.
+
+    Returns a callable ``sse(par)`` returning (SSE, gradient).
+    """
+    law = _law(law)
+    C, r = np.asarray(C, dtype = float), np.asarray(r, dtype = float)
+
+    def sse(par):
+        model, J = law.evaluate(C, *par)
+        e = r - model
+        return e @ e, -2*(e @ J)
+    sse.law = law
+    return sse
+
+
+class KineticResiduals:
+    """
+    Residuals r - f(C, *par) for ``opt.least_squares()``; see
+    :func:`kinetic_residuals`. Calling the object returns the residuals, and
+    ``jac(par)`` their Jacobian; the model and its derivatives are computed
+    together and the result is reused if jac is called at the same par.
+    """
+
+    def __init__(self, law, C, r):
+        self.law = _law(law)
+        self.C = np.asarray(C, dtype = float)
+        self.r = np.asarray(r, dtype = float)
+        self._par = None
+
+    def _evaluate(self, par):
+        par = np.asarray(par, dtype = float)
+        if self._par is None or not np.array_equal(par, self._par):
+            model, J = self.law.evaluate(self.C, *par)
+            self._par, self._res, self._jac = par.copy(), self.r - model, -J
+        return self._res, self._jac
+
+    def __call__(self, par):
+        return self._evaluate(par)[0].copy()
+
+    def jac(self, par):
+        return self._evaluate(par)[1].copy()
+
+    def guess(self, method = 'best'):
+        """Initial guess from :func:`linearized_guess`."""
+        return linearized_guess(self.law, self.C, self.r, method)
+
+
+def kinetic_residuals(law, C, r):
+    """
+    Residual function for ``opt.least_squares(res, par0, jac = res.jac)``.
+
+    law is a :class:`RateLaw` or the name of one in :data:`RATE_LAWS`.
+    """
+    return KineticResiduals(law, C, r)
+
+
+#---- initial guesses -----------------------------------------------------------
+
+#linear transforms of the Michaelis-Menten equation, in the order they are tried
+TRANSFORMS = ('hanes-woolf', 'lineweaver-burk', 'eadie-hofstee')
+
+
+def _linear_fit(X, y, wt):
+    """
+    Weighted linear least squares y ~ X @ coef for every dataset at once.
+
+    X is (B, n, m) and y, wt are (B, n); points that are not finite or have
+    zero weight are ignored. Datasets with fewer than m usable points get nan.
+    """
+    with np.errstate(all = 'ignore'):
+        ok = np.isfinite(y) & np.all(np.isfinite(X), axis = -1) & (wt > 0)
+        wt = np.where(ok, wt, 0.0)
+        wt = wt/np.max(wt, axis = -1, keepdims = True)  #scale so r**4 cannot underflow
+        s = np.sqrt(np.where(np.isfinite(wt), wt, 0.0))
+        A = np.where(ok[..., None], X, 0.0)*s[..., None]
+        b = np.where(ok, y, 0.0)*s
+        #normal equations, with the columns scaled to unit length so that
+        #e.g. 1/C (up to 1000) and 1 do not make them needlessly ill-conditioned
+        scale = np.sqrt(np.einsum('bnm,bnm->bm', A, A))
+        scale = np.where(scale > 0, scale, 1.0)
+        A = A/scale[:, None, :]
+        G = np.einsum('bnk,bnl->bkl', A, A)
+        g = np.einsum('bnk,bn->bk', A, b)
+        try:
+            coef = np.linalg.solve(G, g[..., None])[..., 0]
+        except np.linalg.LinAlgError:
+            coef = np.einsum('bkl,bl->bk', np.linalg.pinv(G), g)
+        coef = coef/scale
+    coef[ok.sum(axis = -1) < X.shape[-1]] = np.nan
+    return coef
+
+
+def _rational_guess(C, r, method, weighted, inhibition):
+    """
+    Vmax, Km and 1/Ki from a straight-line (or, with substrate inhibition,
+    a quadratic) fit to one of the classic linearized forms:
+
+    * Hanes-Woolf:      C/r = Km/Vmax + C/Vmax [+ C^2/(Vmax*Ki)]
+    * Lineweaver-Burk:  1/r = 1/Vmax + (Km/Vmax)/C [+ C/(Vmax*Ki)]
+    * Eadie-Hofstee:      r = Vmax - Km*r/C [- r*C/Ki]
+
+    Transforming the rates also transforms their errors: a constant error in
+    r becomes an error in 1/r proportional to 1/r^2, which is why an
+    unweighted Lineweaver-Burk plot is dominated by the points at the lowest
+    concentrations. With weighted = True each point is weighted by the
+    inverse of its (first order) error variance after the transformation.
+    """
+    with np.errstate(all = 'ignore'):
+        usable = (C > 0) & (r > 0)
+        C, r = np.where(usable, C, np.nan), np.where(usable, r, np.nan)
+        one = np.ones_like(C)
+        if method == 'hanes-woolf':
+            cols, y, wt = [one, C, C**2], C/r, r**4/C**2
+        elif method == 'lineweaver-burk':
+            cols, y, wt = [one, 1/C, C], 1/r, r**4
+        elif method == 'eadie-hofstee':
+            cols, y, wt = [one, r/C, r*C], r, one
+        else:
+            raise ValueError(f"method must be one of {TRANSFORMS} or 'best', not {method!r}")
+        X = np.stack(cols[:3 if inhibition else 2], axis = -1)
+        if not weighted:
+            wt = one
+        elif method == 'eadie-hofstee':
+            #r appears on both axes, so the error in r - Vmax + Km*r/C is
+            #(1 + Km/C) times the error in r; estimate Km with a first, unweighted pass
+            Km = np.clip(-_linear_fit(X, y, one)[:, 1], 0, None)
+            wt = (C/(C + Km[:, None]))**2
+        coef = _linear_fit(X, y, wt)
+        if not inhibition:
+            coef = np.concatenate([coef, np.zeros_like(coef[:, :1])], axis = -1)
+        a, b, c = coef.T
+        if method == 'hanes-woolf':
+            Vmax, Km, invKi = 1/b, a/b, c/b
+        elif method == 'lineweaver-burk':
+            Vmax, Km, invKi = 1/a, b/a, c/a
+        else:
+            Vmax, Km, invKi = a, -b, -c
+    return Vmax, Km, invKi
+
+
+def _mm_guess(C, r, method, weighted):
+    Vmax, Km, _ = _rational_guess(C, r, method, weighted, inhibition = False)
+    return np.stack([Vmax, Km], axis = -1)
+
+
+def _substrate_inhibition_guess(C, r, method, weighted):
+    Vmax, Km, invKi = _rational_guess(C, r, method, weighted, inhibition = True)
+    with np.errstate(all = 'ignore'):
+        #no sign of inhibition: start with Ki well beyond the data
+        Ki = np.where(invKi > 0, 1/invKi, 100*np.nanmax(np.where(np.isnan(r), np.nan, C), axis = -1))
+    return np.stack([Vmax, Km, Ki], axis = -1)
+
+
+def _hill_guess(C, r, method, weighted):
+    """
+    Hill plot, ln(r/(Vmax - r)) = n*ln(C) - n*ln(K), for a few trial values
+    of Vmax (the Michaelis-Menten estimate and multiples of the largest rate).
+    """
+    Vmm = _mm_guess(C, r, method, weighted)[:, 0]
+    with np.errstate(all = 'ignore'):
+        rmax = np.nanmax(r, axis = -1)
+        trials = [np.where(Vmm > rmax, Vmm, np.nan)] + [f*rmax for f in (1.05, 1.2, 1.5, 2.0)]
+        usable = (C > 0) & (r > 0)
+        logC = np.log(np.where(usable, C, np.nan))
+        candidates = []
+        for Vmax in trials:
+            V = Vmax[:, None]
+            y = np.log(r/(V - r))
+            #error in y from a constant error in r: dy/dr = V/(r*(V - r))
+            wt = (r*(V - r)/V)**2 if weighted else np.ones_like(r)
+            a, n = _linear_fit(np.stack([np.ones_like(logC), logC], axis = -1), y,
+                               np.where(r < V, wt, 0.0)).T
+            candidates.append(np.stack([Vmax, np.exp(-a/n), n], axis = -1))
+    return _pick(hill, C, r, candidates)
+
+
+def _two_site_guess(C, r, method, weighted):
+    """Split the Michaelis-Menten guess into a high- and a low-affinity site."""
+    Vmax, Km = _mm_guess(C, r, method, weighted).T
+    candidates = [np.stack([f*Vmax, Km/s, (1 - f)*Vmax, Km*s], axis = -1)
+                  for f in (0.25, 0.5, 0.75) for s in (3.0, 10.0)]
+    return _pick(two_site, C, r, candidates)
+
+
+michaelis_menten.guess = _mm_guess
+hill.guess = _hill_guess
+substrate_inhibition.guess = _substrate_inhibition_guess
+two_site.guess = _two_site_guess
+
+
+def _shape_guess(law, C, r):
+    """Rough starting values from the shape of each dataset."""
+    with np.errstate(all = 'ignore'):
+        rmax = np.nanmax(r, axis = -1)
+        Cmax = np.nanmax(np.where(np.isnan(r), np.nan, C), axis = -1)
+        #substrate concentration where the rate first reaches half its maximum
+        half = np.where(r >= 0.5*rmax[:, None], C, np.inf)
+        K = np.min(half, axis = -1)
+        K = np.where(np.isfinite(K) & (K > 0), K, 0.5*Cmax)
+    guess = {'Vmax': rmax, 'Km': K, 'K': K, 'n': np.ones_like(K), 'Ki': 10*Cmax,
+             'V1': rmax/2, 'K1': K/3, 'V2': rmax/2, 'K2': 3*K}
+    return np.stack([guess.get(name, np.ones_like(K)) for name in law.params], axis = -1)
+
+
+def _valid(P):
+    return np.all(np.isfinite(P) & (P > 0), axis = -1)
+
+
+def _pick(law, C, r, candidates):
+    """For each dataset, the valid candidate parameter set with the smallest SSE."""
+    w = ~np.isnan(r)
+    rr = np.where(w, r, 0.0)
+    best = np.full_like(candidates[0], np.nan)
+    best_sse = np.full(best.shape[0], np.inf)
+    for P in candidates:
+        ok = _valid(P)
+        with np.errstate(all = 'ignore'):
+            sse = np.where(ok, _batch_evaluate(law, C, rr, w, np.where(ok[:, None], P, 1.0))[2],
+                           np.inf)
+        better = sse < best_sse
+        best[better], best_sse[better] = P[better], sse[better]
+    return best
+
+
+def linearized_guess(law, C, r, method = 'best', weighted = True):
+    """
+    Initial guesses for a nonlinear fit from linearized forms of the rate law.
+
+    Before computers, Michaelis-Menten parameters were read off straight-line
+    plots: Lineweaver-Burk (1/r against 1/C), Eadie-Hofstee (r against r/C)
+    and Hanes-Woolf (C/r against C). Fitting those lines is closed-form
+    linear least squares, so it is practically free, and although the
+    transformation distorts the errors enough that the result is not the
+    best fit, it is usually close to it, which is all an initial guess needs.
+    Substrate inhibition adds one column to the same linear fits, and the
+    Hill equation uses a Hill plot. Laws without a linearization (and
+    datasets where it fails, e.g. a negative Km) fall back to estimates from
+    the maximum rate and the concentration at half of it.
+
+    Parameters
+    ----------
+    law : RateLaw or str
+        Rate law to be fitted.
+    C, r : array_like
+        Concentrations and rates, (n,) for one dataset or (B, n) for many
+        (C may be (n,) for all of them); nan marks missing rates.
+    method : str, optional
+        One of :data:`TRANSFORMS`, or 'best' to try all of them and keep,
+        for each dataset, the guess with the smallest sum of squared
+        residuals on the original (untransformed) data.
+    weighted : bool, optional
+        Weight the transformed points by their expected error variance.
+
+    Returns
+    -------
+    ndarray
+        (k,) for one dataset or (B, k), in the order of law.params.
+    """
+    law = _law(law)
+    single = np.ndim(r) == 1
+    C, r = _broadcast_data(C, r)
+    fallback = _shape_guess(law, C, r)
+    guess = getattr(law, 'guess', None)
+    if guess is None:
+        P = fallback
+    else:
+        methods = TRANSFORMS if method == 'best' else (method,)
+        P = _pick(law, C, r, [guess(C, r, m, weighted) for m in methods])
+        P = np.where(_valid(P)[:, None], P, fallback)
+    return P[0] if single else P
+
+
+#---- fitting many datasets at once --------------------------------------------
+
+class BatchFitResult(NamedTuple):
+    """
+    Result of :func:`fit_batch`, one entry per dataset.
+
+    params has shape (B, k) with columns in the order of law.params; sse is
+    the sum of squared residuals, converged and iterations report on each
+    fit, and covariance (B, k, k) and stderr (B, k) are the usual
+    least-squares estimates, s^2 (J^T J)^-1 with s^2 = sse/(n - k).
+    """
+    params: np.ndarray
+    sse: np.ndarray
+    converged: np.ndarray
+    iterations: np.ndarray
+    covariance: np.ndarray
+    stderr: np.ndarray
+
+
+def _batch_evaluate(law, C, r, w, P):
+    model, J = law.evaluate(C, *(P[:, j, None] for j in range(P.shape[1])))
+    e = np.where(w, r - model, 0.0)
+    J = np.where(w[..., None], J, 0.0)
+    return e, J, np.einsum('bn,bn->b', e, e)
+
+
+def _covariance(J, sse, npts, k):
+    JTJ = np.einsum('bnk,bnl->bkl', J, J)
+    with np.errstate(all = 'ignore'):
+        s2 = np.where(npts > k, sse/(npts - k), np.nan)
+        #invert J^T J scaled to unit diagonal, so that a parameter the rate is
+        #barely sensitive to (Ki when there is no inhibition) gets a huge
+        #standard error instead of being truncated to 0 by pinv; if the scaled
+        #matrix is still singular, some combination of parameters is not
+        #determined by the data at all and the errors are infinite
+        d = np.sqrt(np.diagonal(JTJ, axis1 = 1, axis2 = 2))
+        scaled = JTJ/(d[:, :, None]*d[:, None, :])
+        singular = ~np.all(d > 0, axis = 1)
+        scaled[singular] = np.eye(JTJ.shape[1])
+        singular |= ~(np.linalg.cond(scaled) < 1e12)
+        scaled[singular] = np.eye(JTJ.shape[1])
+        cov = np.linalg.inv(scaled)/(d[:, :, None]*d[:, None, :])*s2[:, None, None]
+        cov[singular] = np.inf
+    stderr = np.sqrt(np.clip(np.diagonal(cov, axis1 = 1, axis2 = 2), 0, None))
+    return cov, stderr
+
+
+def _broadcast_data(C, r):
+    r = np.atleast_2d(np.asarray(r, dtype = float))
+    C = np.broadcast_to(np.asarray(C, dtype = float), r.shape)
+    return C, r
+
+
+def fit_batch(law, C, r, p0 = None, maxiter = 100, xtol = 1e-10, ftol = 1e-12,
+              gtol = 1e-10):
+    """
+    Fit a rate law to many datasets at once.
+
+    Runs Levenberg-Marquardt on every dataset simultaneously: each iteration
+    is a few numpy operations on (B, n, k) arrays, every dataset has its own
+    damping parameter, and each one stops as soon as it has converged. (One
+    could instead stack all residuals into a single ``opt.least_squares()``
+    problem with a block-diagonal Jacobian, but then one trust region is
+    shared by all datasets and the slowest fit sets the pace for all of
+    them.)
+
+    Parameters
+    ----------
+    law : RateLaw or str
+        Model to fit, e.g. :data:`michaelis_menten` or 'hill'.
+    C : array_like
+        Substrate concentrations, shape (B, n), or (n,) if every dataset
+        used the same concentrations.
+    r : array_like
+        Rates, shape (B, n). Missing points may be nan, so datasets of
+        different lengths can be padded to the same n.
+    p0 : array_like, optional
+        Initial guesses, (k,) for all datasets or (B, k). By default each
+        dataset gets its own from :func:`linearized_guess`.
+    maxiter : int, optional
+        Maximum iterations per dataset.
+    xtol, ftol, gtol : float, optional
+        Convergence when the relative parameter step is below xtol, the
+        relative decrease of the SSE is below ftol, or the gradient is below
+        gtol (each component scaled by |parameter|/SSE).
+
+    Returns
+    -------
+    BatchFitResult
+    """
+    law = _law(law)
+    C, r = _broadcast_data(C, r)
+    w = ~np.isnan(r)
+    r = np.where(w, r, 0.0)
+    B, k = r.shape[0], len(law.params)
+    P = linearized_guess(law, C, np.where(w, r, np.nan)) if p0 is None else \
+        np.array(np.broadcast_to(np.asarray(p0, dtype = float), (B, k)))
+    e, J, sse = _batch_evaluate(law, C, r, w, P)
+    lam = np.full(B, 1e-3)
+    converged = np.zeros(B, dtype = bool)
+    iterations = np.zeros(B, dtype = int)
+    active = np.isfinite(sse)
+    eye = np.eye(k)
+    for _ in range(maxiter):
+        idx = np.nonzero(active)[0]
+        if idx.size == 0:
+            break
+        Ji, ei = J[idx], e[idx]
+        JTJ = np.einsum('bnk,bnl->bkl', Ji, Ji)
+        g = np.einsum('bnk,bn->bk', Ji, ei)
+        flat = np.max(np.abs(g*P[idx]), axis = 1) <= gtol*sse[idx]
+        converged[idx[flat]] = True
+        active[idx[flat]] = False
+        idx, JTJ, g = idx[~flat], JTJ[~flat], g[~flat]
+        if idx.size == 0:
+            break
+        #Marquardt's scaling: damp each parameter relative to its own curvature
+        D = np.diagonal(JTJ, axis1 = 1, axis2 = 2) + 1e-12*np.trace(JTJ, axis1 = 1, axis2 = 2)[:, None]
+        A = JTJ + lam[idx, None, None]*D[:, :, None]*eye
+        with np.errstate(all = 'ignore'):
+            try:
+                step = np.linalg.solve(A, g[..., None])[..., 0]
+            except np.linalg.LinAlgError:
+                step = np.einsum('bkl,bl->bk', np.linalg.pinv(A), g)
+            P_try = P[idx] + step
+            e_try, J_try, sse_try = _batch_evaluate(law, C[idx], r[idx], w[idx], P_try)
+        better = np.isfinite(sse_try) & (sse_try <= sse[idx])
+        iterations[idx] += 1
+
+        acc = idx[better]
+        P[acc], e[acc], J[acc] = P_try[better], e_try[better], J_try[better]
+        small_step = np.all(np.abs(step[better]) <= xtol*(np.abs(P_try[better]) + xtol), axis = 1)
+        small_drop = (sse[acc] - sse_try[better]) <= ftol*sse[acc]
+        sse[acc] = sse_try[better]
+        lam[acc] = np.maximum(lam[acc]/3, 1e-12)
+        rej = idx[~better]
+        lam[rej] *= 4
+        done = acc[small_step | small_drop]
+        converged[done] = True
+        #a step that cannot reduce the SSE even with heavy damping means we are at the minimum
+        stuck = rej[lam[rej] > 1e12]
+        converged[stuck] = np.isfinite(sse[stuck])
+        active[done] = False
+        active[stuck] = False
+
+    npts = w.sum(axis = 1)
+    cov, stderr = _covariance(J, sse, npts, k)
+    return BatchFitResult(P, sse, converged, iterations, cov, stderr)
@@ -0,0 +1,292 @@
+"""
+Branch and bound for optimization problems with integer variables.
+
+In Module 10 we find the best (continuous) number of cows, 11.87, and then
+compare obj(np.floor(sol.x)) with obj(np.ceil(sol.x)) by hand. With one
+integer variable that is two evaluations; with 30 integer variables it is
+2**30 of them, and rounding may not even give a feasible point once there
+are constraints. Branch and bound organizes the search instead:
+
+1. Solve the continuous *relaxation* (ignore integrality). Its optimum is a
+   lower bound on the best integer solution within the current bounds.
+2. If some integer variable has a fractional value, say cows = 11.87, split
+   the problem into two *nodes*, one with cows <= 11 and one with cows >= 12,
+   and repeat on each.
+3. Discard any node whose lower bound is no better than the best integer
+   solution found so far.
+
+The search ends when no node can improve on the best integer solution, which
+is then optimal, or stops early and reports how far from optimal it might be
+(the gap). The lower bounds are only guaranteed when each relaxation is
+solved to its global minimum, i.e. for convex problems; for nonconvex
+problems the result is a good integer solution, not a proven one.
+"""
+
+import heapq
+from itertools import count
+from typing import NamedTuple
+
+import numpy as np
+import scipy.optimize as opt
+
+from ._pool import pmap, resolve_workers
+
+
+class BranchAndBoundResult(NamedTuple):
+    """
+    Result of :func:`branch_and_bound`.
+
+    x and fun are the best integer-feasible solution found (nan if none).
+    lower_bound is the smallest relaxation value among nodes that were not
+    explored (or whose relaxation did not converge, which count with their
+    parent's bound), and gap = (fun - lower_bound)/max(1, |fun|); a gap of 0
+    means the solution is optimal. nodes counts relaxations solved and nfev the
+    objective evaluations they used.
+    """
+    x: np.ndarray
+    fun: float
+    lower_bound: float
+    gap: float
+    nodes: int
+    nfev: int
+    success: bool
+    message: str
+
+
+def _as_list(constraints):
+    if constraints is None:
+        return []
+    if isinstance(constraints, (dict, opt.NonlinearConstraint, opt.LinearConstraint)):
+        return [constraints]
+    return list(constraints)
+
+
+def constraint_violation(constraints, x):
+    """
+    Largest violation of a set of constraints at x (0 if x is feasible).
+
+    Accepts the dictionaries used by ``opt.minimize()`` ({'type': 'eq' or
+    'ineq', 'fun': ..., 'args': ...}) as well as NonlinearConstraint and
+    LinearConstraint objects.
+    """
+    worst = 0.0
+    for con in _as_list(constraints):
+        if isinstance(con, dict):
+            value = np.atleast_1d(con['fun'](x, *con.get('args', ())))
+            viol = np.abs(value) if con['type'] == 'eq' else -value
+        else:
+            if isinstance(con, opt.LinearConstraint):
+                value = np.atleast_1d(np.asarray(con.A, dtype = float) @ x)
+            else:
+                value = np.atleast_1d(con.fun(x))
+            viol = np.maximum(con.lb - value, value - con.ub)
+        worst = max(worst, float(np.max(viol, initial = 0.0)))
+    return worst
+
+
+class _Relaxation:
+    """Picklable job: solve the continuous relaxation within one node's bounds."""
+
+    def __init__(self, fun, args, jac, constraints, method, options, feastol):
+        self.fun, self.args, self.jac = fun, args, jac
+        self.constraints, self.method = constraints, method
+        self.options, self.feastol = options, feastol
+
+    def __call__(self, node):
+        """(x, f, feasible, converged, nfev) for one node (lb, ub, x0)."""
+        lb, ub, x0 = node
+        x0 = np.clip(x0, lb, ub)
+        if np.all(lb == ub):
+            x, nfev, converged = lb.copy(), 1, True
+            f = float(np.squeeze(self.fun(x, *self.args)))
+        else:
+            try:
+                sol = opt.minimize(self.fun, x0, args = self.args, method = self.method,
+                                   jac = self.jac, bounds = list(zip(lb, ub)),
+                                   constraints = self.constraints, options = self.options)
+            except (ValueError, ArithmeticError, np.linalg.LinAlgError):
+                return x0, np.inf, False, False, 0
+            x, f, nfev = np.clip(sol.x, lb, ub), float(np.squeeze(sol.fun)), int(sol.nfev)
+            converged = bool(sol.success)
+        feasible = bool(np.isfinite(f)) and constraint_violation(self.constraints, x) <= self.feastol
+        return x, f, feasible, converged, nfev
+
+
+class _BoundProbe:
+    """Picklable job: smallest or largest feasible value of one variable."""
+
+    def __init__(self, constraints, bounds, x0, feastol):
+        self.constraints, self.bounds = constraints, bounds
+        self.x0, self.feastol = x0, feastol
+
+    def __call__(self, job):
+        j, sign = job
+        c = np.zeros(self.x0.size)
+        c[j] = sign
+        try:
+            sol = opt.minimize(lambda x: c @ x, self.x0, jac = lambda x: c, method = 'SLSQP',
+                               bounds = self.bounds, constraints = self.constraints)
+        except (ValueError, ArithmeticError, np.linalg.LinAlgError):
+            return np.nan
+        if constraint_violation(self.constraints, sol.x) > self.feastol:
+            return np.nan
+        return float(sol.x[j])
+
+
+def _round_bounds(lb, ub, integers):
+    """Round integer bounds inward, e.g. 2.3 <= n <= 7.9 becomes 3 <= n <= 7."""
+    lb, ub = lb.copy(), ub.copy()
+    with np.errstate(invalid = 'ignore'):
+        lb[integers] = np.ceil(lb[integers] - 1e-9)
+        ub[integers] = np.floor(ub[integers] + 1e-9)
+    return lb, ub
+
+
+def branch_and_bound(fun, x0, bounds, integers, args = (), jac = None, constraints = (),
+                     method = 'SLSQP', options = None, int_tol = 1e-6, feastol = 1e-6,
+                     gap_tol = 1e-6, max_nodes = 10000, tighten = True, workers = None,
+                     batch = None):
+    """
+    Minimize fun(x) subject to bounds and constraints, with some x integer.
+
+    Nodes are explored best-bound first (the node with the smallest parent
+    relaxation value is solved next). Each batch of nodes has its
+    relaxations solved in a process pool when workers is set. Every node's
+    relaxation is also rounded to the nearest integers as a quick search for
+    good integer solutions, which lets weak nodes be discarded early.
+
+    Parameters
+    ----------
+    fun : callable
+        Objective ``fun(x, *args)``.
+    x0 : array_like
+        Initial guess for the first relaxation.
+    bounds : sequence of (min, max)
+        Bounds for every variable; None means unbounded.
+    integers : sequence of int
+        Indices of the variables that must take integer values.
+    args : tuple, optional
+        Extra arguments passed to fun and jac.
+    jac : callable, optional
+        Gradient of fun, as for ``opt.minimize()``.
+    constraints : dict or sequence, optional
+        Constraints as for ``opt.minimize()``.
+    method : str, optional
+        Method for the relaxations: 'SLSQP' (constraints) or 'L-BFGS-B'.
+    options : dict, optional
+        Options for the relaxation method.
+    int_tol, feastol : float, optional
+        Tolerances for integrality and constraint satisfaction.
+    gap_tol : float, optional
+        Stop when the relative gap falls below gap_tol; nodes that cannot
+        improve the best solution by more than this are discarded.
+    max_nodes : int, optional
+        Maximum number of relaxations solved.
+    tighten : bool, optional
+        Before branching, shrink the bounds on each integer variable to the
+        range the constraints allow (by minimizing and maximizing it subject
+        to the constraints), rounded inward to integers.
+    workers : int, optional
+        Number of processes; -1 uses all cores. fun and the constraint
+        functions must then be picklable (defined with def, not lambda).
+    batch : int, optional
+        Nodes solved per round; defaults to the number of workers.
+
+    Returns
+    -------
+    BranchAndBoundResult
+    """
+    x0 = np.atleast_1d(np.asarray(x0, dtype = float))
+    n = x0.size
+    lb = np.array([-np.inf if b[0] is None else b[0] for b in bounds], dtype = float)
+    ub = np.array([np.inf if b[1] is None else b[1] for b in bounds], dtype = float)
+    integers = np.asarray(integers, dtype = int)
+    constraints = _as_list(constraints)
+    batch = batch or resolve_workers(workers)
+
+    if tighten and constraints and integers.size:
+        probe = _BoundProbe(constraints, list(zip(lb, ub)), np.clip(x0, lb, ub), feastol)
+        jobs = [(j, s) for j in integers for s in (1.0, -1.0)]
+        limits = np.array(pmap(probe, jobs, workers = workers)).reshape(-1, 2)
+        lo_new, hi_new = limits[:, 0], limits[:, 1]
+        lb[integers] = np.where(np.isfinite(lo_new), np.maximum(lb[integers], lo_new - feastol),
+                                lb[integers])
+        ub[integers] = np.where(np.isfinite(hi_new), np.minimum(ub[integers], hi_new + feastol),
+                                ub[integers])
+    lb, ub = _round_bounds(lb, ub, integers)
+    if np.any(lb > ub):
+        return BranchAndBoundResult(np.full(n, np.nan), np.inf, np.inf, np.inf, 0, 0, False,
+                                    'no integer values lie within the bounds')
+
+    relax = _Relaxation(fun, args, jac, constraints, method, options, feastol)
+    best_x, best_f = np.full(n, np.nan), np.inf
+    nodes = nfev = 0
+    tie = count()
+    heap = [(-np.inf, next(tie), lb, ub, x0)]
+    unresolved = []  #parent bounds of nodes whose relaxation did not converge
+
+    def cutoff():
+        return best_f - gap_tol*max(1.0, abs(best_f)) if np.isfinite(best_f) else np.inf
+
+    def try_integer_point(x):
+        nonlocal best_x, best_f, nfev
+        xr = x.copy()
+        xr[integers] = np.round(xr[integers]) + 0.0  #+ 0.0 turns -0.0 into 0.0
+        fr = float(np.squeeze(fun(xr, *args)))
+        nfev += 1
+        if fr < best_f and constraint_violation(constraints, xr) <= feastol:
+            best_x, best_f = xr, fr
+
+    while heap and nodes < max_nodes:
+        work = []
+        while heap and len(work) < min(batch, max_nodes - nodes):
+            node = heapq.heappop(heap)
+            if node[0] < cutoff():
+                work.append(node)
+        if not work:
+            break
+        results = pmap(relax, [(w[2], w[3], w[4]) for w in work], workers = workers)
+        for (bound, _, nlb, nub, _), (x, f, feasible, converged, calls) in zip(work, results):
+            nodes += 1
+            nfev += calls
+            if not converged:
+                #f is neither a bound nor proof of infeasibility: the node stays
+                #open at its parent's bound, though x may still round to a solution
+                try_integer_point(x)
+                unresolved.append(bound)
+                continue
+            if not feasible or f >= cutoff():
+                continue
+            frac = np.abs(x[integers] - np.round(x[integers]))
+            try_integer_point(x)
+            if frac.size == 0 or frac.max() <= int_tol:
+                continue
+            j = integers[np.argmax(frac)]
+            down_ub, up_lb = nub.copy(), nlb.copy()
+            down_ub[j], up_lb[j] = np.floor(x[j]), np.ceil(x[j])
+            if nlb[j] <= down_ub[j]:
+                heapq.heappush(heap, (f, next(tie), nlb, down_ub, x))
+            if up_lb[j] <= nub[j]:
+                heapq.heappush(heap, (f, next(tie), up_lb, nub, x))
+
+    unresolved = [b for b in unresolved if b < cutoff()]
+    open_bounds = [node[0] for node in heap if node[0] < cutoff()] + unresolved
+    lower = min(open_bounds + [best_f]) if open_bounds else best_f
+    if not np.isfinite(best_f):
+        if unresolved:
+            message = 'no integer-feasible point found, but some relaxations did not converge'
+        elif not heap:
+            message = 'no integer-feasible point found'
+        else:
+            message = 'max_nodes reached before an integer-feasible point was found'
+        return BranchAndBoundResult(best_x, np.inf, lower, np.inf, nodes, nfev, False, message)
+    gap = max(0.0, (best_f - lower)/max(1.0, abs(best_f)))
+    if unresolved:
+        message = (f'{len(unresolved)} relaxation(s) did not converge; solution is within '
+                   f'{gap:.3g} (relative) of optimal')
+    elif open_bounds:
+        message = f'max_nodes reached; solution is within {gap:.3g} (relative) of optimal'
+    else:
+        message = 'optimal (to within gap_tol)'
+    return BranchAndBoundResult(best_x, best_f, lower, gap, nodes, nfev, not open_bounds,
+                                message)
@@ -0,0 +1,162 @@
+"""
+Multi-start local optimization for functions with many local minima.
+
+Module 10 shows ``opt.minimize(k, 0.25, bounds = [(0.1, 2.5)])`` getting
+trapped in a local minimum of k(x) = sin(10*pi*x)/2/x + (x - 1)**4. The
+simplest reliable fix is to start a local optimizer from many points spread
+evenly over the bounds and keep the best answer. The starts are independent,
+so they can run in separate processes, and the local minima they find are a
+useful by-product: after merging duplicates, they show how many distinct
+minima there are and how often each one was reached.
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+import scipy.optimize as opt
+
+from ._pool import pmap, resolve_workers
+from .autodiff import gradient
+from .population import PopulationObjective, sobol_points
+
+
+class MultiStartResult(NamedTuple):
+    """
+    Result of :func:`multistart`.
+
+    x and fun are the best minimum found. xmin (one row per minimum) and
+    fmin list every distinct local minimum, best first; hits counts how many
+    starts converged to each. nfev and njev total the evaluations of the
+    objective (including any screening samples) and its gradient over all
+    local solves.
+    """
+    x: np.ndarray
+    fun: float
+    xmin: np.ndarray
+    fmin: np.ndarray
+    hits: np.ndarray
+    nfev: int
+    njev: int
+    nstarts: int
+    success: bool
+
+
+class _LocalSolve:
+    """Picklable job that runs one local minimization from a start point."""
+
+    def __init__(self, fun, args, method, jac, bounds, constraints, options):
+        self.fun, self.args, self.method = fun, args, method
+        self.jac, self.bounds = jac, bounds
+        self.constraints, self.options = constraints, options
+
+    def __call__(self, x0):
+        jac = self.jac
+        if jac == 'auto':
+            #built here rather than in multistart() because closures cannot be pickled
+            jac = gradient(self.fun)
+        kwargs = {'constraints': self.constraints} if self.constraints else {}
+        try:
+            sol = opt.minimize(self.fun, x0, args = self.args, method = self.method, jac = jac,
+                               bounds = self.bounds, options = self.options, **kwargs)
+        except (ValueError, ArithmeticError, np.linalg.LinAlgError):
+            return np.full(len(x0), np.nan), np.nan, 0, 0, False
+        return (np.asarray(sol.x, dtype = float), float(sol.fun), int(sol.get('nfev', 0)),
+                int(sol.get('njev', 0)), bool(sol.success))
+
+
+def _cluster_minima(X, F, width, tol):
+    """Merge minima closer than tol (relative to the box width), best first."""
+    order = np.argsort(F)
+    centers, values, hits = [], [], []
+    for i in order:
+        for k, c in enumerate(centers):
+            if np.max(np.abs(X[i] - c)/width) <= tol:
+                hits[k] += 1
+                break
+        else:
+            centers.append(X[i])
+            values.append(F[i])
+            hits.append(1)
+    d = X.shape[1]
+    return (np.array(centers).reshape(-1, d), np.array(values, dtype = float),
+            np.array(hits, dtype = int))
+
+
+def multistart(fun, bounds, n_starts = 32, method = 'L-BFGS-B', args = (), jac = None,
+               constraints = (), options = None, workers = None, seed = None,
+               cluster_tol = 1e-4, n_samples = None, vectorized = 'auto'):
+    """
+    Minimize fun from n_starts quasi-random starting points and rank the minima.
+
+    Parameters
+    ----------
+    fun : callable
+        Objective ``fun(x, *args)`` taking a 1-D array x.
+    bounds : sequence of (min, max)
+        Finite bounds for every variable; starts are drawn inside them, and
+        they are passed on to the local optimizer.
+    n_starts : int, optional
+        Number of local solves.
+    method : str, optional
+        Local method for ``opt.minimize()``: 'L-BFGS-B' (bounds only) or
+        'SLSQP' (bounds and constraints) are the usual choices.
+    args : tuple, optional
+        Extra arguments passed to fun (and jac).
+    jac : callable, bool, 'auto' or None, optional
+        Gradient, as for ``opt.minimize()``. 'auto' computes it exactly with
+        :func:`chetools.gradient`; None uses finite differences.
+    constraints : dict or sequence of dict, optional
+        Constraints in the ``opt.minimize()`` format (used with 'SLSQP').
+    options : dict, optional
+        Options for the local method.
+    workers : int, optional
+        Number of processes; -1 uses all available cores. fun must then be
+        picklable: define it with def in a module or notebook, not as a lambda.
+    seed : int, optional
+        Seed for the scrambled Sobol start points.
+    cluster_tol : float, optional
+        Minima closer than cluster_tol times the box width (in every
+        coordinate) are counted as the same minimum.
+    n_samples : int, optional
+        If given, fun is first evaluated at n_samples Sobol points and the
+        local solves start from the n_starts best of them. The samples are
+        evaluated as one population (see :class:`chetools.PopulationObjective`),
+        so screening many points is cheap for numpy objectives.
+    vectorized : bool or 'auto', optional
+        Whether fun accepts a population when screening.
+
+    Returns
+    -------
+    MultiStartResult
+    """
+    bounds = [tuple(map(float, b)) for b in bounds]
+    lo, hi = np.array(bounds).T
+    if not np.all(np.isfinite(lo) & np.isfinite(hi)) or np.any(hi < lo):
+        raise ValueError('multistart needs finite bounds with min <= max')
+    nfev = 0
+    if n_samples is not None and n_samples > n_starts:
+        screen = PopulationObjective(fun, args, vectorized)
+        samples = sobol_points(bounds, n_samples, seed)
+        values = screen.evaluate(samples)
+        starts = samples[np.argsort(np.where(np.isnan(values), np.inf, values))[:n_starts]]
+        nfev = screen.nfev
+    else:
+        starts = sobol_points(bounds, n_starts, seed)
+    job = _LocalSolve(fun, args, method, jac, bounds, constraints, options)
+    chunksize = max(1, n_starts//(4*resolve_workers(workers)))
+    results = pmap(job, starts, workers = workers, chunksize = chunksize)
+
+    X = np.array([r[0] for r in results]).reshape(len(results), lo.size)
+    F = np.array([r[1] for r in results])
+    nfev += sum(r[2] for r in results)
+    njev = sum(r[3] for r in results)
+    ok = np.isfinite(F) & np.all(np.isfinite(X), axis = 1)
+    if not ok.any():
+        d = lo.size
+        return MultiStartResult(np.full(d, np.nan), np.nan, np.empty((0, d)), np.empty(0),
+                                np.empty(0, dtype = int), nfev, njev, n_starts, False)
+    width = np.where(hi > lo, hi - lo, 1.0)
+    xmin, fmin, hits = _cluster_minima(X[ok], F[ok], width, cluster_tol)
+    success = any(r[4] for r in results)
+    return MultiStartResult(xmin[0], float(fmin[0]), xmin, fmin, hits, nfev, njev,
+                            n_starts, success)
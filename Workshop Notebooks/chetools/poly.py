@@ -0,0 +1,176 @@
+"""
+All the roots of a polynomial at once.
+
+In Modules 09 and 10 we locate the roots of cubics like
+g(t) = -0.74 + 0.765t + 1.1t² - 3.55t³ by calling ``opt.newton()`` from
+several initial guesses, which can miss a root or find the same one twice.
+A polynomial of degree n has exactly n (complex) roots, and they are the
+eigenvalues of its companion matrix, so linear algebra gives all of them in
+one step with no initial guesses. A Newton step or two afterward polishes
+them as far as the coefficients determine them. When the polynomial is given
+as a function, :func:`all_roots` first has to estimate the coefficients from
+samples, which can cost several digits for high degrees or widely spread
+roots, so it polishes against the function itself: the roots are then as
+accurate as f can be evaluated near them.
+
+Coefficients follow the ``np.roots()``/``np.polyval()`` convention: highest
+power first.
+"""
+
+import numpy as np
+
+
+def _horner(c, x):
+    """Evaluate p(x) and p'(x) for coefficient rows c (highest power first)."""
+    p = np.zeros_like(x)
+    dp = np.zeros_like(x)
+    for j in range(c.shape[-1]):
+        dp = dp*x + p
+        p = p*x + c[..., j:j + 1]
+    return p, dp
+
+
+def poly_coefficients(f, max_degree = 12, domain = (-10.0, 10.0), rtol = 1e-10):
+    """
+    Detect whether f is a polynomial and, if so, return its coefficients.
+
+    f is sampled at max_degree + 2 Chebyshev points on domain (one vectorized
+    call) and interpolated. It is accepted as a polynomial only if the
+    highest interpolation coefficient vanishes and the interpolant matches f
+    at a few additional points. Returns None otherwise (including when f is
+    not finite somewhere on domain). Smooth functions like exp(x) look
+    polynomial on a narrow interval, so keep domain reasonably wide.
+    """
+    a, b = domain
+    n = max_degree + 2
+    t = np.cos(np.pi*(np.arange(n) + 0.5)/n)
+    x = 0.5*(a + b) + 0.5*(b - a)*t
+    check = np.linspace(a, b, 7) + 0.0123*(b - a)
+    with np.errstate(all = 'ignore'):
+        fx = np.asarray(f(x), dtype = float)*np.ones_like(x)
+        fcheck = np.asarray(f(check), dtype = float)*np.ones_like(check)
+    if not (np.all(np.isfinite(fx)) and np.all(np.isfinite(fcheck))):
+        return None
+
+    cheb = np.polynomial.chebyshev.Chebyshev.fit(x, fx, n - 1, domain = [a, b])
+    scale = max(np.max(np.abs(cheb.coef)), np.max(np.abs(fcheck)), np.finfo(float).tiny)
+    if abs(cheb.coef[-1]) > rtol*scale:
+        return None
+    if np.max(np.abs(cheb(check) - fcheck)) > rtol*scale:
+        return None
+
+    coef = cheb.convert(kind = np.polynomial.Polynomial, domain = [-1, 1], window = [-1, 1]).coef
+    big = np.nonzero(np.abs(coef) > rtol*np.max(np.abs(coef)))[0]
+    coef = coef[:big[-1] + 1] if big.size else coef[:1]
+    return coef[::-1]
+
+
+def poly_roots(coeffs, polish = 2):
+    """
+    Roots of one or many polynomials from companion-matrix eigenvalues.
+
+    Parameters
+    ----------
+    coeffs : array_like, shape (d + 1,) or (m, d + 1)
+        Coefficients, highest power first. A 2-D array is a batch of m
+        polynomials of the same degree, all solved in one vectorized
+        eigenvalue call. For a single polynomial, leading zeros are dropped;
+        in a batch, rows with a zero leading coefficient return all nan.
+    polish : int, optional
+        Number of Newton steps applied to every root after the eigenvalue
+        solve (0 to skip).
+
+    Returns
+    -------
+    ndarray of complex, shape (d,) or (m, d)
+    """
+    c = np.asarray(coeffs)
+    single = c.ndim == 1
+    if single:
+        nz = np.nonzero(c)[0]
+        if nz.size == 0:
+            raise ValueError('the zero polynomial has no isolated roots')
+        c = c[nz[0]:]
+    c = np.atleast_2d(c).astype(complex if np.iscomplexobj(c) else float)
+    m, d = c.shape[0], c.shape[1] - 1
+    if d < 1:
+        return np.empty((0,) if single else (m, 0), dtype = complex)
+
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        monic = c[:, 1:]/c[:, :1]
+    companion = np.zeros((m, d, d), dtype = monic.dtype)
+    companion[:, 0, :] = -monic
+    companion[:, np.arange(1, d), np.arange(d - 1)] = 1.0
+    bad = ~np.all(np.isfinite(companion), axis = (1, 2))
+    companion[bad] = 0.0
+    roots = np.linalg.eigvals(companion).astype(complex)
+
+    cc = c.astype(complex)
+    for _ in range(polish):
+        p, dp = _horner(cc, roots)
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            step = np.where(dp != 0, p/dp, 0)
+        #a multiple root makes p' ~ 0; keep the eigenvalue estimate there
+        roots = np.where(np.isfinite(step), roots - step, roots)
+
+    roots[bad] = np.nan
+    return roots[0] if single else roots
+
+
+def _polish_on(f, coeffs, roots, steps = 3):
+    """
+    Newton steps on f itself. Dual numbers are real-only, so p' of the
+    fitted coefficients (off from f' only by the fit error) stands in for f',
+    which works at complex roots too; a step is kept only if it reduces |f|.
+    """
+    dc = np.polyder(np.asarray(coeffs, dtype = complex))
+    with np.errstate(all = 'ignore'):
+        try:
+            fr = np.asarray(f(roots), dtype = complex)*np.ones_like(roots)
+            for _ in range(steps):
+                new = roots - fr/np.polyval(dc, roots)
+                fnew = np.asarray(f(new), dtype = complex)*np.ones_like(new)
+                better = np.isfinite(fnew) & (np.abs(fnew) < np.abs(fr))
+                roots, fr = np.where(better, new, roots), np.where(better, fnew, fr)
+        except (TypeError, ValueError):
+            pass  #f cannot take complex arguments; keep the coefficient polish
+    return roots
+
+
+def all_roots(f, real = False, max_degree = 12, domain = (-10.0, 10.0), imag_tol = 1e-9):
+    """
+    Every root of a polynomial given as a callable or as coefficients.
+
+    Parameters
+    ----------
+    f : callable or array_like
+        A vectorized polynomial function such as ``lambda t: -0.74 + 0.765*t
+        + 1.1*t**2 - 3.55*t**3``, or its coefficients (highest power first).
+    real : bool, optional
+        If True, return only the real roots (sorted), discarding roots whose
+        imaginary part exceeds imag_tol relative to their magnitude.
+    max_degree, domain : optional
+        Passed to :func:`poly_coefficients` when f is a callable. The roots
+        are then polished with Newton steps on f itself, since roots of the
+        fitted coefficients can be off by 1e-8 or more (e.g. for
+        (x - 1)(x - 2)...(x - 7)).
+
+    Raises
+    ------
+    ValueError
+        If f is a callable that is not a polynomial of degree max_degree or
+        less; use :func:`chetools.find_all_roots` for general functions.
+    """
+    if callable(f):
+        coeffs = poly_coefficients(f, max_degree = max_degree, domain = domain)
+        if coeffs is None:
+            raise ValueError(f'f does not appear to be a polynomial of degree <= {max_degree}')
+    else:
+        coeffs = f
+    roots = poly_roots(coeffs)
+    if callable(f):
+        roots = _polish_on(f, coeffs, roots)
+    if not real:
+        return roots
+    keep = np.abs(roots.imag) <= imag_tol*np.maximum(1.0, np.abs(roots))
+    return np.sort(roots[keep].real)
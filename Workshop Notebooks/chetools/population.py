@@ -0,0 +1,214 @@
+"""
+Global optimizers that evaluate a whole population in one call.
+
+Population-based optimizers (differential evolution, particle swarms, the
+screening step of multi-start methods) need the objective at dozens or
+hundreds of points per iteration. Objectives like k(x) and obj(cows) in
+Module 10 are written with numpy operations, so they will happily evaluate
+all of those points at once; calling them one point at a time, as
+``opt.dual_annealing()`` and ``opt.basinhopping()`` do, spends most of the
+time in the Python interpreter rather than in arithmetic.
+
+The convention used here is the one scipy uses for ``vectorized = True``: a
+population of S points in d dimensions is passed to the objective as an
+array of shape (d, S), one *row* per variable, and the objective returns S
+values. That way the unpacking idiom from the notebooks,
+
+    def z(var):
+        x, y = var
+        return (x - 10)**2 + (y + 5)**2
+
+works unchanged for a single point or for a whole population. Objectives
+that cannot handle a population are detected automatically and evaluated
+point by point instead.
+"""
+
+import numpy as np
+import scipy.optimize as opt
+from scipy.stats import qmc
+
+
+def sobol_points(bounds, n, seed = None):
+    """
+    n quasi-random points that fill the box ``bounds`` evenly.
+
+    Scrambled Sobol points cover the box much more uniformly than the same
+    number of random points. Returns an (n, d) array.
+    """
+    lo, hi = np.asarray(bounds, dtype = float).T
+    m = max(int(np.ceil(np.log2(max(n, 1)))), 0)
+    #draw a power of two (which keeps the sequence balanced) and use the first n
+    u = qmc.Sobol(lo.size, scramble = True, seed = seed).random_base2(m)[:n]
+    return qmc.scale(u, lo, hi)
+
+
+class PopulationObjective:
+    """
+    Evaluate ``fun(x, *args)`` at many points with as few calls as possible.
+
+    Calling the object with an (d, S) array returns the S objective values;
+    calling it with a 1-D array of length d returns a float, so it can also
+    be handed to ``opt.minimize()``.
+
+    Parameters
+    ----------
+    fun : callable
+        Objective.
+    args : tuple, optional
+        Extra arguments passed to fun.
+    vectorized : bool or 'auto', optional
+        True if fun accepts a (d, S) population, False to always evaluate
+        point by point. 'auto' tries a population call the first time one is
+        needed and checks it against point-by-point evaluation of the first
+        two points; if the call fails or disagrees, fun is treated as scalar.
+
+    Attributes
+    ----------
+    vectorized : bool or 'auto'
+        The mode in use ('auto' until the first population call decides).
+    nfev : int
+        Points evaluated.
+    ncalls : int
+        Calls made to fun.
+    """
+
+    def __init__(self, fun, args = (), vectorized = 'auto'):
+        if vectorized not in (True, False, 'auto'):
+            raise ValueError("vectorized must be True, False or 'auto'")
+        self.fun, self.args = fun, args
+        self.vectorized = vectorized
+        self.nfev = self.ncalls = 0
+
+    def _scalar(self, x):
+        self.nfev += 1
+        self.ncalls += 1
+        return float(np.squeeze(self.fun(x, *self.args)))
+
+    def _loop(self, X):
+        return np.array([self._scalar(X[:, j]) for j in range(X.shape[1])])
+
+    def _population(self, X):
+        out = np.asarray(self.fun(X, *self.args), dtype = float)
+        self.ncalls += 1
+        if out.size != X.shape[1]:
+            raise ValueError(f'expected {X.shape[1]} values, got an array of shape {out.shape}')
+        self.nfev += X.shape[1]
+        return out.reshape(X.shape[1])
+
+    def _detect(self, X):
+        try:
+            with np.errstate(all = 'ignore'):
+                values = self._population(X)
+        except Exception:
+            self.vectorized = False
+            return self._loop(X)
+        probe = [self._scalar(X[:, j]) for j in range(min(2, X.shape[1]))]
+        self.vectorized = bool(np.allclose(values[:len(probe)], probe, equal_nan = True))
+        return values if self.vectorized else self._loop(X)
+
+    def __call__(self, X):
+        X = np.asarray(X, dtype = float)
+        if X.ndim == 1:
+            return self._scalar(X)
+        if self.vectorized == 'auto' and X.shape[1] > 1:
+            return self._detect(X)
+        return self._population(X) if self.vectorized is True else self._loop(X)
+
+    def evaluate(self, points):
+        """Objective values at the rows of an (S, d) array of points."""
+        return self(np.asarray(points, dtype = float).T)
+
+
+def differential_evolution(fun, bounds, args = (), vectorized = 'auto', **kwargs):
+    """
+    ``opt.differential_evolution()`` with whole-population evaluations.
+
+    fun follows the population convention of this module (see
+    :class:`PopulationObjective`); scalar objectives still work, one point
+    at a time. Other keyword arguments are passed to scipy. In the result,
+    nfev is the number of points evaluated and ncalls the number of calls
+    made to fun.
+    """
+    objective = PopulationObjective(fun, args, vectorized)
+    kwargs.setdefault('updating', 'deferred')
+    sol = opt.differential_evolution(objective, bounds, vectorized = True, **kwargs)
+    sol.nfev, sol.ncalls = objective.nfev, objective.ncalls
+    return sol
+
+
+def particle_swarm(fun, bounds, args = (), n_particles = 40, maxiter = 200, w = 0.7,
+                   c1 = 1.5, c2 = 1.5, tol = 1e-8, patience = 20, seed = None,
+                   vectorized = 'auto', polish = True):
+    """
+    Minimize fun within bounds with a particle swarm.
+
+    Each particle moves with a velocity that is pulled toward the best point
+    it has seen itself (weight c1) and the best point any particle has seen
+    (weight c2), and damped by the inertia w. All particles are evaluated
+    together in one call per iteration. The swarm starts from Sobol points.
+
+    Parameters
+    ----------
+    fun : callable
+        Objective, vectorized as described in :class:`PopulationObjective`.
+    bounds : sequence of (min, max)
+        Finite bounds; particles are kept inside them.
+    args : tuple, optional
+        Extra arguments passed to fun.
+    n_particles, maxiter : int, optional
+        Swarm size and maximum number of iterations.
+    w, c1, c2 : float, optional
+        Inertia, personal and social weights.
+    tol, patience : optional
+        Stop when the best value has improved by less than
+        ``tol*(1 + |best|)`` for patience consecutive iterations.
+    seed : int, optional
+        Random seed.
+    vectorized : bool or 'auto', optional
+        See :class:`PopulationObjective`.
+    polish : bool, optional
+        Finish with ``opt.minimize(method = 'L-BFGS-B')`` from the best point.
+
+    Returns
+    -------
+    OptimizeResult
+        Same layout as the scipy global optimizers: x, fun, nit, nfev (points
+        evaluated), ncalls (calls to fun), success and message.
+    """
+    lo, hi = np.asarray(bounds, dtype = float).T
+    rng = np.random.default_rng(seed)
+    objective = PopulationObjective(fun, args, vectorized)
+
+    X = sobol_points(bounds, n_particles, seed)
+    V = (rng.random(X.shape) - 0.5)*(hi - lo)*0.1
+    F = objective.evaluate(X)
+    P, PF = X.copy(), F.copy()
+    g = np.argmin(PF)
+    best_x, best_f = P[g].copy(), PF[g]
+    stall = 0
+    message = 'maximum number of iterations reached'
+    for it in range(1, maxiter + 1):
+        r1, r2 = rng.random(X.shape), rng.random(X.shape)
+        V = w*V + c1*r1*(P - X) + c2*r2*(best_x - X)
+        X = np.clip(X + V, lo, hi)
+        F = objective.evaluate(X)
+        better = F < PF
+        P[better], PF[better] = X[better], F[better]
+        g = np.argmin(PF)
+        if best_f - PF[g] <= tol*(1 + abs(best_f)):
+            stall += 1
+        else:
+            stall = 0
+        if PF[g] < best_f:
+            best_x, best_f = P[g].copy(), PF[g]
+        if stall >= patience:
+            message = f'best value changed by less than tol for {patience} iterations'
+            break
+
+    if polish:
+        sol = opt.minimize(objective, best_x, method = 'L-BFGS-B', bounds = list(zip(lo, hi)))
+        if sol.fun < best_f:
+            best_x, best_f = np.asarray(sol.x, dtype = float), float(sol.fun)
+    return opt.OptimizeResult(x = best_x, fun = float(best_f), nit = it, nfev = objective.nfev,
+                              ncalls = objective.ncalls, success = bool(np.isfinite(best_f)),
+                              message = message)
@@ -0,0 +1,327 @@
+"""
+A fast path for quadratic objectives.
+
+Some of the objectives in Module 11 are exact quadratics,
+
+    z(var)       = (x - 10)**2 + (y + 5)**2
+    q(var, a, b) = a*x**2 + b*y**2 + x - y
+
+and yet ``opt.minimize()`` treats them like any other function: BFGS builds
+up an approximate Hessian over several iterations and line searches. A
+quadratic is completely described by its value, gradient and (constant)
+Hessian at one point,
+
+    f(x) = f0 + g.(x - x0) + (x - x0).H.(x - x0)/2
+
+and its minimum is the solution of one linear system, H(x - x0) = -g. With
+linear equality constraints A x = b added, the minimum solves the linear
+KKT system instead. :func:`minimize_quadratic` probes the objective to see
+whether it is quadratic (it builds the model above and checks it against the
+function at random points), solves the linear system if it is, and
+otherwise hands the problem to ``opt.minimize()`` unchanged:
+
+    sol = minimize_quadratic(q, var0, args = (1, 3))
+    sol.structure   #'quadratic', 'quadratic, equality constrained' or 'generic'
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+import scipy.linalg
+import scipy.optimize as opt
+
+from .autodiff import collect, gradient, jacobian
+from .autodiff import seed as dual_seed
+from .minlp import _as_list, constraint_violation
+
+
+class QuadraticModel(NamedTuple):
+    """
+    f(x) = f0 + grad.(x - x0) + (x - x0).hess.(x - x0)/2, found by
+    :func:`quadratic_model`; nfev counts the objective (or gradient)
+    evaluations the probing took.
+    """
+    x0: np.ndarray
+    f0: float
+    grad: np.ndarray
+    hess: np.ndarray
+    nfev: int
+
+
+def _steps(x0):
+    #central differences are exact for quadratics, so the steps can be large
+    return np.maximum(1.0, np.abs(x0))
+
+
+def _probe_points(x0, count, seed):
+    rng = np.random.default_rng(seed)
+    return x0 + _steps(x0)*rng.uniform(-1, 1, (count, x0.size))
+
+
+def _split(fun, jac):
+    """(value function, gradient function or None), reading jac as opt.minimize() does."""
+    if jac is True:
+        return (lambda x, *a: fun(x, *a)[0]), (lambda x, *a: fun(x, *a)[1])
+    return fun, jac if callable(jac) else None
+
+
+def _dual_model(fun, x0, args):
+    """(f0, grad, hess) from one pass with second-order dual numbers, or None."""
+    try:
+        xd = dual_seed(x0, order = 2)
+        out = collect(fun(xd, *args), xd)
+        if out.hess is None:
+            return None
+        n = x0.size
+        return float(np.squeeze(out.val)), out.grad.reshape(n), out.hess.reshape(n, n)
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def _agrees(model, x, actual, rtol):
+    """Whether fun(x) = actual matches the model's prediction to rtol."""
+    d = x - model.x0
+    linear, curve = model.grad @ d, d @ model.hess @ d/2
+    predicted = model.f0 + linear + curve
+    return abs(actual - predicted) <= rtol*(abs(model.f0) + abs(linear) + abs(curve) + 1e-300)
+
+
+def _gradient_function(fun, args, jac, x0):
+    """A gradient of fun: jac, automatic differentiation or central differences."""
+    if callable(jac):
+        return lambda x: np.asarray(jac(x, *args), dtype = float).ravel()
+    auto = gradient(fun)
+    try:
+        auto(x0, *args)
+        return lambda x: np.asarray(auto(x, *args), dtype = float).ravel()
+    except (TypeError, ValueError, AttributeError):
+        h = _steps(x0)
+        eye = np.eye(x0.size)*h
+
+        def central(x):
+            return np.array([(fun(x + e, *args) - fun(x - e, *args))/(2*hj)
+                             for e, hj in zip(eye, h)], dtype = float).ravel()
+        return central
+
+
+def quadratic_model(fun, x0, args = (), jac = None, hess = None, rtol = 1e-8, probes = 2,
+                    seed = 0):
+    """
+    Quadratic model of fun around x0, or None if fun is not quadratic.
+
+    Without jac or hess, the value, gradient and Hessian at x0 come from one
+    pass with second-order dual numbers. Otherwise (or if fun cannot take
+    dual numbers) the Hessian is hess(x0) if hess is given, and each column
+    is the central difference of the gradient if not (from jac, automatic
+    differentiation or, failing both, central differences of fun), which
+    for a quadratic is exact whatever the step; that takes about 2n gradient
+    evaluations for n variables. jac = True means fun returns (f, gradient),
+    as for ``opt.minimize()``. Any function has *some* such model, so it is
+    then checked against fun at probes random points nearby; fun is
+    accepted as quadratic if they agree to rtol.
+
+    Returns
+    -------
+    QuadraticModel or None
+    """
+    fun, jac = _split(fun, jac)
+    x0 = np.asarray(x0, dtype = float).ravel()
+    n = x0.size
+    with np.errstate(all = 'ignore'):
+        dual = None if jac is not None or callable(hess) else _dual_model(fun, x0, args)
+        if dual is not None:
+            f0, g0, H = dual
+            nfev = 1
+        else:
+            grad = _gradient_function(fun, args, jac, x0)
+            f0 = float(np.squeeze(fun(x0, *args)))
+            g0 = grad(x0)
+            nfev = 2
+        if dual is None and callable(hess):
+            H = np.asarray(hess(x0, *args), dtype = float).reshape(n, n)
+        elif dual is None:
+            h = _steps(x0)
+            H = np.empty((n, n))
+            for j in range(n):
+                e = np.zeros(n)
+                e[j] = h[j]
+                H[:, j] = (grad(x0 + e) - grad(x0 - e))/(2*h[j])
+            nfev += 2*n
+            H = (H + H.T)/2
+        if not (np.all(np.isfinite(H)) and np.all(np.isfinite(g0)) and np.isfinite(f0)):
+            return None
+        model = QuadraticModel(x0, f0, g0, H, nfev + probes)
+        for p in _probe_points(x0, probes, seed):
+            if not _agrees(model, p, float(np.squeeze(fun(p, *args))), rtol):
+                return None
+    return model
+
+
+def affine_model(fun, x0, args = (), jac = None, rtol = 1e-8, probes = 2, seed = 1):
+    """
+    (A, b) with fun(x) = A @ x + b, or None if fun is not affine.
+
+    The Jacobian comes from jac, automatic differentiation or central
+    differences (exact for affine functions) and is checked at probes
+    random points, as in :func:`quadratic_model`.
+    """
+    x0 = np.asarray(x0, dtype = float).ravel()
+
+    def value(x):
+        return np.atleast_1d(np.asarray(fun(x, *args), dtype = float)).ravel()
+
+    with np.errstate(all = 'ignore'):
+        v0 = value(x0)
+        if callable(jac):
+            A = np.asarray(jac(x0, *args), dtype = float).reshape(v0.size, x0.size)
+        else:
+            try:
+                A = np.asarray(jacobian(fun)(x0, *args), dtype = float).reshape(v0.size, x0.size)
+            except (TypeError, ValueError, AttributeError):
+                h = _steps(x0)
+                A = np.column_stack([(value(x0 + e) - value(x0 - e))/(2*hj)
+                                     for e, hj in zip(np.eye(x0.size)*h, h)])
+        if not np.all(np.isfinite(A)):
+            return None
+        for p in _probe_points(x0, probes, seed):
+            change = A @ (p - x0)
+            if not np.allclose(value(p), v0 + change, rtol = rtol,
+                               atol = rtol*(np.max(np.abs(v0)) + np.max(np.abs(change)) + 1e-300)):
+                return None
+    return A, v0 - A @ x0
+
+
+def _equality_rows(constraints, x0):
+    """
+    Linear equality constraints as (A, b) with A x = b; None if any equality
+    is not affine. Inequalities are left for the feasibility check.
+    """
+    A_rows, b_rows = [np.empty((0, x0.size))], [np.empty(0)]
+    for con in _as_list(constraints):
+        if isinstance(con, dict):
+            if con['type'] != 'eq':
+                continue
+            model = affine_model(con['fun'], x0, con.get('args', ()), con.get('jac'))
+            if model is None:
+                return None
+            A_rows.append(model[0])
+            b_rows.append(-model[1])
+            continue
+        lb, ub = np.atleast_1d(con.lb), np.atleast_1d(con.ub)
+        if isinstance(con, opt.LinearConstraint):
+            A = np.atleast_2d(np.asarray(con.A.toarray() if hasattr(con.A, 'toarray') else con.A,
+                                         dtype = float))
+            shift = np.zeros(A.shape[0])
+        else:
+            eq = np.broadcast_to(lb == ub, np.shape(np.atleast_1d(con.fun(x0))))
+            if not eq.any():
+                continue
+            jac = con.jac if callable(con.jac) else None
+            model = affine_model(lambda x: con.fun(x), x0, jac = jac)
+            if model is None:
+                return None
+            A, shift = model
+        eq = np.broadcast_to(lb == ub, A.shape[:1])
+        A_rows.append(A[eq])
+        b_rows.append(np.broadcast_to(lb, A.shape[:1])[eq] - shift[eq])
+    return np.vstack(A_rows), np.concatenate(b_rows)
+
+
+def _within_bounds(bounds, x, tol):
+    if bounds is None:
+        return True
+    if isinstance(bounds, opt.Bounds):
+        lb, ub = np.broadcast_to(bounds.lb, x.shape), np.broadcast_to(bounds.ub, x.shape)
+    else:
+        lb = np.array([-np.inf if b[0] is None else b[0] for b in bounds], dtype = float)
+        ub = np.array([np.inf if b[1] is None else b[1] for b in bounds], dtype = float)
+    return bool(np.all(x >= lb - tol) and np.all(x <= ub + tol))
+
+
+def _solve(model, A, b):
+    """
+    Minimize the model subject to A x = b by the null-space method: x =
+    xp + Z y with A xp = b and the columns of Z spanning the null space of
+    A. One Cholesky factorization of Z^T H Z both solves for y and proves
+    the problem convex (it fails if the model has no unique minimum).
+    """
+    x0, g, H = model.x0, model.grad, model.hess
+    if A.shape[0]:
+        xp, *_ = np.linalg.lstsq(A, b, rcond = None)
+        if not np.allclose(A @ xp, b, rtol = 1e-10, atol = 1e-10*(1 + np.max(np.abs(b)))):
+            return None  #inconsistent equality constraints
+        Z = scipy.linalg.null_space(A)
+    else:
+        xp, Z = x0, np.eye(x0.size)
+    if Z.shape[1] == 0:
+        return xp
+    gp = g + H @ (xp - x0)
+    try:
+        factor = scipy.linalg.cho_factor(Z.T @ H @ Z)
+    except np.linalg.LinAlgError:
+        return None
+    return xp + Z @ scipy.linalg.cho_solve(factor, -(Z.T @ gp))
+
+
+_USES_HESS = {'newton-cg', 'dogleg', 'trust-ncg', 'trust-krylov', 'trust-exact', 'trust-constr'}
+
+
+def minimize_quadratic(fun, x0, args = (), method = None, jac = None, hess = None, bounds = None,
+                       constraints = (), tol = None, options = None, probe = True,
+                       rtol = 1e-8, feastol = 1e-8):
+    """
+    ``opt.minimize()`` with a direct solve for quadratic objectives.
+
+    If fun is quadratic (see :func:`quadratic_model`) and every equality
+    constraint is affine, the minimum is found with one linear solve. It is
+    returned if the model is convex and the point satisfies the bounds and
+    the inequality constraints, which it then minimizes fun over as well
+    (they are not active). Otherwise the problem is passed to
+    ``opt.minimize()``; if fun was found to be quadratic the exact gradient
+    of the model is supplied as jac (and hess, for methods that use it)
+    when none was given. The probes only cover a box around x0, so fun is
+    also checked against the model at the solution; if they disagree there
+    the problem is treated as generic.
+
+    Arguments are as for ``opt.minimize()``, plus probe = False to skip the
+    fast path, rtol, the tolerance for agreement with the quadratic model,
+    and feastol, the tolerance for the feasibility check.
+
+    Returns
+    -------
+    OptimizeResult
+        As from ``opt.minimize()``, with structure set to 'quadratic',
+        'quadratic, equality constrained' (fast path), 'quadratic' with the
+        generic solver's nit (fast path not applicable: an active bound or
+        inequality, nonlinear equalities or no unique minimum), or
+        'generic'. For the fast path, nfev counts the probing evaluations
+        and nit is 0.
+    """
+    x0 = np.asarray(x0, dtype = float).ravel()
+    value, _ = _split(fun, jac)
+    model = quadratic_model(fun, x0, args, jac, hess, rtol) if probe else None
+    if model is not None:
+        eqs = _equality_rows(constraints, x0)
+        x = _solve(model, *eqs) if eqs is not None else None
+        fx = float(np.squeeze(value(x, *args))) if x is not None else np.nan
+        if x is not None and not _agrees(model, x, fx, rtol):
+            model = x = None  #quadratic near x0 only
+        elif x is not None and _within_bounds(bounds, x, feastol) \
+                and constraint_violation(constraints, x) <= feastol:
+            g = model.grad + model.hess @ (x - x0)
+            structure = 'quadratic, equality constrained' if eqs[0].shape[0] else 'quadratic'
+            return opt.OptimizeResult(x = x, fun = fx, jac = g, hess = model.hess, nit = 0,
+                                      nfev = model.nfev + 1, success = True, status = 0,
+                                      structure = structure,
+                                      message = 'quadratic objective solved directly')
+    if model is not None and x is not None:
+        #quadratic, but a bound or inequality is active: use the exact derivatives
+        if jac is None:
+            jac = lambda x, *a: model.grad + model.hess @ (np.asarray(x, dtype = float) - x0)
+        if hess is None and (method or '').lower() in _USES_HESS:
+            hess = lambda x, *a: model.hess
+    kwargs = {'constraints': constraints} if _as_list(constraints) else {}
+    sol = opt.minimize(fun, x0, args = args, method = method, jac = jac, hess = hess,
+                       bounds = bounds, tol = tol, options = options, **kwargs)
+    sol.structure = 'quadratic' if model is not None else 'generic'
+    return sol
@@ -0,0 +1,615 @@
+"""
+Vectorized root finding for many independent scalar equations at once.
+
+In Modules 06 and 09 we solve one equation at a time with a while loop. When
+the same equation has to be solved for thousands of parameter sets, it is
+much faster to carry all of them through the iterations together as numpy
+arrays and simply stop updating the elements that have already converged.
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+import scipy.optimize as opt
+
+from ._pool import pmap
+from .autodiff import derivative, taylor
+
+
+class BatchRootResult(NamedTuple):
+    """Result of a batched root solve; every field has the batch shape."""
+    root: np.ndarray
+    converged: np.ndarray
+    iterations: np.ndarray
+
+
+def _reshape_result(root, converged, iterations, shape):
+    """Pack flat working arrays into a BatchRootResult of the batch shape."""
+    return BatchRootResult(root.reshape(shape)[()], converged.reshape(shape)[()],
+                           iterations.reshape(shape)[()])
+
+
+def bracket_solve(f, a, b, args = (), xtol = 1e-12, rtol = 4*np.finfo(float).eps,
+                  maxiter = 100):
+    """
+    Solve f(x, *args) = 0 for every element of a batch of brackets [a, b].
+
+    This is a vectorized Illinois (modified regula falsi) iteration with a
+    bisection safeguard: every element keeps a bracket that contains a sign
+    change, so convergence is guaranteed for continuous functions.
+
+    Parameters
+    ----------
+    f : callable
+        Vectorized function, ``f(x, *args)``, that accepts an array x and
+        returns an array of the same shape. Any arrays in args must
+        broadcast against a and b.
+    a, b : array_like
+        Lower and upper ends of the brackets; broadcast against each other
+        and against args.
+    xtol, rtol : float, optional
+        An element has converged when its bracket is narrower than
+        ``xtol + rtol*|x|`` or when f(x) is exactly zero.
+    maxiter : int, optional
+        Maximum number of iterations.
+
+    Returns
+    -------
+    BatchRootResult
+        root is nan for elements whose bracket does not contain a sign change.
+    """
+    args = tuple(np.asarray(arg) for arg in args)
+    a, b, *args = np.broadcast_arrays(np.asarray(a, dtype = float),
+                                      np.asarray(b, dtype = float), *args)
+    shape = a.shape
+    a, b, *args = (np.ravel(v) for v in (a, b, *args))
+    a = a.astype(float)
+    b = b.astype(float)
+    fa = np.asarray(f(a, *args), dtype = float)*np.ones_like(a)
+    fb = np.asarray(f(b, *args), dtype = float)*np.ones_like(b)
+
+    root = np.where(fa == 0, a, np.where(fb == 0, b, np.nan))
+    converged = (fa == 0) | (fb == 0)
+    iterations = np.zeros(a.shape, dtype = int)
+    active = ~converged & (np.sign(fa) != np.sign(fb)) & np.isfinite(fa) & np.isfinite(fb)
+    side = np.zeros(a.shape, dtype = int)  #which end was retained last: -1 = a, +1 = b
+
+    for _ in range(maxiter):
+        idx = np.nonzero(active)
+        if idx[0].size == 0:
+            break
+        ai, bi, fai, fbi = a[idx], b[idx], fa[idx], fb[idx]
+        argi = tuple(arg[idx] for arg in args)
+
+        #regula falsi step, replaced by bisection if it leaves the interior
+        x = bi - fbi*(bi - ai)/(fbi - fai)
+        mid = 0.5*(ai + bi)
+        bad = ~np.isfinite(x) | (x <= np.minimum(ai, bi)) | (x >= np.maximum(ai, bi))
+        x = np.where(bad, mid, x)
+        fx = np.asarray(f(x, *argi), dtype = float)*np.ones_like(x)
+        iterations[idx] += 1
+
+        #keep the half that still has a sign change
+        left = np.sign(fx) == np.sign(fai)
+        sidei = side[idx]
+        new_a = np.where(left, x, ai)
+        new_b = np.where(left, bi, x)
+        new_fa = np.where(left, fx, fai)
+        new_fb = np.where(left, fbi, fx)
+        #Illinois modification: halve the stale end if it was retained twice
+        new_fb = np.where(left & (sidei == 1), 0.5*new_fb, new_fb)
+        new_fa = np.where(~left & (sidei == -1), 0.5*new_fa, new_fa)
+        a[idx], b[idx], fa[idx], fb[idx] = new_a, new_b, new_fa, new_fb
+        side[idx] = np.where(left, 1, -1)
+
+        done = (fx == 0) | (np.abs(new_b - new_a) <= xtol + rtol*np.abs(x))
+        root[idx] = np.where(done, x, root[idx])
+        converged[idx] = done
+        active[idx] = ~done
+
+    #report the best estimate for elements that ran out of iterations
+    leftover = active
+    root[leftover] = 0.5*(a[leftover] + b[leftover])
+    return _reshape_result(root, converged, iterations, shape)
+
+
+def time_to_steady_state(LSS, L0, k, tol = 0.01):
+    """
+    Time for a first-order approach to steady state to come within tol.
+
+    For C(t) = CSS + (C0 - CSS)·exp(-k·t), the distance from steady state is
+    |C0 - CSS|·exp(-k·t), so the crossing time has a closed form:
+
+        t = ln(|C0 - CSS|/tol)/k
+
+    This replaces the fixed-step while loop in Module 06, whose answer is
+    only as accurate as the time step. All arguments broadcast, so one call
+    handles any number of (LSS, L0, k) parameter sets.
+
+    Returns
+    -------
+    ndarray
+        Crossing times; zero where the initial value is already within tol.
+    """
+    LSS, L0, k, tol = np.broadcast_arrays(*(np.asarray(v, dtype = float)
+                                            for v in (LSS, L0, k, tol)))
+    gap = np.abs(L0 - LSS)
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        t = np.log(gap/tol)/k
+    return np.where(gap <= tol, 0.0, t)[()]
+
+
+def time_to_threshold(model, threshold, t_max, args = (), t_min = 0.0, **kwargs):
+    """
+    First time at which model(t, *args) crosses threshold, for many models.
+
+    For models without a closed-form inverse, the crossing is found with
+    :func:`bracket_solve` on the bracket [t_min, t_max] for every parameter
+    set simultaneously. The model must be monotonic on that bracket for the
+    answer to be the *first* crossing.
+
+    Parameters
+    ----------
+    model : callable
+        Vectorized model, ``model(t, *args)``.
+    threshold : float or array_like
+        Threshold value(s), broadcast against args.
+    t_max : float or array_like
+        Upper end of the search bracket.
+    args : tuple, optional
+        Parameter arrays passed to model.
+    t_min : float or array_like, optional
+        Lower end of the search bracket.
+    **kwargs
+        Passed on to :func:`bracket_solve` (xtol, rtol, maxiter).
+
+    Returns
+    -------
+    BatchRootResult
+    """
+    threshold = np.asarray(threshold, dtype = float)
+
+    def g(t, thr, *p):
+        return model(t, *p) - thr
+
+    return bracket_solve(g, t_min, t_max, args = (threshold, *args), **kwargs)
+
+
+class _Refine:
+    """Picklable job that refines one bracket with a scipy bracketing solver."""
+
+    def __init__(self, f, args, method, xtol, rtol):
+        self.f, self.args, self.method = f, args, method
+        self.xtol, self.rtol = xtol, rtol
+
+    def __call__(self, bracket):
+        solver = getattr(opt, self.method)
+        return solver(self.f, bracket[0], bracket[1], args = self.args,
+                      xtol = self.xtol, rtol = self.rtol)
+
+
+def find_all_roots(f, a, b, args = (), npoints = 1001, method = 'brentq',
+                   xtol = 2e-12, rtol = 4*np.finfo(float).eps, workers = None):
+    """
+    Find every root of f(x, *args) on [a, b] from a single grid scan.
+
+    f is evaluated once on a uniform grid of npoints values (in one
+    vectorized call), every sign change is located with
+    ``np.diff(np.sign(y))``, and each bracket is then refined to full
+    precision. This replaces the guess-driven searches in Modules 06 and 09.
+
+    Parameters
+    ----------
+    f : callable
+        Function of x; it must accept a numpy array for the grid scan.
+    a, b : float
+        Interval to search.
+    args : tuple, optional
+        Extra arguments passed to f.
+    npoints : int, optional
+        Number of grid points. Roots closer together than the grid spacing,
+        and roots where f touches zero without changing sign (double roots),
+        are not detected; increase npoints if you suspect either.
+    method : {'brentq', 'toms748', 'brenth', 'ridder', 'bisect', 'vectorized'}
+        Refinement method. The scipy methods refine one bracket per call;
+        'vectorized' refines all of them together with :func:`bracket_solve`,
+        which is fastest for cheap numpy functions.
+    xtol, rtol : float, optional
+        Tolerances passed to the refinement method.
+    workers : int, optional
+        Number of processes used to refine brackets with a scipy method.
+        Worthwhile only when f is expensive; f must then be picklable. -1
+        uses all available cores.
+
+    Returns
+    -------
+    ndarray
+        Sorted array of roots (empty if none were found).
+    """
+    x = np.linspace(a, b, npoints)
+    y = np.asarray(f(x, *args), dtype = float)*np.ones_like(x)
+    s = np.sign(y)
+
+    exact = x[s == 0]
+    change = np.nonzero(s[:-1]*s[1:] < 0)[0]
+    lo, hi = x[change], x[change + 1]
+
+    if lo.size == 0:
+        refined = np.empty(0)
+    elif method == 'vectorized':
+        refined = bracket_solve(f, lo, hi, args = args, xtol = xtol, rtol = rtol).root
+    else:
+        job = _Refine(f, args, method, xtol, rtol)
+        refined = np.array(pmap(job, zip(lo, hi), workers = workers), dtype = float)
+
+    return np.sort(np.concatenate((exact, refined)))
+
+
+def _complex_step(f):
+    """Derivative of an analytic numpy function by the complex-step method."""
+    h = 1e-30
+
+    def fprime(x, *args):
+        return np.imag(f(x + 1j*h, *args))/h
+
+    return fprime
+
+
+def newton_batch(f, x0, fprime = None, fprime2 = None, args = (), tol = 1.48e-8,
+                 rtol = 0.0, maxiter = 50, x1 = None):
+    """
+    Newton, Halley or secant iterations on a whole batch of scalar equations.
+
+    This is the vectorized counterpart of ``opt.newton()``: it solves
+    f(x, *args) = 0 for every element of x0 at once, so 10^5 independent
+    equations cost about as much as a few dozen numpy evaluations of f.
+    Elements that have converged are masked out and no longer evaluated.
+
+    Parameters
+    ----------
+    f : callable
+        Vectorized function, ``f(x, *args)``.
+    x0 : array_like
+        Initial guesses; broadcast against any arrays in args.
+    fprime : callable or str, optional
+        Derivative of f. A callable ``fprime(x, *args)`` gives Newton's
+        method. The string 'auto' differentiates f exactly with dual numbers
+        (:mod:`chetools.autodiff`); 'complex-step' uses the complex-step
+        method instead (f must then accept complex input). If None, the
+        secant method is used.
+    fprime2 : callable or 'auto', optional
+        Second derivative of f; together with fprime this gives Halley's
+        method.
+    args : tuple, optional
+        Extra arguments passed to f, fprime and fprime2.
+    tol, rtol : float, optional
+        An element has converged when its last step is smaller than
+        ``tol + rtol*|x|`` or when f(x) is exactly zero.
+    maxiter : int, optional
+        Maximum number of iterations.
+    x1 : array_like, optional
+        Second starting point for the secant method. Defaults to a small
+        perturbation of x0, as in ``opt.newton()``.
+
+    Returns
+    -------
+    BatchRootResult
+        iterations counts the updates applied to each element; elements that
+        did not converge (or hit a zero derivative) have converged = False.
+    """
+    if fprime == 'auto':
+        fprime = derivative(f)
+    elif fprime == 'complex-step':
+        fprime = _complex_step(f)
+    elif isinstance(fprime, str):
+        raise ValueError(f'unknown fprime option {fprime!r}')
+    if fprime2 == 'auto':
+        fprime2 = derivative(f, order = 2)
+    if fprime2 is not None and fprime is None:
+        raise ValueError("Halley's method needs fprime as well as fprime2")
+
+    args = tuple(np.asarray(arg) for arg in args)
+    x, *args = np.broadcast_arrays(np.asarray(x0, dtype = float), *args)
+    shape = x.shape
+    x, *args = (np.ravel(v) for v in (x, *args))
+    x = x.astype(float)
+    converged = np.zeros(x.shape, dtype = bool)
+    iterations = np.zeros(x.shape, dtype = int)
+    active = np.ones(x.shape, dtype = bool)
+
+    secant = fprime is None
+    if secant:
+        if x1 is None:
+            eps = 1e-4
+            xp = x*(1 + eps) + np.where(x >= 0, eps, -eps)
+        else:
+            xp = np.broadcast_to(np.asarray(x1, dtype = float), x.shape).astype(float)
+        #(x_prev, f_prev) and (x, f) play the roles of the two secant points
+        x, xp = xp, x
+        fp = np.asarray(f(xp, *args), dtype = float)*np.ones_like(xp)
+
+    for _ in range(maxiter):
+        idx = np.nonzero(active)
+        if idx[0].size == 0:
+            break
+        xi = x[idx]
+        argi = tuple(arg[idx] for arg in args)
+        fi = np.asarray(f(xi, *argi), dtype = float)*np.ones_like(xi)
+
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            if secant:
+                dfi = (fi - fp[idx])/(xi - xp[idx])
+            else:
+                dfi = np.asarray(fprime(xi, *argi), dtype = float)*np.ones_like(xi)
+            step = fi/dfi
+            if fprime2 is not None:
+                d2fi = np.asarray(fprime2(xi, *argi), dtype = float)*np.ones_like(xi)
+                step = step/(1 - 0.5*step*d2fi/dfi)
+
+        zero = fi == 0
+        step = np.where(zero, 0.0, step)
+        failed = ~np.isfinite(step)
+        step = np.where(failed, 0.0, step)
+        xnew = xi - step
+        if secant:
+            xp[idx], fp[idx] = xi, fi
+
+        x[idx] = xnew
+        iterations[idx] += ~zero & ~failed
+        done = zero | (~failed & (np.abs(step) <= tol + rtol*np.abs(xnew)))
+        converged[idx] = done
+        active[idx] = ~(done | failed)
+
+    return _reshape_result(x, converged, iterations, shape)
+
+
+class ScalarRootResult(NamedTuple):
+    """Result of :func:`safe_newton` and :func:`householder`."""
+    root: float
+    converged: bool
+    bracketed: bool
+    iterations: int
+    function_calls: int
+    bracket: tuple
+
+
+def _expand_bracket(f, x0, f0, args, step, factor, max_expand):
+    """
+    Grow a bracket geometrically outward from x0 until f changes sign.
+
+    A nan or inf (x has left the domain of f, e.g. sqrt or log of a negative
+    number) is not a sign change: that direction's step is halved back
+    toward the last finite point, and the direction is given up once the
+    step has shrunk to nothing.
+    """
+    ends = {1: [x0, f0, step], -1: [x0, f0, step]}  #direction: [x, f(x), step]
+    nfev = 0
+    for _ in range(max_expand):
+        #try both directions each round
+        for d in (1, -1):
+            if d not in ends:
+                continue
+            x, fx, s = ends[d]
+            x_new = x + d*s
+            f_new = f(x_new, *args)
+            nfev += 1
+            if not np.isfinite(f_new):
+                if 0.5*s <= 1e-12*max(abs(x), 1.0):
+                    del ends[d]
+                else:
+                    ends[d][2] = 0.5*s
+                continue
+            if np.sign(f_new) != np.sign(f0):
+                return ((x, x_new, fx, f_new) if d > 0 else (x_new, x, f_new, fx)), nfev
+            ends[d] = [x_new, f_new, s*factor]
+        if not ends:
+            break
+    return None, nfev
+
+
+def _scalar_result(x, converged, bracketed, iterations, ncalls, a, b):
+    a, b = float(a), float(b)
+    return ScalarRootResult(float(x), converged, bracketed, iterations, ncalls,
+                            (min(a, b), max(a, b)) if a == a else (a, b))
+
+
+def safe_newton(f, x0, fprime = 'auto', args = (), bracket = None, xtol = 2e-12,
+                rtol = 4*np.finfo(float).eps, maxiter = 100, step = None,
+                factor = 2.0, max_expand = 60):
+    """
+    Newton-Raphson with a bisection safeguard and automatic bracketing.
+
+    Plain Newton iterations (``opt.newton()``, or the while loops in Modules
+    09 and 10) diverge or cycle from poor initial guesses. This solver first
+    expands a bracket geometrically outward from x0 until f changes sign,
+    then takes Newton steps inside it, falling back to bisection whenever a
+    Newton step would leave the bracket or is not shrinking fast enough. The
+    bracket always contains a root, so convergence is guaranteed and the
+    worst case is bisection: about log2(width/xtol) iterations.
+
+    Parameters
+    ----------
+    f : callable
+        Scalar function ``f(x, *args)``.
+    x0 : float
+        Initial guess.
+    fprime : callable or 'auto', optional
+        Derivative of f. 'auto' computes it exactly with dual numbers
+        (:func:`chetools.derivative`).
+    args : tuple, optional
+        Extra arguments passed to f and fprime.
+    bracket : (float, float), optional
+        A known bracket; if given, no expansion is performed.
+    xtol, rtol, maxiter : optional
+        Convergence when the last step is smaller than ``xtol + rtol*|x|``.
+    step, factor, max_expand : optional
+        Bracket expansion starts with a step of ``step`` (default
+        ``0.1*max(|x0|, 1)``) that grows by ``factor`` each round, for at most
+        max_expand rounds.
+
+    Returns
+    -------
+    ScalarRootResult
+        bracketed is False if no sign change was found (points where f is
+        nan or inf never count as one); the root is then nan.
+    """
+    if fprime == 'auto':
+        fprime = derivative(f)
+    ncalls = 0
+
+    if bracket is None:
+        x0 = float(x0)
+        f0 = f(x0, *args)
+        ncalls += 1
+        if not np.isfinite(f0):
+            return _scalar_result(np.nan, False, False, 0, ncalls, np.nan, np.nan)
+        if f0 == 0:
+            return _scalar_result(x0, True, True, 0, ncalls, x0, x0)
+        if step is None:
+            step = 0.1*max(abs(x0), 1.0)
+        found, n = _expand_bracket(f, x0, f0, args, step, factor, max_expand)
+        ncalls += n
+        if found is None:
+            return _scalar_result(np.nan, False, False, 0, ncalls, np.nan, np.nan)
+        a, b, fa, fb = found
+    else:
+        a, b = map(float, bracket)
+        fa, fb = f(a, *args), f(b, *args)
+        ncalls += 2
+        if not (np.isfinite(fa) and np.isfinite(fb)) \
+                or (np.sign(fa) == np.sign(fb) and fa != 0 and fb != 0):
+            return _scalar_result(np.nan, False, False, 0, ncalls, a, b)
+
+    if fa == 0:
+        return _scalar_result(a, True, True, 0, ncalls, a, b)
+    if fb == 0:
+        return _scalar_result(b, True, True, 0, ncalls, a, b)
+    #orient so that f(lo) < 0 < f(hi)
+    lo, hi = (a, b) if fa < 0 else (b, a)
+    x = float(x0) if min(a, b) < x0 < max(a, b) else 0.5*(a + b)
+    dx_old = dx = abs(b - a)
+    fx, dfx = f(x, *args), fprime(x, *args)
+    ncalls += 2
+
+    for it in range(1, maxiter + 1):
+        newton_leaves = ((x - hi)*dfx - fx)*((x - lo)*dfx - fx) > 0
+        too_slow = abs(2*fx) > abs(dx_old*dfx)
+        dx_old = dx
+        if newton_leaves or too_slow or dfx == 0 or not np.isfinite(dfx):
+            dx = 0.5*(hi - lo)
+            x = lo + dx
+        else:
+            dx = fx/dfx
+            x = x - dx
+        if abs(dx) <= xtol + rtol*abs(x):
+            return _scalar_result(x, True, True, it, ncalls, lo, hi)
+        fx, dfx = f(x, *args), fprime(x, *args)
+        ncalls += 2
+        if not np.isfinite(fx):
+            #f is undefined somewhere inside the bracket; give up there
+            return _scalar_result(x, False, True, it, ncalls, lo, hi)
+        if fx == 0:
+            return _scalar_result(x, True, True, it, ncalls, lo, hi)
+        if fx < 0:
+            lo = x
+        else:
+            hi = x
+    return _scalar_result(x, False, True, maxiter, ncalls, lo, hi)
+
+
+def householder(f, x0, order = 3, derivatives = 'auto', args = (), xtol = 2e-12,
+                rtol = 4*np.finfo(float).eps, maxiter = 50):
+    """
+    Householder's method of the given order for a scalar equation f(x) = 0.
+
+    Order 1 is Newton-Raphson (quadratic convergence), order 2 is Halley's
+    method (cubic) and order 3 converges quartically: near a simple root,
+    every iteration multiplies the number of correct digits by order + 1.
+    The step uses derivatives of 1/f,
+
+        x_new = x + order*(1/f)^(order - 1)(x) / (1/f)^(order)(x),
+
+    so each iteration needs f and its first ``order`` derivatives. By
+    default they all come from a single pass through f with Taylor jets
+    (:func:`chetools.taylor`), so no derivatives have to be written by hand.
+    Fewer iterations only pay off when f is expensive relative to its
+    derivatives; use :func:`chetools.benchmarks.compare_householder` to check.
+
+    Like ``opt.newton()``, this is a local method; it is not safeguarded.
+
+    Parameters
+    ----------
+    f : callable
+        Scalar function ``f(x, *args)``.
+    x0 : float
+        Initial guess.
+    order : int, optional
+        1 (Newton), 2 (Halley), 3, ...
+    derivatives : 'auto' or sequence of callables, optional
+        Either 'auto', or ``[fprime, fprime2, ...]`` with at least ``order``
+        hand-coded derivatives (like dy and ddy in Module 10).
+    args : tuple, optional
+        Extra arguments passed to f and its derivatives.
+    xtol, rtol, maxiter : optional
+        Convergence when the last step is smaller than ``xtol + rtol*|x|``.
+
+    Returns
+    -------
+    ScalarRootResult
+        function_calls counts passes through f (a Taylor-jet pass counts as
+        one) plus calls to hand-coded derivatives. The bracket fields are not
+        used: bracketed is False and bracket is (nan, nan).
+    """
+    if order < 1 or order != int(order):
+        raise ValueError('order must be a positive integer')
+    order = int(order)
+    if derivatives == 'auto':
+        def evaluate(x):
+            return taylor(f, x, order, args), 1
+    else:
+        if len(derivatives) < order:
+            raise ValueError(f'order {order} needs {order} derivatives')
+        funs = [f] + list(derivatives[:order])
+
+        def evaluate(x):
+            return np.array([fun(x, *args) for fun in funs], dtype = float), order + 1
+
+    #f^(k)/k!: the Taylor coefficients of f about x
+    factorial = np.cumprod(np.concatenate(([1.0], np.arange(1, order + 1))))
+    x = float(x0)
+    ncalls = 0
+    for it in range(1, maxiter + 1):
+        d, n = evaluate(x)
+        ncalls += n
+        if d[0] == 0:
+            return _scalar_result(x, True, False, it - 1, ncalls, np.nan, np.nan)
+        c = d/factorial
+        #Taylor coefficients of 1/f, r[k] = (1/f)^(k)/k!
+        r = np.empty(order + 1)
+        r[0] = 1/c[0]
+        for k in range(1, order + 1):
+            r[k] = -np.dot(c[1:k + 1], r[k - 1::-1])/c[0]
+        with np.errstate(all = 'ignore'):
+            dx = r[order - 1]/r[order]
+        if not np.isfinite(dx):
+            return _scalar_result(x, False, False, it, ncalls, np.nan, np.nan)
+        x = x + dx
+        if abs(dx) <= xtol + rtol*abs(x):
+            return _scalar_result(x, True, False, it, ncalls, np.nan, np.nan)
+    return _scalar_result(x, False, False, maxiter, ncalls, np.nan, np.nan)
+
+
+def halley(f, x0, fprime = None, fprime2 = None, args = (), **kwargs):
+    """
+    Halley's method (cubic convergence); :func:`householder` with order 2.
+
+    Hand-coded derivatives are used where given; a missing fprime or
+    fprime2 is computed exactly with dual numbers (:func:`chetools.derivative`).
+    If neither is given, f and both derivatives come from one Taylor-jet pass.
+    Keyword arguments are passed on to :func:`householder`.
+    """
+    if fprime is None and fprime2 is None:
+        return householder(f, x0, 2, 'auto', args, **kwargs)
+    fprime = derivative(f) if fprime is None else fprime
+    fprime2 = derivative(f, 2) if fprime2 is None else fprime2
+    return householder(f, x0, 2, [fprime, fprime2], args, **kwargs)
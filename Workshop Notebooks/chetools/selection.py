@@ -0,0 +1,256 @@
+"""
+Choosing between rate laws with information criteria.
+
+The rates in Modules 11 and 12 fall between C = 1 and 2 mmol/L (from 5.53
+to 5.13 mmol/L/min), which a Michaelis-Menten curve cannot do but a
+substrate-inhibited one can. Comparing SSEs does not settle the question,
+because a law with more parameters always fits at least as well as a
+simpler one it contains. Information criteria add a penalty for every
+parameter:
+
+    AICc = n*ln(SSE/n) + 2K + 2K(K + 1)/(n - K - 1)
+    BIC  = n*ln(SSE/n) + K*ln(n)
+
+where n is the number of data points and K = k + 1 counts the k parameters
+of the law plus the variance of the errors. The law with the lowest value is
+preferred. Differences of less than about 2 mean the data cannot really
+tell the laws apart, and differences of more than 10 are decisive. AICc is
+AIC with a correction for small n, which matters when n/K is below about 40,
+as it always is for a kinetics experiment. BIC charges ln(n) per parameter
+instead of 2, so with many points it favors simpler laws than AIC does; with
+a dozen points the AICc correction is actually the larger penalty.
+
+    result = select_models(CS, rate)
+    print(format_table(ranking_table(result)))
+    print(format_table(parameter_table(result)))
+
+Every candidate law is fitted to every dataset with
+:func:`chetools.kinetics.fit_batch`; with workers set, the fits are split by
+law and by blocks of datasets over a process pool.
+"""
+
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+from ._pool import pmap, resolve_workers
+from .kinetics import (RATE_LAWS, BatchFitResult, _batch_evaluate, _broadcast_data, _law,
+                       fit_batch)
+
+
+class ModelSelectionResult(NamedTuple):
+    """
+    Result of :func:`select_models` for B datasets and M candidate laws.
+
+    models holds the law names, in the column order of the (B, M) arrays
+    aicc, bic and weights, and parameters maps each name to the names of
+    its parameters. weights are the Akaike (or, for BIC, Schwarz)
+    weights for the chosen criterion: the relative support for each law,
+    summing to 1 for each dataset. best is the name of the preferred law for
+    each dataset. fits and residuals map each law name to its
+    BatchFitResult and its (B, n) residuals (nan where there is no data),
+    and diagnostics maps it to the dictionary returned by
+    :func:`residual_diagnostics`. time is the wall time of the fits.
+    """
+    models: tuple
+    parameters: dict
+    criterion: str
+    best: np.ndarray
+    aicc: np.ndarray
+    bic: np.ndarray
+    weights: np.ndarray
+    fits: dict
+    residuals: dict
+    diagnostics: dict
+    time: float
+
+
+def information_criteria(sse, n, k):
+    """
+    AICc and BIC of least-squares fits with k parameters to n points.
+
+    Broadcasts over arrays; AICc is nan when n <= k + 2.
+    """
+    sse, n = np.asarray(sse, dtype = float), np.asarray(n, dtype = float)
+    K = k + 1
+    with np.errstate(all = 'ignore'):
+        loglik = n*np.log(np.maximum(sse, np.finfo(float).tiny)/n)
+        aicc = np.where(n - K - 1 > 0, loglik + 2*K + 2*K*(K + 1)/(n - K - 1), np.nan)
+        bic = loglik + K*np.log(n)
+    return aicc, bic
+
+
+def _weights(score):
+    """Akaike weights exp(-delta/2)/sum for each row; nan scores get weight 0."""
+    score = np.where(np.isfinite(score), score, np.inf)
+    delta = score - np.min(score, axis = 1, keepdims = True)
+    with np.errstate(invalid = 'ignore'):
+        w = np.exp(-0.5*delta)
+        return w/np.sum(w, axis = 1, keepdims = True)
+
+
+def residual_diagnostics(C, e, k):
+    """
+    Statistics of the residuals e (B, n) of fits with k parameters.
+
+    A good model leaves residuals that look like random noise. When the
+    model has the wrong shape, neighbouring residuals share a sign (the data
+    sit above the curve over one range of C and below it over another). With
+    the points in order of concentration, the dictionary returned has (B,)
+    arrays of:
+
+    * rmse, the residual standard deviation sqrt(SSE/(n - k));
+    * max_std_resid, the largest |residual|/rmse (an outlier check);
+    * runs_z, the Wald-Wolfowitz runs test statistic for the signs of the
+      residuals; values below about -2 mean too few sign changes for
+      random noise, i.e. systematic misfit;
+    * durbin_watson, sum((e[i+1] - e[i])^2)/sum(e^2), about 2 for
+      independent residuals and well below 2 for trends.
+
+    nan residuals are ignored, as are residuals that are exactly 0 in the
+    runs test (such as at C = 0, where every law predicts r = 0).
+    """
+    C, e = _broadcast_data(C, e)
+    w = ~np.isnan(e)
+    npts = w.sum(axis = 1)
+    with np.errstate(all = 'ignore'):
+        sse = np.nansum(e**2, axis = 1)
+        rmse = np.where(npts > k, np.sqrt(sse/(npts - k)), np.nan)
+        max_std = np.nanmax(np.abs(e), axis = 1)/rmse
+
+        #order by concentration with the ignored points last
+        def ordered(mask):
+            idx = np.argsort(np.where(mask, C, np.inf), axis = 1, kind = 'stable')
+            es = np.take_along_axis(np.where(mask, e, 0.0), idx, axis = 1)
+            ms = np.take_along_axis(mask, idx, axis = 1)
+            return es, ms[:, 1:] & ms[:, :-1]
+
+        es, pairs = ordered(w)
+        dw = np.sum(np.where(pairs, np.diff(es, axis = 1)**2, 0.0), axis = 1)/sse
+
+        nonzero = w & (e != 0)
+        es, pairs = ordered(nonzero)
+        s = es > 0
+        runs = 1 + np.sum(pairs & (s[:, 1:] != s[:, :-1]), axis = 1)
+        n_pos = np.sum(nonzero & (e > 0), axis = 1)
+        n_neg = np.sum(nonzero & (e < 0), axis = 1)
+        N = n_pos + n_neg
+        mu = 2*n_pos*n_neg/N + 1
+        var = (mu - 1)*(mu - 2)/(N - 1)
+        runs_z = np.where(var > 0, (runs - mu)/np.sqrt(var), np.nan)
+    return {'rmse': rmse, 'max_std_resid': max_std, 'runs_z': runs_z, 'durbin_watson': dw}
+
+
+class _FitJob:
+    """Picklable job: fit one law to one block of datasets."""
+
+    def __init__(self, options):
+        self.options = options
+
+    def __call__(self, item):
+        law, C, r = item
+        fit = fit_batch(law, C, r, **self.options)
+        w = ~np.isnan(r)
+        e = _batch_evaluate(law, C, np.where(w, r, 0.0), w, fit.params)[0]
+        return fit, np.where(w, e, np.nan)
+
+
+def select_models(C, r, laws = None, criterion = 'aicc', workers = None, **options):
+    """
+    Fit several rate laws to each dataset and rank them.
+
+    Parameters
+    ----------
+    C, r : array_like
+        Concentrations and rates, (n,) for one dataset or (B, n) for many
+        (C may be (n,) for all of them); nan marks missing rates.
+    laws : sequence of RateLaw or str, optional
+        Candidate laws; by default every law in
+        :data:`chetools.kinetics.RATE_LAWS` (Michaelis-Menten, Hill,
+        substrate inhibition and two-site).
+    criterion : {'aicc', 'bic'}, optional
+        Criterion used for best and weights (both are always computed).
+    workers : int, optional
+        Number of processes; -1 uses all cores. Each law's datasets are
+        split into one block per worker, so a single dataset gives one job
+        per law and many datasets give enough jobs to keep every core busy.
+    **options
+        Passed to :func:`chetools.kinetics.fit_batch` (maxiter, xtol, ...).
+
+    Returns
+    -------
+    ModelSelectionResult
+    """
+    if criterion not in ('aicc', 'bic'):
+        raise ValueError("criterion must be 'aicc' or 'bic'")
+    laws = [_law(law) for law in (laws or RATE_LAWS.values())]
+    C, r = _broadcast_data(C, r)
+    B = r.shape[0]
+    blocks = np.array_split(np.arange(B), min(resolve_workers(workers), B))
+    items = [(law, C[b], r[b]) for law in laws for b in blocks]
+
+    t0 = time.perf_counter()
+    results = pmap(_FitJob(options), items, workers = workers)
+    elapsed = time.perf_counter() - t0
+
+    npts = np.sum(~np.isnan(r), axis = 1)
+    names = tuple(law.name for law in laws)
+    fits, residuals, diagnostics = {}, {}, {}
+    aicc, bic = np.empty((B, len(laws))), np.empty((B, len(laws)))
+    for j, law in enumerate(laws):
+        parts = results[j*len(blocks):(j + 1)*len(blocks)]
+        fit = BatchFitResult(*(np.concatenate(field) for field in zip(*(p[0] for p in parts))))
+        e = np.concatenate([p[1] for p in parts])
+        k = len(law.params)
+        aicc[:, j], bic[:, j] = information_criteria(fit.sse, npts, k)
+        fits[law.name], residuals[law.name] = fit, e
+        diagnostics[law.name] = residual_diagnostics(C, e, k)
+
+    score = aicc if criterion == 'aicc' else bic
+    weights = _weights(score)
+    best = np.array(names)[np.argmax(weights, axis = 1)]
+    parameters = {law.name: law.params for law in laws}
+    return ModelSelectionResult(names, parameters, criterion, best, aicc, bic, weights, fits,
+                                residuals, diagnostics, elapsed)
+
+
+def ranking_table(result, dataset = 0):
+    """
+    Rows (list of dict) comparing the laws for one dataset, best first.
+
+    Keys: model, k, sse, aicc, bic, delta (difference from the best law in
+    the chosen criterion), weight, converged, runs_z and durbin_watson.
+    """
+    score = result.aicc if result.criterion == 'aicc' else result.bic
+    rows = []
+    for j, name in enumerate(result.models):
+        fit, diag = result.fits[name], result.diagnostics[name]
+        rows.append({'model': name, 'k': fit.params.shape[1], 'sse': fit.sse[dataset],
+                     'aicc': result.aicc[dataset, j], 'bic': result.bic[dataset, j],
+                     'delta': score[dataset, j] - np.nanmin(score[dataset]),
+                     'weight': result.weights[dataset, j],
+                     'converged': bool(fit.converged[dataset]),
+                     'runs_z': diag['runs_z'][dataset],
+                     'durbin_watson': diag['durbin_watson'][dataset]})
+    return sorted(rows, key = lambda row: -row['weight'])
+
+
+def parameter_table(result, dataset = 0, models = None):
+    """
+    Rows (list of dict) of fitted parameters for one dataset.
+
+    Keys: model, parameter, value, stderr and rel_stderr (stderr/|value|;
+    values near or above 1 mean the data do not determine the parameter).
+    models defaults to every law, best first.
+    """
+    if models is None:
+        models = [row['model'] for row in ranking_table(result, dataset)]
+    rows = []
+    for name in models:
+        fit = result.fits[name]
+        for i, pname in enumerate(result.parameters[name]):
+            value, se = fit.params[dataset, i], fit.stderr[dataset, i]
+            rows.append({'model': name, 'parameter': pname, 'value': value, 'stderr': se,
+                         'rel_stderr': se/abs(value) if value else np.inf})
+    return rows
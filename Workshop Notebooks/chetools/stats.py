@@ -0,0 +1,111 @@
+"""
+Residual statistics for comparing measurements with model predictions.
+
+This is the "production" version of the meas/pred comparison in Module 04.
+Everything is accumulated in a single pass over the data, one chunk at a
+time, so it works on arrays that are far larger than memory (e.g., .npy
+files opened as memory maps).
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+
+
+class ResidualStats(NamedTuple):
+    """Summary statistics for residuals, r = meas - pred."""
+    n: int
+    SSE: float
+    RMSE: float
+    MAE: float
+    bias: float
+    R2: float
+    max_error: float
+
+
+def _as_array(data):
+    """Return an array view of data; strings/paths are opened as memory maps."""
+    if isinstance(data, (str, bytes)) or hasattr(data, '__fspath__'):
+        return np.load(data, mmap_mode = 'r')
+    return np.asarray(data)
+
+
+def residual_stats(meas, pred, chunksize = 2**20):
+    """
+    Compute SSE, RMSE, MAE, bias, R² and max |error| in one chunked pass.
+
+    Parameters
+    ----------
+    meas, pred : array_like or path
+        Measured and predicted values. They are flattened and must have the
+        same number of elements. A path to a .npy file is opened with
+        ``mmap_mode = 'r'``, so only one chunk is ever resident in memory.
+    chunksize : int, optional
+        Number of elements processed per pass through the loop.
+
+    Returns
+    -------
+    ResidualStats
+        Named tuple with fields n, SSE, RMSE, MAE, bias, R2 and max_error.
+        The residual is defined as meas - pred, so a positive bias means the
+        model under-predicts on average.
+
+    Notes
+    -----
+    A single scratch buffer of length chunksize is reused for every chunk;
+    sums of squares are formed with ``np.einsum`` so that no squared
+    temporary is created. The total sum of squares of the measurements
+    (needed for R²) is merged across chunks with Chan's pairwise update,
+    which avoids the cancellation error of the textbook sum(x²) - n·mean²
+    formula on very long records.
+    """
+    meas = _as_array(meas).reshape(-1)
+    pred = _as_array(pred).reshape(-1)
+    if meas.shape != pred.shape:
+        raise ValueError('meas and pred must have the same number of elements')
+    n = meas.size
+    if n == 0:
+        raise ValueError('meas and pred are empty')
+    chunksize = int(max(1, min(chunksize, n)))
+
+    buf = np.empty(chunksize, dtype = np.result_type(meas.dtype, pred.dtype, np.float64))
+
+    SSE = 0.0
+    sum_r = 0.0
+    sum_abs = 0.0
+    max_abs = 0.0
+    count = 0          #measurements accumulated so far
+    mean_m = 0.0       #running mean of the measurements
+    M2_m = 0.0         #running sum of squared deviations from mean_m
+
+    for start in range(0, n, chunksize):
+        m = meas[start:start + chunksize]
+        p = pred[start:start + chunksize]
+        k = m.size
+        r = buf[:k]
+
+        np.subtract(m, p, out = r)
+        SSE += np.einsum('i,i->', r, r)
+        sum_r += r.sum()
+        max_abs = max(max_abs, r.max(), -r.min())
+        np.abs(r, out = r)
+        sum_abs += r.sum()
+
+        chunk_mean = m.sum(dtype = buf.dtype)/k
+        np.subtract(m, chunk_mean, out = r)
+        chunk_M2 = np.einsum('i,i->', r, r)
+        delta = chunk_mean - mean_m
+        total = count + k
+        mean_m += delta*k/total
+        M2_m += chunk_M2 + delta**2*count*k/total
+        count = total
+
+    SSE = float(SSE)
+    R2 = 1.0 - SSE/M2_m if M2_m > 0 else np.nan
+    return ResidualStats(n = n,
+                         SSE = SSE,
+                         RMSE = float(np.sqrt(SSE/n)),
+                         MAE = float(sum_abs/n),
+                         bias = float(sum_r/n),
+                         R2 = float(R2),
+                         max_error = float(max_abs))
@@ -0,0 +1,157 @@
+"""
+Low-overhead recording of solver iterations.
+
+Printing x and f(x) on every pass through a Newton loop (Module 09), or
+appending them to lists, is a nice way to watch a method converge, but print
+statements can easily take longer than the iterations themselves. A
+TraceRecorder stores the same information in a preallocated numpy array
+instead, and it can be handed to scipy solvers as a ``callback`` or wrapped
+around the function being solved.
+
+    trace = TraceRecorder()
+    x = 10
+    while abs(y(x)) > 1e-8:
+        trace.record(x, y(x))
+        x = x - y(x)/dy(x)
+    data = trace.to_numpy()   #fields: iter, x, f, step, time
+"""
+
+import time
+
+import numpy as np
+
+
+class TraceRecorder:
+    """
+    Ring buffer of (iteration, x, f(x), step size, elapsed time) records.
+
+    Parameters
+    ----------
+    capacity : int, optional
+        Number of records kept. Once full, the oldest records are overwritten,
+        so memory use is fixed no matter how long the solver runs.
+    every : int, optional
+        Sampling interval; only every n-th call to :meth:`record` is stored.
+        Step sizes are still measured from the previous *call*.
+    fun : callable, optional
+        Objective or residual function. Used only when the recorder is a scipy
+        callback that is handed x without f(x); f is then evaluated once more
+        per recorded sample. Prefer :meth:`wrap` if f is expensive.
+    """
+
+    def __init__(self, capacity = 10000, every = 1, fun = None):
+        if capacity < 1 or every < 1:
+            raise ValueError('capacity and every must be positive integers')
+        self.capacity = int(capacity)
+        self.every = int(every)
+        self.fun = fun
+        self._buffer = None
+        self.reset()
+
+    def reset(self):
+        """Forget all records and restart the clock."""
+        self.ncalls = 0
+        self.nrecords = 0
+        self._last_x = None
+        self._t0 = time.perf_counter()
+
+    def _allocate(self, x, f):
+        xshape = np.shape(x)
+        fshape = np.shape(f)
+        dtype = np.dtype([('iter', np.int64), ('x', float, xshape), ('f', float, fshape),
+                          ('step', float), ('time', float)])
+        self._buffer = np.zeros(self.capacity, dtype = dtype)
+
+    def record(self, x, f = np.nan):
+        """Log one iteration; call this from inside a hand-written loop."""
+        x = np.asarray(x, dtype = float)
+        if self._last_x is None or self._last_x.shape != x.shape:
+            step = np.nan
+        else:
+            step = float(np.sqrt(np.sum((x - self._last_x)**2)))
+        self._last_x = x.copy()
+        n = self.ncalls
+        self.ncalls += 1
+        if n % self.every:
+            return
+        if self._buffer is None:
+            self._allocate(x, f)
+        rec = self._buffer[self.nrecords % self.capacity]
+        rec['iter'] = n
+        rec['x'] = x
+        rec['f'] = f
+        rec['step'] = step
+        rec['time'] = time.perf_counter() - self._t0
+        self.nrecords += 1
+
+    def __call__(self, xk, *args):
+        """
+        scipy-style callback, e.g., ``opt.minimize(f, x0, callback = trace)``.
+
+        Accepts either the current x or an OptimizeResult-like object with
+        ``x`` and ``fun`` attributes.
+        """
+        if hasattr(xk, 'x'):
+            x = xk.x
+            f = getattr(xk, 'fun', None)
+        else:
+            x, f = xk, None
+        if f is None:
+            f = self.fun(x) if self.fun is not None and (self.ncalls % self.every == 0) else np.nan
+        self.record(x, f)
+
+    def wrap(self, fun):
+        """
+        Return fun wrapped so that every evaluation is recorded.
+
+        This traces solvers that have no callback (``opt.newton()``,
+        ``opt.brentq()``, ``opt.root()``, ...) at no extra evaluation cost.
+        Note that every function evaluation is recorded, including those a
+        solver makes for finite-difference derivatives or line searches.
+        """
+        def traced(x, *args, **kwargs):
+            f = fun(x, *args, **kwargs)
+            self.record(x, f)
+            return f
+        traced.__wrapped__ = fun
+        return traced
+
+    def __len__(self):
+        return min(self.nrecords, self.capacity)
+
+    def to_numpy(self):
+        """Return the stored records, oldest first, as a structured array."""
+        if self._buffer is None:
+            return np.zeros(0, dtype = [('iter', np.int64), ('x', float), ('f', float),
+                                        ('step', float), ('time', float)])
+        if self.nrecords <= self.capacity:
+            return self._buffer[:self.nrecords].copy()
+        start = self.nrecords % self.capacity
+        return np.concatenate((self._buffer[start:], self._buffer[:start]))
+
+    def save(self, filename):
+        """Save the records to a .npz file (one array per field)."""
+        data = self.to_numpy()
+        np.savez(filename, **{name: data[name] for name in data.dtype.names})
+
+    def to_parquet(self, filename):
+        """
+        Save the records to a Parquet file (requires pyarrow).
+
+        Vector-valued x or f are split into columns x0, x1, ... and f0, f1, ...
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as err:
+            raise ImportError('to_parquet() requires pyarrow; use save() to write .npz instead') from err
+        data = self.to_numpy()
+        columns = {}
+        for name in data.dtype.names:
+            values = data[name].reshape(len(data), -1)
+            if values.shape[1] == 1 and data.dtype[name].shape == ():
+                columns[name] = values[:, 0]
+            else:
+                for j in range(values.shape[1]):
+                    columns[f'{name}{j}'] = values[:, j]
+        pq.write_table(pa.table(columns), filename)
@@ -0,0 +1,345 @@
+"""
+Confidence intervals for fitted rate-law parameters.
+
+``opt.least_squares()`` gives us best-fit values of Vmax and Km, but not how
+well the data determine them. There are three common ways to find out, and
+they trade accuracy for time:
+
+* asymptotic: linearize the model at the best fit and use the covariance
+  s^2 (J^T J)^-1, exactly as ``opt.curve_fit()`` does. It costs one
+  Jacobian, but assumes the SSE is a quadratic bowl around the best fit,
+  which it often is not (think of Ki when there is hardly any inhibition).
+* profile likelihood: fix one parameter at a series of values, refit the
+  others each time, and find where the best SSE rises past a threshold set
+  by the F distribution. It follows the real shape of the SSE, so the
+  intervals can be lopsided or open-ended, and it needs a few dozen refits
+  per parameter.
+* bootstrap: make hundreds of synthetic datasets by resampling the
+  residuals (or the data points) of the best fit, refit each one, and read
+  the interval off the spread of the estimates. It makes the fewest
+  assumptions and costs the most; with the default linear loss all
+  replicates are fitted at once by :func:`chetools.kinetics.fit_batch`.
+
+Each function returns an :class:`UncertaintyResult` that records what it
+cost (time, number of fits and model evaluations) next to the intervals:
+
+    asymptotic_intervals('michaelis-menten', CS, rate)
+    profile_intervals('michaelis-menten', CS, rate)
+    bootstrap_intervals('michaelis-menten', CS, rate, n_boot = 1000)
+"""
+
+import time
+from typing import NamedTuple
+
+import numpy as np
+import scipy.optimize as opt
+from scipy import stats
+
+from ._pool import pmap, resolve_workers
+from .kinetics import (KineticResiduals, _batch_evaluate, _covariance, _law, fit_batch,
+                       linearized_guess)
+
+
+class UncertaintyResult(NamedTuple):
+    """
+    Parameter uncertainty from one of the methods in this module.
+
+    params are the best-fit values and lower, upper the confidence interval
+    at the given level (inf where the data give no bound). stderr is the
+    standard error: from the covariance (asymptotic), the spread of the
+    replicates (bootstrap), or the interval half-width divided by the t
+    quantile (profile). time, nfits and nfev (model evaluations, each of
+    which also gives the Jacobian) are the cost of the method, including the
+    base fit. details holds the bootstrap samples or the profiles.
+    """
+    method: str
+    params: np.ndarray
+    stderr: np.ndarray
+    lower: np.ndarray
+    upper: np.ndarray
+    level: float
+    time: float
+    nfits: int
+    nfev: int
+    details: dict
+
+
+def _data(C, r):
+    C, r = np.asarray(C, dtype = float), np.asarray(r, dtype = float)
+    if r.ndim != 1:
+        raise ValueError('expected the data of a single experiment (1-D C and r)')
+    return np.broadcast_to(C, r.shape).copy(), r
+
+
+def _base_fit(law, C, r, p0, loss):
+    """Best fit and the number of model evaluations it took."""
+    p0 = linearized_guess(law, C, r) if p0 is None else np.asarray(p0, dtype = float)
+    if loss == 'linear':
+        fit = fit_batch(law, C, r, p0)
+        return fit.params[0], int(fit.iterations[0]) + 1
+    res = KineticResiduals(law, C, r)
+    sol = opt.least_squares(res, p0, jac = res.jac, loss = loss)
+    return sol.x, int(sol.nfev + sol.njev)
+
+
+def asymptotic_intervals(law, C, r, p0 = None, level = 0.95):
+    """
+    Intervals params +/- t*stderr from the linearized covariance.
+
+    Parameters
+    ----------
+    law : RateLaw or str
+        Rate law, as in :mod:`chetools.kinetics`.
+    C, r : array_like
+        Concentrations and rates of one experiment.
+    p0 : array_like, optional
+        Initial guess for the fit (default: :func:`linearized_guess`).
+    level : float, optional
+        Confidence level.
+
+    Returns
+    -------
+    UncertaintyResult
+        details has the covariance matrix.
+    """
+    law = _law(law)
+    C, r = _data(C, r)
+    t0 = time.perf_counter()
+    params, nfev = _base_fit(law, C, r, p0, 'linear')
+    w = np.ones((1, r.size), dtype = bool)
+    _, J, sse = _batch_evaluate(law, C[None], r[None], w, params[None])
+    cov, stderr = _covariance(J, sse, np.array([r.size]), params.size)
+    half = stats.t.ppf(0.5 + level/2, r.size - params.size)*stderr[0]
+    return UncertaintyResult('asymptotic', params, stderr[0], params - half, params + half,
+                             level, time.perf_counter() - t0, 1, nfev + 1,
+                             {'covariance': cov[0]})
+
+
+#---- bootstrap ------------------------------------------------------------------
+
+class _BootstrapJob:
+    """Picklable job: generate and fit one block of bootstrap replicates."""
+
+    def __init__(self, law, C, r, params, kind, loss):
+        self.law, self.C, self.r = law, C, r
+        self.params, self.kind, self.loss = params, kind, loss
+        fitted = law.f(C, *params)
+        n, k = r.size, params.size
+        #residuals of a fit are smaller than the errors they estimate; inflate them to match
+        self.fitted, self.resid = fitted, (r - fitted)*np.sqrt(n/max(n - k, 1))
+
+    def __call__(self, block):
+        seed, count = block
+        rng = np.random.default_rng(seed)
+        n = self.r.size
+        if self.kind == 'residual':
+            C = np.broadcast_to(self.C, (count, n))
+            r = self.fitted + self.resid[rng.integers(0, n, (count, n))]
+        else:
+            idx = rng.integers(0, n, (count, n))
+            C, r = self.C[idx], self.r[idx]
+        if self.loss == 'linear':
+            fit = fit_batch(self.law, C, r, self.params)
+            return fit.params, fit.converged, int(np.sum(fit.iterations + 1))
+        params, converged, nfev = np.empty((count, self.params.size)), np.empty(count, bool), 0
+        for i in range(count):
+            res = KineticResiduals(self.law, C[i], r[i])
+            with np.errstate(all = 'ignore'):
+                sol = opt.least_squares(res, self.params, jac = res.jac, loss = self.loss)
+            params[i], converged[i] = sol.x, sol.success
+            nfev += sol.nfev + sol.njev
+        return params, converged, nfev
+
+
+def bootstrap_intervals(law, C, r, n_boot = 1000, kind = 'residual', loss = 'linear',
+                        p0 = None, level = 0.95, workers = None, seed = None):
+    """
+    Percentile bootstrap intervals.
+
+    Every replicate is refitted starting from the base fit (a warm start),
+    which is close to its own best fit, so each refit takes only a few
+    iterations. Replicates are split into blocks, one per worker, and each
+    block makes its own synthetic data, so only the original data are sent
+    to the workers.
+
+    Parameters
+    ----------
+    law, C, r, p0, level
+        As for :func:`asymptotic_intervals`.
+    n_boot : int, optional
+        Number of bootstrap replicates.
+    kind : {'residual', 'case'}, optional
+        'residual' adds resampled residuals of the best fit to the fitted
+        curve (keeping the concentrations fixed); 'case' resamples the
+        (C, r) points themselves, which does not assume that the errors are
+        the same at every concentration.
+    loss : str, optional
+        Loss used for the base fit and every refit, as for
+        ``opt.least_squares()``; e.g. 'soft_l1' or 'cauchy' show how much
+        a robust loss changes the uncertainty. Replicates with the default
+        'linear' loss are fitted together by fit_batch; others are fitted
+        one at a time with ``opt.least_squares()``.
+    workers : int, optional
+        Number of processes; -1 uses all cores.
+    seed : int, optional
+        Random seed.
+
+    Returns
+    -------
+    UncertaintyResult
+        details has the samples (n_boot, k) and converged flags; replicates
+        whose fit did not converge (e.g. case resamples that miss all of
+        the low concentrations) are left out of the intervals. If fewer
+        than two converge, stderr, lower and upper are nan and
+        details['message'] says why.
+
+    Notes
+    -----
+    A parameter the data do not determine (the SSE hardly changes with it,
+    like Ki with no sign of inhibition) tends to stay at its warm start in
+    every replicate, which gives a misleadingly narrow interval. Check such
+    parameters with :func:`profile_intervals`, which reports an open
+    interval for them.
+    """
+    if kind not in ('residual', 'case'):
+        raise ValueError("kind must be 'residual' or 'case'")
+    law = _law(law)
+    C, r = _data(C, r)
+    t0 = time.perf_counter()
+    params, nfev = _base_fit(law, C, r, p0, loss)
+    job = _BootstrapJob(law, C, r, params, kind, loss)
+    nblocks = min(resolve_workers(workers), n_boot)
+    counts = [len(b) for b in np.array_split(np.arange(n_boot), nblocks)]
+    seeds = np.random.SeedSequence(seed).spawn(nblocks)
+    results = pmap(job, zip(seeds, counts), workers = workers)
+    samples = np.concatenate([res[0] for res in results])
+    converged = np.concatenate([res[1] for res in results])
+    nfev += sum(res[2] for res in results)
+    good = samples[converged]
+    details = {'samples': samples, 'converged': converged}
+    if good.shape[0] < 2:
+        #no spread to measure; nan limits rather than a misleading interval
+        nan = np.full(params.size, np.nan)
+        details['message'] = (f'only {good.shape[0]} of {n_boot} bootstrap replicates '
+                              'converged; no interval could be computed')
+        return UncertaintyResult(f'{kind} bootstrap', params, nan, nan, nan, level,
+                                 time.perf_counter() - t0, n_boot + 1, nfev, details)
+    alpha = 100*(1 - level)/2
+    lower, upper = np.percentile(good, [alpha, 100 - alpha], axis = 0)
+    return UncertaintyResult(f'{kind} bootstrap', params, np.std(good, axis = 0, ddof = 1), lower,
+                             upper, level, time.perf_counter() - t0, n_boot + 1, nfev, details)
+
+
+#---- profile likelihood ---------------------------------------------------------
+
+class _ProfileJob:
+    """Picklable job: profile one parameter in both directions from the best fit."""
+
+    def __init__(self, law, C, r, params, sse_min, steps, threshold, max_steps):
+        self.law, self.C, self.r, self.params = law, C, r, params
+        self.sse_min, self.steps = sse_min, steps
+        self.threshold, self.max_steps = threshold, max_steps
+
+    def _refit(self, j, value, x0):
+        """Best SSE with parameter j fixed at value, and the other parameters."""
+        free = np.arange(self.params.size) != j
+
+        def full(x):
+            p = np.empty(self.params.size)
+            p[j], p[free] = value, x
+            return p
+
+        def resid(x):
+            return self.r - self.law.f(self.C, *full(x))
+
+        def jac(x):
+            return -self.law.jac(self.C, *full(x))[:, free]
+
+        if not free.any():
+            e = resid(x0)
+            return e @ e, x0, 1
+        with np.errstate(all = 'ignore'):
+            sol = opt.least_squares(resid, x0, jac = jac)
+        return 2*sol.cost, sol.x, int(sol.nfev + sol.njev)
+
+    def __call__(self, j):
+        free = np.arange(self.params.size) != j
+        nfev = 0
+        values, sse = [self.params[j]], [self.sse_min]
+        bounds = []
+        for direction in (-1, 1):
+            x, last_v, last_s = self.params[free], self.params[j], self.sse_min
+            bound = np.inf if direction > 0 else 0.0
+            for i in range(1, self.max_steps + 1):
+                #log-spaced steps, since kinetic parameters are positive
+                v = self.params[j]*np.exp(direction*i*self.steps[j])
+                s, x, calls = self._refit(j, v, x)
+                nfev += calls
+                values.append(v)
+                sse.append(s)
+                if s > self.threshold:
+                    #interpolate where the profile crosses the threshold
+                    bound = last_v + (v - last_v)*(self.threshold - last_s)/(s - last_s)
+                    break
+                last_v, last_s = v, s
+            bounds.append(bound)
+        order = np.argsort(values)
+        return bounds[0], bounds[1], np.array(values)[order], np.array(sse)[order], nfev
+
+
+def profile_intervals(law, C, r, p0 = None, level = 0.95, max_steps = 25, workers = None):
+    """
+    Profile-likelihood intervals.
+
+    For each parameter, the parameter is fixed at values stepping away from
+    its best fit (in both directions), the other parameters are refitted
+    (starting from the previous step's values) and the interval ends where
+    the SSE rises above
+
+        SSE_min*(1 + F(level; 1, n - k)/(n - k))
+
+    the usual F test for one parameter in a least-squares fit.
+
+    Parameters
+    ----------
+    law, C, r, p0, level
+        As for :func:`asymptotic_intervals`. Parameters must be positive.
+    max_steps : int, optional
+        Steps in each direction; the steps are sized from the asymptotic
+        standard error so that a well-determined parameter crosses the
+        threshold in about ten steps. A side that does not cross the
+        threshold within max_steps is reported as open (0 or inf).
+    workers : int, optional
+        Number of processes (one job per parameter); -1 uses all cores.
+
+    Returns
+    -------
+    UncertaintyResult
+        details has 'profiles': for each parameter name, the fixed values
+        and the best SSE at each.
+    """
+    law = _law(law)
+    C, r = _data(C, r)
+    t0 = time.perf_counter()
+    base = asymptotic_intervals(law, C, r, p0, level)
+    params = base.params
+    n, k = r.size, params.size
+    e = r - law.f(C, *params)
+    sse_min = e @ e
+    threshold = sse_min*(1 + stats.f.ppf(level, 1, n - k)/(n - k))
+    with np.errstate(all = 'ignore'):
+        rel = base.stderr/np.abs(params)
+    #about ten steps to reach the asymptotic interval, within reasonable limits
+    steps = np.clip(np.where(np.isfinite(rel), 0.2*rel, 0.25), 0.005, 0.5)
+    job = _ProfileJob(law, C, r, params, sse_min, steps, threshold, max_steps)
+    results = pmap(job, range(k), workers = workers)
+    lower = np.array([res[0] for res in results])
+    upper = np.array([res[1] for res in results])
+    nfev = base.nfev + sum(res[4] for res in results)
+    nfits = 1 + sum(res[2].size - 1 for res in results)
+    t = stats.t.ppf(0.5 + level/2, n - k)
+    profiles = {name: (res[2], res[3]) for name, res in zip(law.params, results)}
+    return UncertaintyResult('profile', params, (upper - lower)/(2*t), lower, upper, level,
+                             time.perf_counter() - t0, nfits, nfev,
+                             {'profiles': profiles, 'threshold': threshold})
+
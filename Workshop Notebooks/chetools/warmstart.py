@@ -0,0 +1,262 @@
+"""
+A persistent store of optimizer and root-finder solutions.
+
+Every time the book is rebuilt, or a notebook rerun, problems like the
+Module 11 Michaelis-Menten fit, the Module 12 system of four equations and
+the Module 10 SLSQP cow problems are solved again from the same initial
+guesses. :class:`SolutionStore` remembers each solution in a SQLite file:
+
+* if exactly the same problem is solved from exactly the same initial
+  guess, the stored result is returned without calling the solver;
+* if the same problem is solved from a different initial guess, the stored
+  solution is used as the initial guess instead (a *warm start*), along
+  with the stored inverse Hessian when the method can use it.
+
+A problem is identified by a hash of the source code of the objective (and
+of any functions and global data it refers to), the args, the bounds, the
+constraints, the method and its options. Editing the function, or changing
+the data it uses, therefore changes the hash, and old solutions are simply
+never matched again.
+
+    store = SolutionStore('solutions.sqlite')
+    sol = store.minimize(obj, par0, args = (CS, rate))
+    sol.cache   #'hit', 'warm' or 'miss'
+"""
+
+import hashlib
+import inspect
+import time
+import types
+
+import numpy as np
+import scipy.optimize as opt
+
+from .cache import _DiskStore, _fingerprint
+
+
+def _code_fingerprint(code, h):
+    h.update(code.co_code)
+    h.update(repr(code.co_names).encode())
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            _code_fingerprint(const, h)
+        else:
+            h.update(repr(const).encode())
+
+
+def _names(code):
+    """Global names used by a code object and any functions nested in it."""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= _names(const)
+    return names
+
+
+def _function_fingerprint(fun, h, seen, depth = 3):
+    """Hash the source of fun plus the global data and helpers it uses."""
+    fun = inspect.unwrap(fun)
+    fun = getattr(fun, 'fun', fun)  #CountingFunction, CachedFunction
+    if id(fun) in seen:
+        return
+    seen.add(id(fun))
+    code = getattr(fun, '__code__', None)
+    if code is None:
+        #a callable object: use its class's source, and its data
+        try:
+            h.update(inspect.getsource(type(fun)).encode())
+        except (OSError, TypeError):
+            h.update(repr(type(fun)).encode())
+        for value in getattr(fun, '__dict__', {}).values():
+            _value_fingerprint(value, h, seen, depth)
+        return
+    try:
+        h.update(inspect.getsource(fun).encode())
+    except (OSError, TypeError):
+        _code_fingerprint(code, h)
+    for cell in fun.__closure__ or ():
+        try:
+            _value_fingerprint(cell.cell_contents, h, seen, depth)
+        except ValueError:  #empty cell
+            pass
+    if depth > 0:
+        g = getattr(fun, '__globals__', {})
+        for name in sorted(_names(code)):
+            if name in g:
+                h.update(name.encode())
+                _value_fingerprint(g[name], h, seen, depth - 1)
+
+
+def _value_fingerprint(value, h, seen, depth):
+    if isinstance(value, types.ModuleType) or isinstance(value, type):
+        return
+    if callable(value):
+        if depth >= 0 and not isinstance(value, types.BuiltinFunctionType):
+            _function_fingerprint(value, h, seen, depth)
+        return
+    try:
+        _fingerprint(value, None, h)
+    except (TypeError, ValueError):
+        h.update(repr(type(value)).encode())
+
+
+def problem_key(fun, args = (), method = None, bounds = None, constraints = (), **settings):
+    """
+    Hash identifying a problem: function source, data, args, bounds,
+    constraints, method and any other settings (tol, options, jac, ...).
+    """
+    h = hashlib.blake2b(digest_size = 20)
+    seen = set()
+    _function_fingerprint(fun, h, seen)
+    _value_fingerprint(tuple(args), h, seen, 1)
+    h.update(repr(method).encode())
+    if bounds is not None:
+        b = opt.Bounds(*np.asarray(bounds, dtype = float).T) if not isinstance(bounds, opt.Bounds) \
+            else bounds
+        _fingerprint(np.asarray(b.lb, dtype = float), None, h)
+        _fingerprint(np.asarray(b.ub, dtype = float), None, h)
+    cons = [constraints] if isinstance(constraints, dict) else list(constraints or ())
+    for con in cons:
+        items = con.items() if isinstance(con, dict) else sorted(vars(con).items())
+        for k, v in sorted(items, key = lambda kv: kv[0]):
+            h.update(str(k).encode())
+            _value_fingerprint(v, h, seen, 1)
+    for k in sorted(settings):
+        h.update(k.encode())
+        v = settings[k]
+        if isinstance(v, dict):
+            for kk in sorted(v):
+                h.update(str(kk).encode())
+                _value_fingerprint(v[kk], h, seen, 1)
+        else:
+            _value_fingerprint(v, h, seen, 1)
+    return h.digest()
+
+
+def _start_key(key, x0):
+    h = hashlib.blake2b(key, digest_size = 20)
+    _fingerprint(np.asarray(x0, dtype = float), None, h)
+    return h.digest()
+
+
+def _storable(sol):
+    """A plain copy of a solver result that can be pickled and reloaded."""
+    out = opt.OptimizeResult()
+    for k, v in sol.items():
+        if hasattr(v, 'todense'):
+            v = np.asarray(v.todense())
+        elif callable(v) or k == 'cache':
+            continue
+        out[k] = v
+    return out
+
+
+class SolutionStore:
+    """
+    Cache of solutions shared between runs; see the module docstring.
+
+    Parameters
+    ----------
+    path : str or path-like, optional
+        SQLite file holding the solutions (created if needed).
+
+    Attributes
+    ----------
+    hits, warm, misses : int
+        Solves answered from the store, warm-started, and started cold.
+    """
+
+    def __init__(self, path = 'chetools-solutions.sqlite'):
+        self._exact = _DiskStore(path, 'solution-exact')
+        self._latest = _DiskStore(path, 'solution-latest')
+        self.hits = self.warm = self.misses = 0
+
+    def _solve(self, kind, solver, key, x0, warm_start, reuse, warm_options):
+        x0 = np.asarray(x0, dtype = float)
+        start = _start_key(key, x0)
+        if reuse:
+            sol = self._exact.get(start)
+            if sol is not None:
+                self.hits += 1
+                sol.cache = 'hit'
+                return sol
+
+        previous = self._latest.get(key) if warm_start else None
+        extra = {}
+        if previous is not None and np.shape(previous.x) == x0.shape and np.all(np.isfinite(previous.x)):
+            x_start = np.asarray(previous.x, dtype = float)
+            extra = warm_options(previous)
+            status = 'warm'
+            self.warm += 1
+        else:
+            x_start = x0
+            status = 'miss'
+            self.misses += 1
+
+        t0 = time.perf_counter()
+        sol = solver(x_start, extra)
+        sol.solve_time = time.perf_counter() - t0
+        stored = _storable(sol)
+        self._exact.put(start, stored)
+        if sol.success:
+            self._latest.put(key, stored)
+        sol.cache = status
+        return sol
+
+    def minimize(self, fun, x0, args = (), method = None, jac = None, hess = None, bounds = None,
+                 constraints = (), tol = None, options = None, warm_start = True, reuse = True):
+        """
+        ``opt.minimize()`` with stored solutions.
+
+        Arguments are as for ``opt.minimize()``. reuse = False always calls
+        the solver (but still stores the result); warm_start = False never
+        replaces x0. The result has two extra fields: cache ('hit', 'warm' or
+        'miss') and solve_time (seconds spent when it was computed).
+        """
+        key = problem_key(fun, args, method, bounds, constraints, jac = jac, hess = hess,
+                          tol = tol, options = options or {}, kind = 'minimize')
+
+        def warm_options(previous):
+            #BFGS can start from the stored inverse Hessian as well as from x
+            hess_inv = previous.get('hess_inv')
+            if (method or '').upper() != 'BFGS' or not isinstance(hess_inv, np.ndarray) \
+                    or 'hess_inv0' in (options or {}):
+                return {}
+            #scipy wants it exactly symmetric and positive definite; BFGS's own
+            #hess_inv is only symmetric to roundoff
+            hess_inv = 0.5*(hess_inv + hess_inv.T)
+            try:
+                np.linalg.cholesky(hess_inv)
+            except np.linalg.LinAlgError:
+                return {}
+            return {'hess_inv0': hess_inv}
+
+        def solver(x_start, extra):
+            kwargs = {'constraints': constraints} if constraints else {}
+            return opt.minimize(fun, x_start, args = args, method = method, jac = jac, hess = hess,
+                                bounds = bounds, tol = tol, options = {**(options or {}), **extra},
+                                **kwargs)
+
+        return self._solve('minimize', solver, key, x0, warm_start, reuse, warm_options)
+
+    def root(self, fun, x0, args = (), method = 'hybr', jac = None, tol = None, options = None,
+             warm_start = True, reuse = True):
+        """``opt.root()`` with stored solutions; see :meth:`minimize`."""
+        key = problem_key(fun, args, method, jac = jac, tol = tol, options = options or {},
+                          kind = 'root')
+
+        def solver(x_start, extra):
+            return opt.root(fun, x_start, args = args, method = method, jac = jac, tol = tol,
+                            options = options)
+
+        return self._solve('root', solver, key, x0, warm_start, reuse, lambda previous: {})
+
+    def info(self):
+        """Dictionary of the hit/warm/miss counters."""
+        return {'hits': self.hits, 'warm': self.warm, 'misses': self.misses}
+
+    def clear(self):
+        """Delete every stored solution (in all processes sharing the file)."""
+        self._exact.clear()
+        self._latest.clear()
+        self.hits = self.warm = self.misses = 0
@@ -0,0 +1,320 @@
+"""
+Work-precision benchmarks for the methods of ``opt.minimize()``.
+
+Module 10 runs Nelder-Mead, Powell, BFGS, dogleg, trust-krylov and SLSQP on
+the same cubic one at a time and compares nfev and nit by eye. This module
+does that systematically: a registry of test problems (the Module 10 and 11
+objectives, plus Rosenbrock and ill-conditioned quadratics in any number of
+dimensions) is run through every method at several tolerances, counting the
+evaluations of the function, gradient and Hessian and measuring how close
+each answer is to the known minimum. Plotting error against work for each
+method gives a work-precision diagram; saving the results lets a later run
+be checked for performance regressions.
+
+    rows = work_precision(['cubic', 'rosenbrock'], dims = (2, 10))
+    print(format_table(rows))
+"""
+
+import json
+import time
+import warnings
+from typing import NamedTuple
+
+import numpy as np
+import scipy.optimize as opt
+
+from .autodiff import gradient, hessian
+from .benchmarks import CountingFunction, format_table
+
+
+class Problem(NamedTuple):
+    """A test problem: minimize fun from x0; the minimum is fopt at xopt."""
+    name: str
+    fun: object
+    x0: np.ndarray
+    fopt: float
+    xopt: np.ndarray
+    jac: object
+    hess: object
+
+
+#name -> (factory, scalable); factory(dim) returns a Problem
+PROBLEMS = {}
+
+#methods that use a gradient and those that use a Hessian
+JAC_METHODS = {'CG', 'BFGS', 'L-BFGS-B', 'TNC', 'SLSQP', 'trust-constr', 'Newton-CG',
+               'dogleg', 'trust-ncg', 'trust-krylov', 'trust-exact'}
+HESS_METHODS = {'trust-constr', 'Newton-CG', 'dogleg', 'trust-ncg', 'trust-krylov',
+                'trust-exact'}
+DEFAULT_METHODS = ('Nelder-Mead', 'Powell', 'CG', 'BFGS', 'L-BFGS-B', 'TNC', 'SLSQP',
+                   'trust-constr', 'Newton-CG', 'dogleg', 'trust-ncg', 'trust-krylov',
+                   'trust-exact')
+
+
+def register_problem(name, factory, scalable = False):
+    """
+    Add a problem to the registry.
+
+    factory(dim) must return a :class:`Problem`; dim is ignored unless
+    scalable is True. A missing jac or hess (None) is computed with
+    automatic differentiation.
+    """
+    PROBLEMS[name] = (factory, scalable)
+
+
+def get_problem(name, dim = 2):
+    """Build a registered problem, filling in derivatives where needed."""
+    factory, scalable = PROBLEMS[name]
+    p = factory(dim if scalable else None)
+    return p._replace(x0 = np.asarray(p.x0, dtype = float),
+                      xopt = None if p.xopt is None else np.asarray(p.xopt, dtype = float),
+                      jac = p.jac or gradient(p.fun), hess = p.hess or hessian(p.fun))
+
+
+#---- built-in problems ------------------------------------------------------
+
+def _cubic(dim):
+    #Module 10: y(x) = -1.6x^3 + 5x^2 + 8x - 23 has a local minimum where dy = 0
+    y = lambda x: -1.6*x[0]**3 + 5*x[0]**2 + 8*x[0] - 23
+    xopt = (10 - np.sqrt(100 + 4*4.8*8))/9.6
+    return Problem('cubic', y, [1.0], y([xopt]), [xopt], None, None)
+
+
+def _cows(dim):
+    #Module 10: negative profit from moving a herd of cattle
+    def obj(cows):
+        cows = cows[0]
+        Revenue = 0.3*8000*cows
+        Fuel    = 100*cows**2
+        Bribe   = (500*np.exp(-cows*0.5) + 32)*cows
+        return -(Revenue - Fuel - Bribe)
+    return _reference(Problem('cows', obj, [16.0], None, None, None, None), [11.87])
+
+
+def _z(dim):
+    #Module 11: z = (x - 10)^2 + (y + 5)^2
+    z = lambda var: (var[0] - 10)**2 + (var[1] + 5)**2
+    return Problem('z', z, [10.0, 50.0], 0.0, [10.0, -5.0], None, None)
+
+
+def _q(dim):
+    #Module 11: q(var, a, b) with a = 1, b = 3
+    q = lambda var: var[0]**2 + 3*var[1]**2 + var[0] - var[1]
+    return Problem('q', q, [10.0, 50.0], -1/3, [-0.5, 1/6], None, None)
+
+
+_CS = np.array([0, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5])
+_RATE = np.array([0, 0.017537467, 0.030941975, 0.080327165, 0.1643835, 0.26569368,
+                  0.745442547, 1.295792328, 2.419014706, 4.0402125, 5.534947297,
+                  5.127217742, 7.074911496])
+
+
+def _michaelis_menten(dim):
+    #Module 11: least-squares fit of Vmax and Km to the rate data
+    def obj(par):
+        model = (par[0]*_CS)/(par[1] + _CS)
+        return np.sum((_RATE - model)**2)
+    return _reference(Problem('michaelis-menten', obj, [1.0, 1.0], None, None, None, None),
+                      [7.0, 0.4])
+
+
+def _rosenbrock(dim):
+    x0 = np.tile([-1.2, 1.0], (dim + 1)//2)[:dim]
+    return Problem('rosenbrock', opt.rosen, x0, 0.0, np.ones(dim), opt.rosen_der,
+                   opt.rosen_hess)
+
+
+def _quadratic(dim):
+    #condition number 1e4
+    d = np.logspace(0, 4, dim)
+    f = lambda x: 0.5*np.sum(d*x**2)
+    return Problem('quadratic', f, np.ones(dim), 0.0, np.zeros(dim), lambda x: d*x,
+                   lambda x: np.diag(d))
+
+
+def _reference(p, guess):
+    """Fill in fopt and xopt by solving the problem tightly from a good guess."""
+    jac = gradient(p.fun)
+    sol = opt.minimize(p.fun, guess, jac = jac, hess = hessian(p.fun), method = 'trust-exact',
+                       options = {'gtol': 1e-12})
+    return p._replace(fopt = float(sol.fun), xopt = sol.x)
+
+
+register_problem('cubic', _cubic)
+register_problem('cows', _cows)
+register_problem('z', _z)
+register_problem('q', _q)
+register_problem('michaelis-menten', _michaelis_menten)
+register_problem('rosenbrock', _rosenbrock, scalable = True)
+register_problem('quadratic', _quadratic, scalable = True)
+
+
+#---- running ----------------------------------------------------------------
+
+def run_method(problem, method, tol, maxiter = None):
+    """
+    Minimize one problem with one method and tolerance; return a result row.
+
+    Keys: problem, dim, method, tol, success, nfev, njev, nhev, nit, time,
+    error (|f - fopt|) and xerror (largest |x - xopt|). Calls are counted
+    directly, so nfev includes any evaluations spent on finite differences.
+    """
+    fc = CountingFunction(problem.fun)
+    jc = CountingFunction(problem.jac) if method in JAC_METHODS else None
+    hc = CountingFunction(problem.hess) if method in HESS_METHODS else None
+    options = {} if maxiter is None else {'maxiter': maxiter}
+    row = {'problem': problem.name, 'dim': problem.x0.size, 'method': method, 'tol': tol}
+    t0 = time.perf_counter()
+    try:
+        with warnings.catch_warnings(), np.errstate(all = 'ignore'):
+            warnings.simplefilter('ignore')
+            sol = opt.minimize(fc, problem.x0, method = method, jac = jc, hess = hc, tol = tol,
+                               options = options)
+        elapsed = time.perf_counter() - t0
+        f, x = float(np.squeeze(sol.fun)), np.asarray(sol.x, dtype = float)
+        row.update(success = bool(sol.success), nit = int(sol.get('nit', 0)))
+    except (ValueError, ArithmeticError, np.linalg.LinAlgError) as err:
+        elapsed = time.perf_counter() - t0
+        f, x = np.nan, np.full(problem.x0.size, np.nan)
+        row.update(success = False, nit = 0, message = repr(err)[:60])
+    row.update(nfev = fc.calls, njev = jc.calls if jc else 0, nhev = hc.calls if hc else 0,
+               time = elapsed, error = abs(f - problem.fopt),
+               xerror = float(np.max(np.abs(x - problem.xopt))))
+    return row
+
+
+def work_precision(problems = None, methods = DEFAULT_METHODS, tols = (1e-3, 1e-6, 1e-9),
+                   dims = (2, 10), maxiter = None, repeat = 1):
+    """
+    Run every problem, method, tolerance and dimension combination.
+
+    Parameters
+    ----------
+    problems : sequence of str, optional
+        Names from :data:`PROBLEMS` (all of them by default).
+    methods : sequence of str, optional
+        ``opt.minimize()`` methods.
+    tols : sequence of float, optional
+        Values of the ``tol`` argument.
+    dims : sequence of int, optional
+        Dimensions used for scalable problems (others have a fixed size).
+    maxiter : int, optional
+        Passed to every method as an option.
+    repeat : int, optional
+        Each run is repeated and the fastest time is kept (counts and errors
+        are identical from run to run).
+
+    Returns
+    -------
+    list of dict
+        One row per run; see :func:`run_method`. Print it with
+        :func:`chetools.benchmarks.format_table`.
+    """
+    rows = []
+    for name in (problems or list(PROBLEMS)):
+        sizes = dims if PROBLEMS[name][1] else (None,)
+        for dim in sizes:
+            problem = get_problem(name, dim)
+            for method in methods:
+                for tol in tols:
+                    runs = [run_method(problem, method, tol, maxiter) for _ in range(repeat)]
+                    best = runs[0]
+                    best['time'] = min(r['time'] for r in runs)
+                    rows.append(best)
+    return rows
+
+
+def plot_work_precision(rows, problem, dim = None, cost = 'nfev', ax = None):
+    """
+    Plot error against cost (any numeric column: 'nfev', 'time', ...) for
+    each method on one problem, one line per method across tolerances.
+    Errors of exactly zero are drawn at 1e-17. Returns the axis.
+    """
+    import matplotlib.pyplot as plt
+
+    if ax is None:
+        ax = plt.gca()
+    chosen = [r for r in rows if r['problem'] == problem and (dim is None or r['dim'] == dim)]
+    for method in dict.fromkeys(r['method'] for r in chosen):
+        pts = sorted((r[cost], max(r['error'], 1e-17)) for r in chosen
+                     if r['method'] == method and np.isfinite(r['error']))
+        if pts:
+            c, e = zip(*pts)
+            ax.loglog(c, e, marker = 'o', label = method)
+    ax.set_xlabel(cost)
+    ax.set_ylabel('|f - fopt|')
+    ax.set_title(problem if dim is None else f'{problem} (dim = {dim})')
+    ax.legend(fontsize = 8)
+    return ax
+
+
+#---- regression checks ------------------------------------------------------
+
+def save_results(rows, path):
+    """Save benchmark rows as JSON (to compare a later run against)."""
+    def plain(v):
+        if isinstance(v, (np.floating, float)):
+            return float(v) if np.isfinite(v) else str(v)
+        if isinstance(v, (np.integer, np.bool_)):
+            return v.item()
+        return v
+    with open(path, 'w') as fh:
+        json.dump([{k: plain(v) for k, v in r.items()} for r in rows], fh, indent = 1)
+
+
+def load_results(path):
+    """Load rows saved by :func:`save_results`."""
+    with open(path) as fh:
+        rows = json.load(fh)
+    for r in rows:
+        for k, v in r.items():
+            if v in ('nan', 'inf', '-inf'):
+                r[k] = float(v)
+    return rows
+
+
+def find_regressions(baseline, rows, work_ratio = 1.25, time_ratio = 2.0, min_time = 1e-3,
+                     error_ratio = 100.0):
+    """
+    Compare a benchmark run against a saved baseline.
+
+    Runs are matched on (problem, dim, method, tol). A run is flagged if it
+    stopped succeeding, if its evaluations (nfev + njev + nhev) grew by more
+    than work_ratio, if its time grew by more than time_ratio (only for runs
+    slower than min_time, since faster ones are mostly timer noise), or if
+    its error grew by more than error_ratio. Returns a list of dicts with
+    the run's key and the reasons.
+    """
+    def key(r):
+        return (r['problem'], r['dim'], r['method'], r['tol'])
+
+    def work(r):
+        return r['nfev'] + r['njev'] + r['nhev']
+
+    old = {key(r): r for r in baseline}
+    flagged = []
+    for r in rows:
+        b = old.get(key(r))
+        if b is None:
+            continue
+        reasons = []
+        if b['success'] and not r['success']:
+            reasons.append('no longer succeeds')
+        if work(r) > work_ratio*max(work(b), 1):
+            reasons.append(f'evaluations {work(b)} -> {work(r)}')
+        if r['time'] > min_time and r['time'] > time_ratio*b['time']:
+            reasons.append(f"time {b['time']:.3g} -> {r['time']:.3g} s")
+        tiny = 1e-14
+        if r['error'] > error_ratio*max(b['error'], tiny) or (np.isnan(r['error'])
+                                                              and not np.isnan(b['error'])):
+            reasons.append(f"error {b['error']:.3g} -> {r['error']:.3g}")
+        if reasons:
+            flagged.append({'problem': r['problem'], 'dim': r['dim'], 'method': r['method'],
+                            'tol': r['tol'], 'reasons': '; '.join(reasons)})
+    return flagged
+
+
+def summary_table(rows, columns = ('problem', 'dim', 'method', 'tol', 'success', 'nfev', 'njev',
+                                   'nhev', 'nit', 'time', 'error')):
+    """A :func:`format_table` of the most useful columns."""
+    return format_table(rows, list(columns), floatfmt = '.3g')